@@ -0,0 +1,150 @@
+"""Benchmark bare requests calls against the shared pooled HTTP client on URL validation bursts.
+
+Mimics the link checks of a generation run: each burst HEADs ``--urls``
+distinct URLs on one host from ``--workers`` threads, as ``LinkVerifier``
+and ``UrlValidationCache`` do. A local HTTPS server (self-signed, made with
+the ``openssl`` CLI) counts the connections it accepts and delays each new
+one by ``--handshake-ms`` to stand in for TCP and TLS round trips to a
+remote site; ``--plain`` serves HTTP instead.
+
+Usage: python benchmarks/http_pool_benchmark.py [--bursts 5] [--urls 50] [--workers 16] [--handshake-ms 30]
+"""
+import argparse
+import asyncio
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from modules.http_client import AsyncHttpClient, aiohttp, make_session
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    handshake_seconds = 0.0
+
+    def setup(self):
+        self.server.count_connection()
+        time.sleep(self.handshake_seconds)
+        if isinstance(self.request, ssl.SSLSocket):
+            self.request.do_handshake()
+        super().setup()
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = do_HEAD
+
+    def log_message(self, *args):
+        pass
+
+
+class CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+
+def start_server(cert_dir: str, plain: bool, handshake_ms: float):
+    Handler.handshake_seconds = handshake_ms / 1000
+    server = CountingServer(("127.0.0.1", 0), Handler)
+    scheme = "http"
+    if not plain:
+        cert, key = os.path.join(cert_dir, "cert.pem"), os.path.join(cert_dir, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=127.0.0.1", "-keyout", key, "-out", cert],
+                       check=True, capture_output=True)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        # Handshake on the handler thread, so accepting connections is not serialized
+        server.socket = context.wrap_socket(server.socket, server_side=True, do_handshake_on_connect=False)
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}"
+
+
+def run_threaded(check, bursts, urls, workers):
+    latencies = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(bursts):
+            start = time.perf_counter()
+            results = list(pool.map(check, urls))
+            latencies.append(time.perf_counter() - start)
+            assert all(results)
+    return latencies
+
+
+def run_async(bursts, urls, workers):
+    async def go():
+        latencies = []
+        async with AsyncHttpClient(pool_size=workers, verify_ssl=False) as client:
+            for _ in range(bursts):
+                start = time.perf_counter()
+                results = await client.check_all(urls)
+                latencies.append(time.perf_counter() - start)
+                assert all(results.values())
+        return latencies
+    return asyncio.run(go())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--urls", type=int, default=50, help="URLs checked per burst")
+    parser.add_argument("--workers", type=int, default=16, help="concurrent checks (pool size)")
+    parser.add_argument("--handshake-ms", type=float, default=30,
+                        help="delay added to every new connection, standing in for network round trips")
+    parser.add_argument("--plain", action="store_true", help="serve HTTP instead of HTTPS")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+
+    with tempfile.TemporaryDirectory() as cert_dir:
+        server, base_url = start_server(cert_dir, args.plain, args.handshake_ms)
+        session = make_session(pool_size=args.workers)
+
+        def bare(url):
+            return requests.head(url, timeout=10, verify=False).status_code == 200
+
+        def pooled(url):
+            return session.head(url, timeout=10, verify=False).status_code == 200
+
+        modes = [("bare requests.head", lambda urls: run_threaded(bare, args.bursts, urls, args.workers)),
+                 ("pooled session", lambda urls: run_threaded(pooled, args.bursts, urls, args.workers))]
+        if aiohttp is not None:
+            modes.append(("async client", lambda urls: run_async(args.bursts, urls, args.workers)))
+        else:
+            print("aiohttp is not installed; skipping the async client")
+
+        print(f"{base_url.split(':')[0].upper()}, {args.bursts} bursts x {args.urls} URLs, "
+              f"{args.workers} workers, {args.handshake_ms:g} ms per new connection")
+        print(f"{'mode':<20}{'connections':>12}{'first burst s':>15}{'later bursts s':>16}{'total s':>9}")
+        for name, run in modes:
+            before = server.connections
+            latencies = run([f"{base_url}/page/{i}" for i in range(args.urls)])
+            later = sum(latencies[1:]) / max(1, len(latencies) - 1)
+            print(f"{name:<20}{server.connections - before:>12}{latencies[0]:>15.3f}{later:>16.3f}"
+                  f"{sum(latencies):>9.2f}")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark DataFrameStorage on-disk size and save latency for generated posts.
+
+Mimics ``BlogAutomationApp.save_generated_post``: every save appends one post
+row to the generated-posts frame and re-versions the whole frame.
+
+Usage: python benchmarks/storage_benchmark.py [--posts 1000] [--baseline-posts 200] [--backend blob|json|parquet|all]
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config.config import STORAGE_BACKEND
+from modules.dataframe_storage import DataFrameStorage
+from modules.storage_backends import BACKENDS
+
+
+def make_post(n: int, body_size: int) -> dict:
+    paragraph = f"<p>Post {n} talks about beast putty and stress relief. </p>"
+    return {
+        "Selected": False,
+        "Keyword": f"keyword {n}",
+        "Title": f"Title for post {n}",
+        "Excerpt": f"Excerpt for post {n}",
+        "Content": (paragraph * (body_size // len(paragraph) + 1))[:body_size],
+        "Image": None,
+        "Intent": "informational",
+        "Volume": n,
+        "Frequent Word": "putty",
+        "Tab": "",
+        "Status": "pending",
+        "Generated Date": datetime.now().isoformat()
+    }
+
+
+def dir_size(path: str) -> int:
+    # Blob and parquet payloads live in subdirectories
+    return sum(f.stat().st_size for f in Path(path).rglob('*') if f.is_file())
+
+
+def run(posts: int, body_size: int, keyframe_every: int, backend: str) -> dict:
+    with tempfile.TemporaryDirectory() as data_dir:
+        storage = DataFrameStorage(data_dir, keyframe_every=keyframe_every, backend=backend)
+        df_id = None
+        df = pd.DataFrame()
+        latencies = []
+        for n in range(posts):
+            row = pd.DataFrame([make_post(n, body_size)])
+            start = time.perf_counter()
+            if df_id is None:
+                df = row
+                df_id = storage.add_dataframe(df, "generated_posts", {"type": "generated_posts"})
+            else:
+                df = pd.concat([df, row]).reset_index(drop=True)
+                storage.update_dataframe(df_id, df, "Added new generated post")
+            latencies.append(time.perf_counter() - start)
+
+        storage.compact()
+        size = dir_size(data_dir)
+
+        start = time.perf_counter()
+        reloaded = DataFrameStorage(data_dir, keyframe_every=keyframe_every, backend=backend)
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reloaded.get_version(df_id, posts // 2)
+        rebuild_time = time.perf_counter() - start
+
+    tail = latencies[-100:]
+    return {
+        "posts": posts,
+        "size_mb": size / 1e6,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "tail_p95_ms": sorted(tail)[int(len(tail) * 0.95) - 1] * 1000,
+        "load_s": load_time,
+        "rebuild_ms": rebuild_time * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--baseline-posts", type=int, default=200,
+                        help="posts for the full-copy baseline (grows quadratically)")
+    parser.add_argument("--body-size", type=int, default=6000, help="bytes of HTML per post")
+    parser.add_argument("--backend", choices=sorted(BACKENDS) + ["all"], default=STORAGE_BACKEND,
+                        help="storage backend to measure (default: the configured STORAGE_BACKEND)")
+    args = parser.parse_args()
+    backends = sorted(BACKENDS) if args.backend == "all" else [args.backend]
+
+    print(f"{'backend':<9}{'mode':<22}{'posts':>7}{'size MB':>10}{'mean ms':>10}{'p95 ms (last 100)':>19}"
+          f"{'load s':>9}{'rebuild ms':>12}")
+    modes = [
+        ("full copies (baseline)", args.baseline_posts, 1),
+        ("delta + keyframes", args.baseline_posts, 1000),
+        ("delta + keyframes", args.posts, 1000),
+    ]
+    for backend in backends:
+        for name, posts, keyframe_every in modes:
+            r = run(posts, args.body_size, keyframe_every, backend)
+            print(f"{backend:<9}{name:<22}{r['posts']:>7}{r['size_mb']:>10.1f}{r['mean_ms']:>10.1f}"
+                  f"{r['tail_p95_ms']:>19.1f}{r['load_s']:>9.2f}{r['rebuild_ms']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,115 @@ SHOPIFY_API_VERSION = '2024-10'  # Update with the desired API version
 UNSPLASH_ACCESS_KEY = os.getenv('UNSPLASH_ACCESS_KEY')
 HUGGINGFACE_API_KEY = os.getenv('HUGGINGFACE_API_KEY')
 
+# Storage backend for DataFrameStorage: "blob" (content-addressed blobs), "json"
+# (inline in db.json) or "parquet"
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'blob')
+
+# Version retention for DataFrameStorage: keep the newest N versions, every
+# version from the last N days plus one per day before that, and tagged ones
+STORAGE_RETENTION = {
+    'keep_last': 50,
+    'daily_after_days': 7,
+    'keep_tagged': True
+}
+
+# Post generation: how many keywords are generated in parallel, and
+# per-provider API rate limits ("rate" calls per "per" seconds, "burst" at once)
+GENERATION_CONCURRENCY = int(os.getenv('GENERATION_CONCURRENCY', '4'))
+PROVIDER_RATE_LIMITS = {
+    'openai': {'rate': int(os.getenv('OPENAI_REQUESTS_PER_MINUTE', '60')), 'per': 60},
+    'starryai': {'rate': int(os.getenv('STARRYAI_REQUESTS_PER_MINUTE', '10')), 'per': 60},
+    'google_search': {'rate': 20, 'per': 60, 'burst': 2},
+    'huggingface': {'rate': int(os.getenv('HUGGINGFACE_REQUESTS_PER_MINUTE', '30')), 'per': 60, 'burst': 4}
+}
+
+# Keyword research: topics analyzed when the caller gives none, how many are
+# analyzed in parallel, and how often a rate-limited (429) request is retried
+SEO_BASE_TOPICS = [
+    "stress relief activities",
+    "therapy putty exercises",
+    "sensory toys benefits",
+    "stress relief tools",
+    "anxiety relief products",
+    "educational sensory toys",
+    "occupational therapy tools",
+    "fidget toys for anxiety",
+    "stress balls benefits",
+    "hand therapy exercises",
+    "sensory integration activities",
+    "focus improvement tools",
+    "desk toys for productivity",
+    "mindfulness tools",
+    "therapeutic putty exercises",
+    "hand strengthening activities",
+    "stress management products",
+    "concentration improvement toys",
+    "calming sensory tools",
+    "fine motor skill toys"
+]
+KEYWORD_ANALYSIS_CONCURRENCY = int(os.getenv('KEYWORD_ANALYSIS_CONCURRENCY', '4'))
+RATE_LIMIT_RETRIES = 3
+
+# Per-post limits for the research (tool-calling) loop: at most this many
+# rounds, and all of a post's API calls must finish within the deadline; the
+# last POST_WRITE_RESERVE_SECONDS of it are kept for writing the post
+MAX_TOOL_ROUNDS = int(os.getenv('MAX_TOOL_ROUNDS', '6'))
+POST_DEADLINE_SECONDS = int(os.getenv('POST_DEADLINE_SECONDS', '600'))
+POST_WRITE_RESERVE_SECONDS = 150
+
+# How long URL accessibility checks are trusted, for reachable and unreachable URLs
+URL_CACHE_POSITIVE_TTL = 7 * 24 * 3600
+URL_CACHE_NEGATIVE_TTL = 3600
+
+# Google search results (after filtering to trusted sites) are reused for this
+# long, for at most this many queries, and for queries whose words overlap at
+# least SEARCH_CACHE_SIMILARITY (Jaccard, after stemming) with a cached one
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL_SECONDS', str(3 * 24 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '5000'))
+SEARCH_CACHE_SIMILARITY = float(os.getenv('SEARCH_CACHE_SIMILARITY', '0.8'))
+
+# Posts whose bodies share at least this fraction of 3-word shingles (estimated
+# with MinHash) are treated as near-duplicates
+DEDUP_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', '0.5'))
+
+# Share of a keyword's word stems that must appear in a saved post's keyword or
+# title, or a live article's title, for the keyword to be flagged as cannibalizing it
+CANNIBALIZATION_THRESHOLD = float(os.getenv('CANNIBALIZATION_THRESHOLD', '0.75'))
+
+# How many links of generated posts are checked at once
+LINK_CHECK_CONCURRENCY = int(os.getenv('LINK_CHECK_CONCURRENCY', '32'))
+
+# Shared HTTP client: connections kept per host, how often idempotent requests
+# are retried on connection errors and 429/5xx, and the backoff between tries
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '32'))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '2'))
+HTTP_BACKOFF_SECONDS = float(os.getenv('HTTP_BACKOFF_SECONDS', '0.5'))
+# Longest wait between retries, whatever Retry-After a server asks for
+HTTP_MAX_RETRY_WAIT_SECONDS = float(os.getenv('HTTP_MAX_RETRY_WAIT_SECONDS', '5'))
+HTTP_KEEPALIVE_SECONDS = 30
+
+# LLM response cache: "record" (reuse and store responses), "replay" (cache
+# only, for offline runs) or "bypass"; least recently used responses are
+# evicted past the size limit
+LLM_CACHE_MODE = os.getenv('LLM_CACHE_MODE', 'record')
+LLM_CACHE_MAX_MB = int(os.getenv('LLM_CACHE_MAX_MB', '500'))
+
+# OpenAI prices in USD per 1K tokens, for the per-post cost estimates
+MODEL_PRICING = {
+    'gpt-4': {'prompt': 0.03, 'completion': 0.06}
+}
+
+# Overnight batch generation: how often submitted batches are polled, and
+# the Batch API discount on MODEL_PRICING
+BATCH_POLL_SECONDS = int(os.getenv('BATCH_POLL_SECONDS', '60'))
+BATCH_PRICE_FACTOR = 0.5
+
+# Our blog, scraped for internal links, and how long the scraped list is reused
+INTERNAL_BLOG_URL = os.getenv('INTERNAL_BLOG_URL', 'https://www.beastputty.com/blogs/molding-destiny')
+INTERNAL_LINKS_TTL = int(os.getenv('INTERNAL_LINKS_TTL_SECONDS', '21600'))
+# How many of the most relevant blog posts are offered to the model for internal links
+INTERNAL_LINKS_TOP_K = int(os.getenv('INTERNAL_LINKS_TOP_K', '8'))
+
 # Blog Post Configuration
 MAX_POSTS = 50
 MIN_POSTS = 1
@@ -1,18 +1,71 @@
 import streamlit as st
 import pandas as pd
 import asyncio
-from typing import List, Dict
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple
 import io
 from modules.content_generator import ContentGenerator
+from modules.batch_generator import BatchGenerator
 from modules.image_handler import ImageHandler
 from modules.shopify_uploader import ShopifyUploader
-from modules.dataframe_storage import DataFrameStorage
-from config.config import PERSONAS
+from modules.dataframe_storage import DataFrameStorage, RetentionPolicy, ConcurrentUpdateError
+from modules.post_store import PostStore
+from modules.post_finisher import PostFinisher
+from modules.blob_store import BlobStore
+from modules.keyword_import import KEYWORD_COLUMNS, ImportStats, read_keyword_file
+from modules.keyword_index import CannibalizationIndex
+from modules.link_cache import get_internal_link_cache
+from config.config import PERSONAS, STORAGE_BACKEND, STORAGE_RETENTION, GENERATION_CONCURRENCY
 import os
 from modules.seo_handler import SEOKeywordTool
+from modules.url_cache import get_url_validation_cache
+from modules.search_cache import get_search_cache
+from modules.llm_cache import get_completion_cache
+from modules.post_metrics import summarize_metrics
 import json
+import logging
+import time
 from datetime import datetime
 
+# Columns shown in the Saved Posts grid; post bodies are loaded only on upload
+SAVED_POSTS_GRID_COLUMNS = [
+    "Selected", "Keyword", "Title", "Image", "Intent", "Volume",
+    "Frequent Word", "Tab", "Status", "Generated Date"
+]
+
+@st.cache_resource
+def open_stores() -> Tuple[DataFrameStorage, BlobStore, PostStore]:
+    """Open the storage shared by every session and rerun of this process.
+
+    Streamlit builds a new app object on every rerun, so opening the stores
+    there would reopen SQLite and rebuild the near-duplicate index each
+    time. The post store is closed when the process exits.
+    """
+    df_storage = DataFrameStorage(backend=STORAGE_BACKEND)
+    # Post bodies are stored once by content hash and shared by the post store and frames
+    blob_store = BlobStore()
+    post_store = PostStore(blobs=blob_store)
+    atexit.register(post_store.close)
+    return df_storage, blob_store, post_store
+
+
+@st.cache_resource
+def open_cannibalization_index() -> CannibalizationIndex:
+    """Build the cannibalization index shared by every session, starting with live articles.
+
+    Keyword flags are remembered in the index, so sessions, reruns and
+    imports only look up keywords that are new or that new posts match.
+    Posts are added by ``BlogAutomationApp.cannibalization_index``.
+    """
+    index = CannibalizationIndex()
+    try:
+        index.add_articles(get_internal_link_cache().get_links())
+    except Exception as e:
+        logging.warning(f"Could not load published articles for cannibalization checks: {str(e)}")
+    return index
+
+
 class BlogAutomationApp:
     def __init__(self):
         # Force test mode to True
@@ -20,7 +73,9 @@ class BlogAutomationApp:
         self.test_mode = False
         self.image_handler = ImageHandler(test_mode=self.test_mode)
         self.shopify_uploader = ShopifyUploader()
-        self.df_storage = DataFrameStorage()
+        self.df_storage, self.blob_store, self.post_store = open_stores()
+        self.post_finisher = PostFinisher(self.post_store, self.image_handler)
+        self.migrate_generated_posts()
         # Set default values
         self.default_website = "https://beastputty.com"
         self.default_competitors = "https://crazyaarons.com/"
@@ -28,14 +83,16 @@ class BlogAutomationApp:
     def load_saved_keywords(self):
         """Load saved keywords from storage on startup"""
         try:
-            # Query for keyword dataframes
-            keyword_dfs = self.df_storage.query_by_metadata({"type": "keywords"})
-            if keyword_dfs:
-                # Get the most recent DataFrame
-                latest_df_id = keyword_dfs[-1]  # Assuming IDs are ordered by creation time
+            # Get the most recent keywords DataFrame
+            latest_df_id = self.df_storage.latest(type="keywords")
+            if latest_df_id:
+                # Read the revision before the frame: if another process saves in
+                # between, the next save conflicts instead of overwriting its rows
+                revision = self.df_storage.get_revision(latest_df_id)
                 df = self.df_storage.get_dataframe(latest_df_id)
-                st.session_state.keywords_df = df
+                st.session_state.keywords_df = self.flag_cannibalization(df)
                 st.session_state.current_df_id = latest_df_id
+                st.session_state.keywords_revision = revision
             else:
                 st.session_state.keywords_df = pd.DataFrame()
                 st.session_state.current_df_id = None
@@ -49,13 +106,16 @@ class BlogAutomationApp:
         try:
             if df.empty:
                 return
-                
+            # Cannibalization flags are recomputed on load, not stored
+            df = df.drop(columns=['Cannibalizes'], errors='ignore')
+
             if 'current_df_id' in st.session_state and st.session_state.current_df_id:
-                # Update existing DataFrame
-                self.df_storage.update_dataframe(
+                # Update existing DataFrame, unless another session changed it meanwhile
+                st.session_state.keywords_revision = self.df_storage.update_dataframe(
                     st.session_state.current_df_id,
                     df,
-                    comment
+                    comment,
+                    expected_revision=st.session_state.get('keywords_revision')
                 )
             else:
                 # Create new DataFrame
@@ -68,9 +128,25 @@ class BlogAutomationApp:
                     }
                 )
                 st.session_state.current_df_id = df_id
+                st.session_state.keywords_revision = 0
+        except ConcurrentUpdateError:
+            st.warning("Keywords were changed in another session; loaded the latest version instead.")
+            self.load_saved_keywords()
         except Exception as e:
             st.error(f"Error saving keywords: {str(e)}")
 
+    def cannibalization_index(self) -> CannibalizationIndex:
+        """Get the shared index of saved post and live article titles, with posts saved since its last use"""
+        index = open_cannibalization_index()
+        index.add_posts(self.post_store.posts_dataframe(columns=["Keyword", "Title"], after_id=index.posts_through))
+        return index
+
+    def flag_cannibalization(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Add a Cannibalizes column naming the post, article or keyword each keyword overlaps"""
+        if 'query' in df.columns and not df.empty:
+            df['Cannibalizes'] = self.cannibalization_index().flag_keywords(df['query'])
+        return df
+
     def delete_keyword_row(self, index: int):
         """Delete a keyword row and update storage"""
         try:
@@ -81,55 +157,84 @@ class BlogAutomationApp:
         except Exception as e:
             st.error(f"Error deleting keyword: {str(e)}")
 
+    def render_live_post(self, live_post: Dict, keyword: str, event: Dict) -> None:
+        """Render a post that is still being generated from its latest stream event"""
+        if event['type'] == 'partial':
+            live_post['sections'] = event['sections']
+        else:
+            live_post['status'] = event['message']
+        sections = live_post.get('sections')
+        with live_post['view'].container():
+            st.caption(f"⏳ {keyword}: {live_post.get('status', 'Writing...')}")
+            if sections:
+                st.markdown(f"### {sections['title'] or keyword}")
+                if sections['excerpt']:
+                    st.markdown(f"*{sections['excerpt']}*")
+                st.markdown(sections['content'], unsafe_allow_html=True)
+
+    def render_batch_section(self):
+        """Queue selected keywords as an overnight OpenAI batch and import finished batches"""
+        batch_generator = BatchGenerator(self.content_generator)
+        with st.expander("🌙 Overnight batch generation"):
+            st.caption("Batches cost less and are not rate limited, but take up to 24 hours. "
+                       "Search results are gathered up front instead of by the model.")
+            if st.button("Queue Selected Keywords as a Batch"):
+                selected_keywords = st.session_state.keywords_df[st.session_state.keywords_df['Selected']]
+                if len(selected_keywords) == 0:
+                    st.warning("⚠️ Please select at least one keyword")
+                else:
+                    try:
+                        jobs = [(row['query'], dict(row)) for _, row in selected_keywords.iterrows()]
+                        with st.spinner(f"🔎 Researching {len(jobs)} keywords and submitting the batch..."):
+                            state = batch_generator.submit(batch_generator.prepare(jobs))
+                        st.success(f"✅ Submitted batch {state['name']} with {len(jobs)} keywords")
+                    except Exception as e:
+                        st.error(f"Error submitting batch: {str(e)}")
+
+            for state in batch_generator.list_batches():
+                col1, col2 = st.columns([3, 1])
+                col1.write(f"**{state['name']}**: {len(state['jobs'])} keywords, {state['status']}")
+                if state['ingested']:
+                    report = state['ingest_report']
+                    col2.caption(f"Imported {report['saved']} posts, {len(report['failed'])} failed")
+                elif state['batch_id'] and col2.button("Check & Import", key=f"batch_{state['name']}"):
+                    try:
+                        state = batch_generator.refresh(state)
+                        if state['status'] == 'completed':
+                            with st.spinner("📥 Importing batch posts..."):
+                                report = batch_generator.ingest(state, self.save_generated_post, finish=self.post_finisher.finish)
+                            st.session_state.saved_posts_df = self.load_saved_posts()
+                            st.success(f"✅ Imported {report['saved']} posts from batch {state['name']}")
+                        else:
+                            st.info(f"Batch {state['name']} is {state['status']}")
+                    except Exception as e:
+                        st.error(f"Error importing batch {state['name']}: {str(e)}")
+
+    def start_compaction(self):
+        """Apply the storage retention policy on a background thread"""
+        report = st.session_state.compaction_report
+        self.df_storage.compact_in_background(
+            RetentionPolicy(**STORAGE_RETENTION),
+            on_done=report.update
+        )
+
+    def migrate_generated_posts(self):
+        """Import the legacy generated-posts DataFrame into the post store once"""
+        try:
+            if self.post_store.count() == 0:
+                latest_df_id = self.df_storage.latest(type="generated_posts")
+                if latest_df_id:
+                    self.post_store.import_dataframe(self.df_storage.get_dataframe(latest_df_id))
+        except Exception as e:
+            st.error(f"Error migrating saved posts: {str(e)}")
+
     def save_generated_post(self, post: Dict):
-        """Save a generated post to the database"""
+        """Save a generated post to the database, unless it is a near-duplicate"""
+        if post.get('duplicate_of'):
+            st.warning(f"⚠️ {self.post_finisher.describe_duplicate(post)}")
+            return False
         try:
-            # Create a DataFrame with the post data
-            post_data = {
-                "Selected": False,
-                "Keyword": post["keyword"],
-                "Title": post["title"],
-                "Excerpt": post["excerpt"],
-                "Content": post["content"],
-                "Image": post.get("image"),
-                "Intent": post.get("intent", ""),
-                "Volume": post.get("volume", 0),
-                "Frequent Word": post.get("frequent_word", ""),
-                "Tab": post.get("tab", ""),
-                "Status": "pending",
-                "Generated Date": datetime.now().isoformat()
-            }
-            
-            df = pd.DataFrame([post_data])
-            
-            # Query for existing posts DataFrame
-            posts_dfs = self.df_storage.query_by_metadata({"type": "generated_posts"})
-            
-            if posts_dfs:
-                # Get the most recent DataFrame
-                latest_df_id = posts_dfs[-1]
-                existing_df = self.df_storage.get_dataframe(latest_df_id)
-                
-                # Append new post
-                combined_df = pd.concat([existing_df, df]).reset_index(drop=True)
-                
-                # Update existing DataFrame
-                self.df_storage.update_dataframe(
-                    latest_df_id,
-                    combined_df,
-                    "Added new generated post"
-                )
-            else:
-                # Create new DataFrame
-                df_id = self.df_storage.add_dataframe(
-                    df=df,
-                    source="generated_posts",
-                    metadata={
-                        "type": "generated_posts",
-                        "date": datetime.now().isoformat()
-                    }
-                )
-                
+            self.post_finisher.save(post)
             return True
         except Exception as e:
             st.error(f"Error saving generated post: {str(e)}")
@@ -138,45 +243,19 @@ class BlogAutomationApp:
     def load_saved_posts(self):
         """Load saved posts from storage"""
         try:
-            # Query for posts dataframes
-            posts_dfs = self.df_storage.query_by_metadata({"type": "generated_posts"})
-            if posts_dfs:
-                # Get the most recent DataFrame
-                latest_df_id = posts_dfs[-1]
-                df = self.df_storage.get_dataframe(latest_df_id)
-                return df
-            return pd.DataFrame()
+            # Query the post store, without the heavy post bodies
+            return self.post_store.posts_dataframe(columns=SAVED_POSTS_GRID_COLUMNS)
         except Exception as e:
             st.error(f"Error loading saved posts: {str(e)}")
             return pd.DataFrame()
 
-    def process_lowfruits_file(self, uploaded_file) -> List[Dict]:
-        """Process a single lowfruits.io Excel or CSV file."""
+    def process_lowfruits_file(self, uploaded_file, seen: set, stats: ImportStats) -> pd.DataFrame:
+        """Process a single lowfruits.io Excel or CSV file, skipping queries in ``seen``."""
         try:
-            # Determine file type and read accordingly
-            if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file)
-            else:  # xlsx
-                df = pd.read_excel(uploaded_file)
-            
-            # Convert column names to lowercase
-            df.columns = df.columns.str.lower()
-            
-            # Extract relevant columns
-            keywords_data = []
-            for _, row in df.iterrows():
-                keyword_info = {
-                    'query': row['query'],
-                    'tab': row['tab'],
-                    'intent': row['intent'] if 'intent' in df.columns else None,
-                    'volume': row['volume'] if 'volume' in df.columns else 0,
-                    'frequent_word': row['frequent word'] if 'frequent word' in df.columns else ''
-                }
-                keywords_data.append(keyword_info)
-            return keywords_data
+            return read_keyword_file(uploaded_file, seen=seen, stats=stats)
         except Exception as e:
             st.error(f"Error processing file {uploaded_file.name}: {str(e)}")
-            return []
+            return pd.DataFrame(columns=KEYWORD_COLUMNS)
 
     def create_interface(self):
         st.title("Shopify Blog Post Automation Tool")
@@ -192,6 +271,10 @@ class BlogAutomationApp:
             st.session_state.editor_key = 0
         if 'saved_posts_df' not in st.session_state:
             st.session_state.saved_posts_df = self.load_saved_posts()
+        if 'compaction_report' not in st.session_state:
+            # Prune old versions once per session, off the request path
+            st.session_state.compaction_report = {}
+            self.start_compaction()
 
         # Create main tabs
         main_tab1, main_tab2, main_tab3 = st.tabs(["Blog Post Generation", "Saved Posts", "Settings"])
@@ -219,28 +302,37 @@ class BlogAutomationApp:
                     
                     if st.button("Process Lowfruits Files"):
                         with st.spinner("Processing keyword files..."):
-                            temp_df = pd.DataFrame()
+                            existing_df = st.session_state.keywords_df
+                            seen = set(existing_df['query']) if 'query' in existing_df.columns else set()
+                            stats = ImportStats()
+                            frames = []
                             for file in uploaded_files:
                                 st.write(f"Processing {file.name}...")
-                                keywords = self.process_lowfruits_file(file)
-                                temp_df = pd.concat([temp_df, pd.DataFrame(keywords)])
+                                frames.append(self.process_lowfruits_file(file, seen, stats))
+                            temp_df = pd.concat(frames, ignore_index=True)
                             
                             # Add selection column and update session state
                             temp_df.insert(0, 'Selected', False)
                             
-                            # Append to existing DataFrame if it exists
-                            if not st.session_state.keywords_df.empty:
-                                combined_df = pd.concat([
-                                    st.session_state.keywords_df,
-                                    temp_df
-                                ]).drop_duplicates(subset=['query']).reset_index(drop=True)
+                            # Append to existing DataFrame if it exists; duplicates were skipped on import
+                            if not existing_df.empty:
+                                combined_df = pd.concat([existing_df, temp_df], ignore_index=True)
                             else:
                                 combined_df = temp_df
                             
-                            st.session_state.keywords_df = combined_df
+                            st.session_state.keywords_df = self.flag_cannibalization(combined_df)
+                            st.session_state.import_stats = stats
                             self.save_keywords_df(combined_df, "Added new keywords from Lowfruits")
                             st.rerun()
 
+                if 'import_stats' in st.session_state:
+                    stats = st.session_state.import_stats
+                    st.caption(
+                        f"Last import: {stats.rows_imported:,} new keywords from {stats.rows_read:,} rows "
+                        f"({stats.skipped:,} duplicates or blank skipped) in {stats.seconds:.1f}s, "
+                        f"{stats.rows_per_second:,.0f} rows/s"
+                    )
+
             # Show keywords DataFrame with delete functionality
             if not st.session_state.keywords_df.empty:
                 st.markdown("---")
@@ -257,6 +349,10 @@ class BlogAutomationApp:
                         "Delete",
                         help="Mark for deletion",
                         default=False
+                    ),
+                    "Cannibalizes": st.column_config.TextColumn(
+                        "Cannibalizes",
+                        help="Saved post, published article or earlier keyword this keyword targets too"
                     )
                 }
                 
@@ -270,7 +366,7 @@ class BlogAutomationApp:
                     hide_index=True,
                     use_container_width=True,
                     column_config=column_config,
-                    disabled=["query", "tab", "intent", "volume", "frequent_word"],
+                    disabled=["query", "tab", "intent", "volume", "frequent_word", "Cannibalizes"],
                     key=f"keyword_editor_{st.session_state.editor_key}"
                 )
 
@@ -292,6 +388,15 @@ class BlogAutomationApp:
                 st.markdown("---")  # Add separator
                 st.subheader("Keywords for Processing")
                 
+                st.number_input(
+                    "Posts to generate in parallel",
+                    min_value=1,
+                    max_value=16,
+                    value=GENERATION_CONCURRENCY,
+                    key="generation_concurrency",
+                    help="API calls are still throttled by the per-provider rate limits"
+                )
+
                 # Create a container for the buttons
                 button_container = st.container()
                 
@@ -321,6 +426,15 @@ class BlogAutomationApp:
                             if len(selected_keywords) == 0:
                                 st.warning("⚠️ Please select at least one keyword")
                             else:
+                                # Check against posts generated since the flags were computed, too
+                                conflicts = self.cannibalization_index().flag_keywords(selected_keywords['query'])
+                                conflicts = conflicts[conflicts != ""]
+                                if not conflicts.empty:
+                                    st.warning(
+                                        f"⚠️ {len(conflicts)} selected keywords overlap existing content: " + "; ".join(
+                                            f"{selected_keywords.loc[i, 'query']} → {conflicts[i]}" for i in conflicts.index[:5]
+                                        ) + ("; ..." if len(conflicts) > 5 else "")
+                                    )
                                 st.write(f"🎯 Generating posts for {len(selected_keywords)} keywords")
                                 
                                 # Create progress containers with improved layout
@@ -332,50 +446,45 @@ class BlogAutomationApp:
                                 posts_container = st.container()
                                 total_keywords = len(selected_keywords)
 
-                                # Create a container for displaying generated posts
-                                for index, row in selected_keywords.iterrows():
+                                # Generate posts in parallel, rendering each one as it is written
+                                jobs = [(row['query'], dict(row)) for _, row in selected_keywords.iterrows()]
+                                concurrency = st.session_state.get('generation_concurrency', GENERATION_CONCURRENCY)
+                                status_text.text(f"🔄 Generating {total_keywords} posts, {concurrency} at a time")
+                                progress_bar.progress(0.0)
+                                events = self.content_generator.stream_posts_concurrently(
+                                    jobs, max_workers=concurrency, finish=self.post_finisher.finish,
+                                    first_variants=self.post_store.start_attempts([k for k, _ in jobs])
+                                )
+                                live_posts = {}
+                                done = 0
+                                for job_index, event in events:
+                                    keyword = jobs[job_index][0]
+                                    if event['type'] != 'post':
+                                        if job_index not in live_posts:
+                                            live_posts[job_index] = {'view': posts_container.empty()}
+                                        self.render_live_post(live_posts[job_index], keyword, event)
+                                        continue
+
+                                    # The post is finished; replace its live view with the saved post
+                                    done += 1
+                                    post = event['post']
+                                    if job_index in live_posts:
+                                        live_posts[job_index]['view'].empty()
                                     try:
-                                        # Ensure safe division for progress calculation
-                                        current_progress = min(1.0, max(0.0, float(index) / float(total_keywords))) if total_keywords > 0 else 0.0
-                                        status_text.text(f"🔄 Processing: {row['query']} ({index + 1}/{total_keywords})")
-                                        progress_bar.progress(current_progress)
-                                        
-                                        # Generate post using content_generator
-                                        post = self.content_generator.generate_post(row['query'], dict(row))
-                                        
                                         if post:
-                                            # Initialize image as None
-                                            post['image'] = None
-                                            
-                                            try:
-                                                with st.spinner("Generating image..."):
-                                                    image_prompt = self.image_handler.generate_image_prompt(
-                                                        query=post['keyword'],
-                                                        intent=row.get('intent', ''),
-                                                        excerpt=post.get('excerpt', '')
-                                                    )
-                                                    
-                                                    if not image_prompt:
-                                                        st.warning("⚠️ Failed to generate image prompt, continuing without image")
-                                                    else:
-                                                        st.info(f"ℹ️ Generated prompt: {image_prompt}")
-                                                        
-                                                        image_url = self.image_handler.fetch_image(image_prompt)
-                                                        if not image_url or image_url.startswith("Error:"):
-                                                            st.warning(f"⚠️ Image generation failed: {image_url}, continuing without image")
-                                                        else:
-                                                            post['image'] = image_url
-                                                            st.success("✅ Image generated successfully")
-                                            except Exception as img_error:
-                                                st.warning(f"⚠️ Image generation error: {str(img_error)}, continuing without image")
+                                            image_warning = post.pop('image_warning', None)
+                                            if image_warning:
+                                                st.warning(f"⚠️ {keyword}: {image_warning}")
                                             
                                             # Save post to database
                                             if self.save_generated_post(post):
                                                 # Refresh saved posts immediately
                                                 st.session_state.saved_posts_df = self.load_saved_posts()
                                                 
-                                                # Add to session state
-                                                st.session_state.generated_posts.append(post)
+                                                # Add to session state, without the body; it is reloaded on open
+                                                st.session_state.generated_posts.append(
+                                                    {key: value for key, value in post.items() if key != "content"}
+                                                )
                                                 
                                                 # Show post in UI with improved layout
                                                 with posts_container:
@@ -395,30 +504,27 @@ class BlogAutomationApp:
                                                         if st.button("📤 Upload Now", key=button_key, type="primary"):
                                                             try:
                                                                 with st.spinner("📡 Uploading to Shopify..."):
+                                                                    upload_started = time.monotonic()
                                                                     result = asyncio.run(self.shopify_uploader.upload_post(post))
+                                                                    self.post_store.record_metrics(
+                                                                        post["id"], upload_seconds=round(time.monotonic() - upload_started, 3)
+                                                                    )
                                                                     st.session_state[f"upload_status_{button_key}"] = {
                                                                         "success": True,
                                                                         "message": f"✨ {result}"
                                                                     }
                                                                     
-                                                                    # Update status in saved posts
-                                                                    mask = st.session_state.saved_posts_df["Title"] == post["title"]
-                                                                    st.session_state.saved_posts_df.loc[mask, "Status"] = "uploaded"
-                                                                    
                                                                     # Save updated status
-                                                                    self.df_storage.update_dataframe(
-                                                                        self.df_storage.query_by_metadata({"type": "generated_posts"})[-1],
-                                                                        st.session_state.saved_posts_df,
-                                                                        "Updated post status after upload"
-                                                                    )
+                                                                    self.post_store.update_status(post["id"], "uploaded")
+                                                                    st.session_state.saved_posts_df.loc[post["id"], "Status"] = "uploaded"
                                                             except Exception as upload_error:
                                                                 st.session_state[f"upload_status_{button_key}"] = {
                                                                     "success": False,
                                                                     "message": f"❌ Upload failed: {str(upload_error)}"
                                                                 }
                                                                 # Update status in saved posts
-                                                                mask = st.session_state.saved_posts_df["Title"] == post["title"]
-                                                                st.session_state.saved_posts_df.loc[mask, "Status"] = f"failed: {str(upload_error)}"
+                                                                self.post_store.update_status(post["id"], f"failed: {str(upload_error)}")
+                                                                st.session_state.saved_posts_df.loc[post["id"], "Status"] = f"failed: {str(upload_error)}"
                                                         
                                                         # Display upload status if available
                                                         if st.session_state[f"upload_status_{button_key}"]:
@@ -427,29 +533,28 @@ class BlogAutomationApp:
                                                                 st.success(status["message"])
                                                             else:
                                                                 st.error(status["message"])
-                                                
-                                                # Force UI refresh
-                                                st.experimental_rerun()
 
                                         else:
-                                            st.error(f"❌ Failed to generate post for: {row['query']}")
+                                            st.error(f"❌ Failed to generate post for: {keyword}")
 
                                     except Exception as e:
-                                        st.error(f"⚠️ Error processing {row['query']}: {str(e)}")
+                                        st.error(f"⚠️ Error processing {keyword}: {str(e)}")
 
-                                    # Update final progress
-                                    current_progress = min(1.0, max(0.0, float(index + 1) / float(total_keywords)))
-                                    progress_bar.progress(current_progress)
-                                    status_text.text(f"📊 Processed {index + 1} of {total_keywords} keywords")
+                                    progress_bar.progress(done / total_keywords)
+                                    status_text.text(f"📊 Processed {done} of {total_keywords} keywords")
 
                                 status_text.text("🎉 Processing complete!")
                                 progress_bar.progress(1.0)
                                 
-                                # Refresh saved posts
+                                # Refresh saved posts, and the flags of the keywords that now have posts
                                 st.session_state.saved_posts_df = self.load_saved_posts()
+                                st.session_state.keywords_df.loc[selected_keywords.index, 'Cannibalizes'] = \
+                                    self.cannibalization_index().flag_keywords(selected_keywords['query'])
                         except Exception as e:
                             st.error(f"⚠️ Error in post generation process: {str(e)}")
 
+                self.render_batch_section()
+
         with main_tab2:
             st.header("Saved Posts")
             
@@ -481,53 +586,78 @@ class BlogAutomationApp:
                     hide_index=True,
                     use_container_width=True,
                     column_config=column_config,
-                    disabled=["Keyword", "Title", "Excerpt", "Content", "Image", "Intent", "Volume", "Frequent Word", "Tab", "Generated Date"],
+                    disabled=["Keyword", "Title", "Excerpt", "Content", "Image", "Intent", "Volume", "Frequent Word", "Tab", "Status", "Generated Date"],
                     key="saved_posts_editor"
                 )
                 
-                # Handle selection changes
-                if not edited_df.equals(st.session_state.saved_posts_df):
+                # Handle selection changes, saving only the rows that changed
+                changed = edited_df["Selected"] != st.session_state.saved_posts_df["Selected"]
+                if changed.any():
+                    self.post_store.set_selected(edited_df.loc[changed, "Selected"].to_dict())
                     st.session_state.saved_posts_df = edited_df
-                    self.df_storage.update_dataframe(
-                        self.df_storage.query_by_metadata({"type": "generated_posts"})[-1],
-                        edited_df,
-                        "Updated post selection"
-                    )
                 
+                # Open a single post, loading its body from the blob store
+                saved_posts_df = st.session_state.saved_posts_df
+                open_post_id = st.selectbox(
+                    "Open post",
+                    saved_posts_df.index,
+                    index=None,
+                    format_func=lambda post_id: saved_posts_df.loc[post_id, "Title"],
+                    placeholder="Choose a post to read"
+                )
+                if open_post_id is not None:
+                    opened_post = self.post_store.get_post(open_post_id)
+                    with st.expander(opened_post["title"], expanded=True):
+                        st.caption(opened_post["excerpt"])
+                        if opened_post.get("title_variants"):
+                            st.markdown("**Headline variants:**\n" + "\n".join(
+                                f"- {title}" for title in opened_post["title_variants"]))
+                        st.markdown(opened_post["content"], unsafe_allow_html=True)
+
                 # Upload button for selected posts
                 if st.button("📤 Upload Selected Posts", type="primary"):
                     selected_posts = st.session_state.saved_posts_df[st.session_state.saved_posts_df['Selected']]
                     if len(selected_posts) == 0:
                         st.warning("⚠️ Please select at least one post to upload")
                     else:
-                        for _, post in selected_posts.iterrows():
+                        for post_id, post in selected_posts.iterrows():
                             try:
                                 with st.spinner(f"📡 Uploading: {post['Title']}"):
+                                    # Load the post body and excerpt only now that they are needed
+                                    stored_post = self.post_store.get_post(post_id)
+                                    published = [
+                                        (other_id, score) for other_id, score
+                                        in self.post_store.find_near_duplicates(stored_post["content"], exclude=post_id)
+                                        if other_id in st.session_state.saved_posts_df.index
+                                        and st.session_state.saved_posts_df.loc[other_id, "Status"] == "uploaded"
+                                    ]
+                                    if published:
+                                        other_id, score = published[0]
+                                        st.warning(f"⚠️ Not uploading {post['Title']}: {score:.0%} similar to already "
+                                                   f"uploaded '{st.session_state.saved_posts_df.loc[other_id, 'Title']}'")
+                                        continue
                                     post_dict = {
                                         "keyword": post["Keyword"],
                                         "title": post["Title"],
-                                        "excerpt": post["Excerpt"],
-                                        "content": post["Content"],
+                                        "excerpt": stored_post["excerpt"],
+                                        "content": stored_post["content"],
                                         "image": post["Image"]
                                     }
+                                    upload_started = time.monotonic()
                                     result = asyncio.run(self.shopify_uploader.upload_post(post_dict))
+                                    self.post_store.record_metrics(
+                                        post_id, upload_seconds=round(time.monotonic() - upload_started, 3)
+                                    )
                                     st.success(f"✨ {result}")
                                     
-                                    # Update status in DataFrame
-                                    mask = st.session_state.saved_posts_df["Title"] == post["Title"]
-                                    st.session_state.saved_posts_df.loc[mask, "Status"] = "uploaded"
+                                    # Update status of this post
+                                    self.post_store.update_status(post_id, "uploaded")
+                                    st.session_state.saved_posts_df.loc[post_id, "Status"] = "uploaded"
                             except Exception as e:
                                 st.error(f"❌ Failed to upload {post['Title']}: {str(e)}")
-                                # Update status in DataFrame
-                                mask = st.session_state.saved_posts_df["Title"] == post["Title"]
-                                st.session_state.saved_posts_df.loc[mask, "Status"] = f"failed: {str(e)}"
-                        
-                        # Save updated status
-                        self.df_storage.update_dataframe(
-                            self.df_storage.query_by_metadata({"type": "generated_posts"})[-1],
-                            st.session_state.saved_posts_df,
-                            "Updated post status after upload"
-                        )
+                                # Update status of this post
+                                self.post_store.update_status(post_id, f"failed: {str(e)}")
+                                st.session_state.saved_posts_df.loc[post_id, "Status"] = f"failed: {str(e)}"
             else:
                 st.info("No saved posts found. Generate some posts in the Blog Post Generation tab!")
 
@@ -535,8 +665,81 @@ class BlogAutomationApp:
             st.header("Settings")
             # Add any global settings here
 
-    def generate_posts(self, persona: str, keyword: str, num_posts: int, keyword_data: Dict = None):
-        """Generate blog posts with additional keyword data"""
+            st.subheader("Storage")
+            report = st.session_state.compaction_report
+            if report:
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Versions removed", report['versions_removed'])
+                col2.metric("Space reclaimed", f"{report['bytes_reclaimed'] / 1e6:.1f} MB")
+                col3.metric(
+                    "Load time",
+                    f"{report['load_seconds_after']:.2f}s",
+                    f"{report['load_seconds_after'] - report['load_seconds_before']:.2f}s",
+                    delta_color="inverse"
+                )
+            else:
+                st.info("No compaction has finished in this session yet.")
+            st.caption(f"Retention policy: {STORAGE_RETENTION}")
+            if st.button("🧹 Compact storage now"):
+                self.start_compaction()
+                st.info("Compaction started in the background.")
+
+            st.subheader("LLM response cache")
+            llm_stats = get_completion_cache().stats()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Mode", llm_stats['mode'])
+            col2.metric("Hit rate", f"{llm_stats['hit_rate']:.0%}")
+            col3.metric("Size", f"{llm_stats['bytes'] / 1e6:.1f} MB")
+
+            st.subheader("URL validation cache")
+            url_stats = get_url_validation_cache().stats()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Cached URLs", url_stats['entries'])
+            col2.metric("Hit rate", f"{url_stats['hit_rate']:.0%}")
+            col3.metric("Validation requests", url_stats['misses'])
+
+            st.subheader("Search result cache")
+            search_stats = get_search_cache().stats()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Cached searches", search_stats['entries'])
+            col2.metric("Hit rate", f"{search_stats['hit_rate']:.0%}")
+            col3.metric("Google searches", search_stats['misses'])
+
+            st.subheader("Generation metrics")
+            summary = summarize_metrics(self.post_store.post_metrics())
+            if summary['posts']:
+                def seconds(value):
+                    return f"{value:.1f}s" if value is not None else "–"
+
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Latency p50", seconds(summary['wall_p50']))
+                col2.metric("Latency p95", seconds(summary['wall_p95']))
+                col3.metric("Cost per post", f"${summary['cost_per_post'] or 0:.3f}")
+                col4.metric("Tokens per post", f"{summary['tokens_per_post'] or 0:,.0f}")
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Image p50", seconds(summary['image_p50']))
+                col2.metric("Upload p50", seconds(summary['upload_p50']))
+                col3.metric("Upload p95", seconds(summary['upload_p95']))
+                col4.metric("Prompt tokens p95", f"{summary['prompt_tokens_p95'] or 0:,.0f}")
+                st.caption(f"Over {summary['posts']} posts; "
+                           f"{summary['tool_calls_per_post'] or 0:.1f} tool calls per post, "
+                           f"tool time p95 {seconds(summary['tool_seconds_p95'])}. "
+                           "Cost excludes responses served from the LLM cache.")
+                if summary['links_per_post'] is not None:
+                    st.caption(f"Links: {summary['links_per_post']:.1f} per post, of which "
+                               f"{summary['repaired_links_per_post']:.1f} were repaired and "
+                               f"{summary['stripped_links_per_post']:.1f} removed as dead.")
+            else:
+                st.info("No post metrics recorded yet.")
+
+    def generate_posts(self, persona: str, keyword: str, num_posts: int, keyword_data: Dict = None,
+                       headline_only: bool = False):
+        """Generate blog posts with additional keyword data
+
+        Several posts for one keyword share a single research pass and
+        completion; with ``headline_only`` one post is written with
+        ``num_posts`` alternative titles for A/B tests.
+        """
         try:
             st.write(f"Starting generation for keyword: {keyword}")
             content_generator = ContentGenerator(persona, test_mode=self.test_mode)
@@ -548,24 +751,27 @@ class BlogAutomationApp:
             
             st.write("Generating content...")
             generated_posts = []
-            for _ in range(num_posts):
-                post = content_generator.generate_post(keyword, keyword_data)
-                if post:  # Only add if post generation was successful
-                    # Add images to post
-                    try:
-                        image_prompt = self.image_handler.generate_image_prompt(
-                            query=post['keyword'],
-                            intent=keyword_data.get('intent', ''),
-                            excerpt=post.get('excerpt', '')
-                        )
-                        st.write(f"Generated image prompt: {image_prompt}")
-                        
-                        post['image'] = self.image_handler.fetch_image(image_prompt)
-                        st.write("✅ Image fetched successfully")
-                    except Exception as img_error:
-                        st.error(f"Error fetching image: {str(img_error)}")
-                        post['image'] = None
-                    
+            attempts = 1 if headline_only else num_posts
+            variant = self.post_store.start_attempts([keyword] * attempts)[keyword]
+            if num_posts > 1:
+                posts = content_generator.generate_variants(keyword, keyword_data, num_posts, headline_only,
+                                                            variant)
+                with ThreadPoolExecutor(max_workers=max(1, len(posts)), thread_name_prefix="finish") as pool:
+                    list(pool.map(lambda post: self.post_finisher.finish(post, keyword_data), posts))
+                results = enumerate(posts)
+            else:
+                results = content_generator.generate_posts_concurrently([(keyword, keyword_data)],
+                                                                        finish=self.post_finisher.finish,
+                                                                        first_variants={keyword: variant})
+            for _, post in results:
+                if post and post.get('duplicate_of'):
+                    st.warning(f"⚠️ {self.post_finisher.describe_duplicate(post)}")
+                elif post:  # Only add if post generation was successful
+                    # These posts are not saved to the post store, so they do not keep their index entry
+                    self.post_store.release_claim(post)
+                    image_warning = post.pop('image_warning', None)
+                    if image_warning:
+                        st.error(f"Error fetching image: {image_warning}")
                     generated_posts.append(post)
                     st.write(f"✅ Generated post {len(generated_posts)}")
                 else:
@@ -591,8 +797,9 @@ class BlogAutomationApp:
                 "Selected": True,
                 "Keyword": post["keyword"],
                 "Title": post["title"],
-                "Excerpt": post["excerpt"],
-                "Content": post["content"],
+                # Frames reference bodies by digest instead of repeating them in every version
+                "Excerpt": self.blob_store.put(post["excerpt"]),
+                "Content": self.blob_store.put(post["content"]),
                 "Image": post["image"],
                 "Intent": post.get("intent", ""),
                 "Volume": post.get("volume", 0),
@@ -641,8 +848,8 @@ class BlogAutomationApp:
                 post = {
                     "keyword": row["Keyword"],
                     "title": row["Title"],
-                    "excerpt": row["Excerpt"],
-                    "content": row["Content"],
+                    "excerpt": self.blob_store.resolve(row["Excerpt"]),
+                    "content": self.blob_store.resolve(row["Content"]),
                     "image": row["Image"]
                 }
                 selected_posts.append(post)
@@ -0,0 +1,303 @@
+import argparse
+import io
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from config.config import GENERATION_CONCURRENCY, BATCH_POLL_SECONDS, BATCH_PRICE_FACTOR
+from modules.content_generator import ContentGenerator
+from modules.post_metrics import PostMetrics
+from modules.tag_stream import TagStreamParser
+
+# Batch statuses after which a batch no longer changes
+FINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+class BatchGenerator:
+    """Generates posts offline through the OpenAI Batch API.
+
+    A batch goes through ``prepare`` (research every keyword and write one
+    chat completion request per keyword to a JSONL file), ``submit``,
+    ``refresh``/``wait`` (poll until the batch is done) and ``ingest`` (parse
+    the responses into posts). Batch requests cannot call tools, so search
+    results are precomputed and given to the model in the prompt.
+
+    Each batch is a directory under ``work_dir`` holding the request file
+    and a ``state.json`` with the batch ID and the keyword of every request,
+    so a batch submitted in the evening can be ingested by another process
+    the next morning.
+    """
+
+    def __init__(self, content_generator: ContentGenerator, work_dir: str = "data/batches",
+                 model: str = "gpt-4"):
+        self.generator = content_generator
+        self.client = content_generator.client
+        self.work_dir = Path(work_dir)
+        self.model = model
+        self.logger = logging.getLogger(__name__)
+
+    def _state_path(self, name: str) -> Path:
+        return self.work_dir / name / "state.json"
+
+    def load_state(self, name: str) -> Dict:
+        with open(self._state_path(name), 'r') as f:
+            return json.load(f)
+
+    def save_state(self, state: Dict) -> None:
+        path = self._state_path(state['name'])
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, 'w') as f:
+            json.dump(state, f, indent=2, default=str)
+        os.replace(temp_path, path)
+
+    def list_batches(self) -> List[Dict]:
+        """Get the state of every batch, newest first."""
+        states = []
+        for path in self.work_dir.glob("*/state.json"):
+            try:
+                states.append(self.load_state(path.parent.name))
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Skipping unreadable batch state {path}: {str(e)}")
+        return sorted(states, key=lambda state: state['created_at'], reverse=True)
+
+    def _research(self, keyword: str) -> List[Dict]:
+        try:
+            return self.generator.research_sources(keyword)
+        except Exception as e:
+            self.logger.error(f"Error researching {keyword}, writing without sources: {str(e)}")
+            return []
+
+    def prepare(self, jobs: List[Tuple[str, Dict]], max_workers: int = GENERATION_CONCURRENCY) -> Dict:
+        """Research (keyword, keyword_data) jobs and write their batch request file.
+
+        Returns the new batch state; nothing is sent to OpenAI yet.
+        """
+        name = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        batch_dir = self.work_dir / name
+        batch_dir.mkdir(parents=True, exist_ok=False)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="batch-research") as pool:
+            sources = list(pool.map(self._research, [keyword for keyword, _ in jobs]))
+
+        requests_file = batch_dir / "requests.jsonl"
+        state_jobs = {}
+        with open(requests_file, 'w') as f:
+            for i, ((keyword, keyword_data), job_sources) in enumerate(zip(jobs, sources)):
+                custom_id = f"post-{i:05d}"
+                keyword_data = keyword_data or {}
+                f.write(json.dumps({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": {
+                        "model": self.model,
+                        "messages": self.generator.build_messages(keyword, keyword_data, job_sources),
+                        "temperature": 0.7,
+                        "max_tokens": 2000
+                    }
+                }, default=str) + "\n")
+                state_jobs[custom_id] = {'keyword': keyword, 'keyword_data': keyword_data,
+                                         'sources': len(job_sources)}
+
+        state = {
+            'name': name,
+            'created_at': datetime.now().isoformat(),
+            'requests_file': str(requests_file),
+            'status': 'prepared',
+            'batch_id': None,
+            'output_file_id': None,
+            'error_file_id': None,
+            'ingested': False,
+            'jobs': state_jobs
+        }
+        self.save_state(state)
+        self.logger.info(f"Prepared batch {name} with {len(jobs)} requests")
+        return state
+
+    def submit(self, state: Dict) -> Dict:
+        """Upload a prepared request file and create the batch."""
+        with open(state['requests_file'], 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+            metadata={"source": "beast-blogger", "name": state['name']}
+        )
+        state.update(batch_id=batch.id, status=batch.status, submitted_at=datetime.now().isoformat())
+        self.save_state(state)
+        self.logger.info(f"Submitted batch {state['name']} as {batch.id}")
+        return state
+
+    def refresh(self, state: Dict) -> Dict:
+        """Poll the batch once and record its status and result files."""
+        batch = self.client.batches.retrieve(state['batch_id'])
+        counts = batch.request_counts
+        state.update(
+            status=batch.status,
+            output_file_id=batch.output_file_id,
+            error_file_id=batch.error_file_id,
+            request_counts=counts.model_dump() if counts is not None else None
+        )
+        self.save_state(state)
+        return state
+
+    def wait(self, state: Dict, poll_interval: float = BATCH_POLL_SECONDS,
+             timeout: Optional[float] = None) -> Dict:
+        """Poll until the batch reaches a final status or ``timeout`` seconds pass."""
+        started = time.monotonic()
+        while self.refresh(state)['status'] not in FINAL_STATUSES:
+            if timeout is not None and time.monotonic() - started >= timeout:
+                break
+            time.sleep(poll_interval)
+        return state
+
+    def _read_results(self, file_id: Optional[str]) -> List[Dict]:
+        if not file_id:
+            return []
+        text = self.client.files.content(file_id).text
+        return [json.loads(line) for line in io.StringIO(text) if line.strip()]
+
+    def ingest(self, state: Dict, save: Callable[[Dict], object],
+               finish: Optional[Callable[[Dict, Dict], None]] = None,
+               max_workers: int = GENERATION_CONCURRENCY) -> Dict:
+        """Parse the responses of a completed batch into posts and ``save`` each one.
+
+        ``finish(post, keyword_data)`` runs on a thread pool before saving,
+        as in the interactive engine (e.g. to attach an image); ``save`` runs
+        on the calling thread. Returns counts of saved and failed requests.
+        """
+        if state['status'] != 'completed':
+            raise ValueError(f"Batch {state['name']} is {state['status']}, not completed")
+        if state['ingested']:
+            return state['ingest_report']
+
+        posts, failed = [], []
+        for result in self._read_results(state['output_file_id']) + self._read_results(state['error_file_id']):
+            job = state['jobs'].get(result.get('custom_id'))
+            if job is None:
+                continue
+            try:
+                posts.append((self._parse_result(result, job, state['batch_id']), job['keyword_data']))
+            except Exception as e:
+                self.logger.error(f"Batch request {result.get('custom_id')} ({job['keyword']}) failed: {str(e)}")
+                failed.append(job['keyword'])
+
+        # Check the links of the whole batch at once
+        self.generator.link_verifier.verify_posts([post for post, _ in posts])
+
+        if finish and posts:
+            def run_finish(item):
+                try:
+                    finish(*item)
+                except Exception as e:
+                    self.logger.error(f"Error finishing post for {item[0]['keyword']}: {str(e)}")
+
+            with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="batch-finish") as pool:
+                list(pool.map(run_finish, posts))
+
+        saved = 0
+        for post, _ in posts:
+            if save(post) is not False:
+                saved += 1
+            else:
+                failed.append(post['keyword'])
+
+        state.update(ingested=True, ingest_report={'saved': saved, 'failed': failed})
+        self.save_state(state)
+        return state['ingest_report']
+
+    def _parse_result(self, result: Dict, job: Dict, batch_id: str) -> Dict:
+        """Turn one line of a batch output file into a post, or raise ValueError."""
+        response = result.get('response') or {}
+        if result.get('error') or response.get('status_code') != 200:
+            raise ValueError(str(result.get('error') or response.get('body')))
+        body = response['body']
+        choice = body['choices'][0]
+        parser = TagStreamParser()
+        parser.feed(choice['message']['content'] or "")
+        sections = parser.result()
+        if not sections['title'] or not sections['content']:
+            raise ValueError("Missing required content elements")
+        if 'content' not in parser.closed or choice.get('finish_reason') == 'length':
+            raise ValueError("Response was cut off before the end of the content")
+
+        metrics = PostMetrics(body.get('model', self.model), price_factor=BATCH_PRICE_FACTOR)
+        metrics.add_round(body.get('usage'), 0.0, cached=False)
+        post_metrics = metrics.as_dict()
+        # Batch posts have no meaningful per-post latency
+        post_metrics.update(generation_seconds=None, batch=batch_id)
+        return self.generator.build_post(job['keyword'], job['keyword_data'], sections, post_metrics)
+
+
+def main():
+    """Command line entry point for overnight batches, e.g.::
+
+        python -m modules.batch_generator submit keywords.csv
+        python -m modules.batch_generator ingest 20240101-220000-3fa2c1 --wait
+    """
+    from modules.image_handler import ImageHandler
+    from modules.keyword_import import read_keyword_file
+    from modules.post_finisher import PostFinisher
+    from modules.post_store import PostStore
+
+    parser = argparse.ArgumentParser(description="Generate blog posts through the OpenAI Batch API")
+    parser.add_argument('--persona', default='professional')
+    commands = parser.add_subparsers(dest='command', required=True)
+    submit = commands.add_parser('submit', help="Research keywords from a Lowfruits export and submit a batch")
+    submit.add_argument('keywords_file')
+    submit.add_argument('--limit', type=int, default=None, help="Only the first N keywords")
+    commands.add_parser('list', help="Show all batches")
+    ingest = commands.add_parser('ingest', help="Save the posts of a completed batch to the post store")
+    ingest.add_argument('name')
+    ingest.add_argument('--wait', action='store_true', help="Poll until the batch is done first")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    batches = BatchGenerator(ContentGenerator(args.persona))
+    if args.command == 'submit':
+        keywords = read_keyword_file(args.keywords_file)
+        if args.limit:
+            keywords = keywords.head(args.limit)
+        jobs = [(row['query'], row) for row in keywords.to_dict('records')]
+        state = batches.submit(batches.prepare(jobs))
+        print(f"Submitted batch {state['name']} ({state['batch_id']}) with {len(jobs)} keywords")
+    elif args.command == 'list':
+        for state in batches.list_batches():
+            print(f"{state['name']}  {state['status']:<12} {len(state['jobs'])} keywords"
+                  f"{'  ingested' if state['ingested'] else ''}")
+    else:
+        state = batches.load_state(args.name)
+        state = batches.wait(state) if args.wait else batches.refresh(state)
+        if state['status'] != 'completed':
+            print(f"Batch {state['name']} is {state['status']}")
+            return
+        post_store = PostStore()
+        finisher = PostFinisher(post_store, ImageHandler())
+
+        def save(post: Dict) -> bool:
+            # Same near-duplicate check and image as posts generated in the app
+            try:
+                if finisher.save(post) is not None:
+                    return True
+                print(finisher.describe_duplicate(post))
+            except Exception as e:
+                print(f"Error saving post for {post['keyword']}: {str(e)}")
+            return False
+
+        try:
+            report = batches.ingest(state, save, finish=finisher.finish)
+        finally:
+            post_store.close()
+        print(f"Saved {report['saved']} posts, {len(report['failed'])} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import uuid
+import zlib
+from pathlib import Path
+from typing import Iterator, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Magic bytes at the start of a zstd frame; anything else is read as zlib
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Cell values referencing a blob look like "sha256:<hex digest>"
+DIGEST_PREFIX = "sha256:"
+
+
+def is_digest(value) -> bool:
+    """Check whether a cell value is a blob reference."""
+    return isinstance(value, str) and value.startswith(DIGEST_PREFIX) and len(value) == len(DIGEST_PREFIX) + 64
+
+
+class BlobStore:
+    """Content-addressed store of compressed blobs.
+
+    Blobs are keyed by the SHA-256 of their uncompressed bytes, so identical
+    content is only ever written once. Blobs are compressed with zstd when
+    the ``zstandard`` package is installed and with zlib otherwise; both
+    forms can always be read.
+    """
+
+    def __init__(self, root: Union[str, Path] = "data/blobs", level: int = 6):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.level = level
+
+    def _path(self, digest: str) -> Path:
+        hex_digest = digest[len(DIGEST_PREFIX):] if digest.startswith(DIGEST_PREFIX) else digest
+        return self.root / hex_digest[:2] / hex_digest[2:]
+
+    def _compress(self, data: bytes) -> bytes:
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return zlib.compress(data, self.level)
+
+    def _decompress(self, blob: bytes) -> bytes:
+        if blob.startswith(ZSTD_MAGIC):
+            if zstandard is None:
+                raise ImportError("Reading zstd blobs requires zstandard: pip install zstandard")
+            return zstandard.ZstdDecompressor().decompress(blob)
+        return zlib.decompress(blob)
+
+    def put(self, data: Union[str, bytes]) -> str:
+        """Store data (str is UTF-8 encoded) and return its digest reference."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        digest = DIGEST_PREFIX + hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            # Write under a unique name, then rename, so readers never see a partial blob
+            temp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+            with open(temp_path, 'wb') as f:
+                f.write(self._compress(data))
+            os.replace(temp_path, path)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        """Read the uncompressed bytes of a blob."""
+        with open(self._path(digest), 'rb') as f:
+            return self._decompress(f.read())
+
+    def get_text(self, digest: str) -> str:
+        """Read a blob stored from a str."""
+        return self.get(digest).decode('utf-8')
+
+    def resolve(self, value):
+        """Return the text behind a digest reference, or the value unchanged if it is not one."""
+        return self.get_text(value) if is_digest(value) else value
+
+    def exists(self, digest: str) -> bool:
+        return self._path(digest).exists()
+
+    def size(self, digest: str) -> int:
+        """Get the compressed size of a blob in bytes."""
+        return self._path(digest).stat().st_size
+
+    def delete(self, digest: str) -> None:
+        path = self._path(digest)
+        if path.exists():
+            path.unlink()
+
+    def digests(self) -> Iterator[str]:
+        """Iterate over the digests of all stored blobs."""
+        for path in self.root.glob('??/*'):
+            if not path.name.endswith('.tmp'):
+                yield DIGEST_PREFIX + path.parent.name + path.name
@@ -1,39 +1,122 @@
 from openai import OpenAI
-from typing import Dict, List
-from config.config import PERSONAS, OPENAI_API_KEY
+from openai.types.chat import ChatCompletion
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from config.config import (PERSONAS, OPENAI_API_KEY, GENERATION_CONCURRENCY, MAX_TOOL_ROUNDS,
+                           POST_DEADLINE_SECONDS, POST_WRITE_RESERVE_SECONDS, INTERNAL_LINKS_TOP_K)
 from modules.seo_handler import SEOKeywordTool
-import requests
+from modules.rate_limiter import get_rate_limiter
+from modules.link_cache import get_internal_link_cache
+from modules.link_ranker import get_internal_link_index
+from modules.llm_cache import get_completion_cache
+from modules.tag_stream import TagStreamParser
+from modules.post_metrics import PostMetrics
+from modules.link_verifier import get_link_verifier
 import json
 import logging
 import re
-from bs4 import BeautifulSoup
+import time
+import queue
 
 class ContentGenerator:
     def __init__(self, persona: str, test_mode: bool = False):
         self.persona = PERSONAS.get(persona, PERSONAS['professional'])
         # self.test_mode = test_mode  # Add test mode flag
         self.test_mode = test_mode  # Add test mode flag
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        self.llm_cache = get_completion_cache()
+        # Replay runs are offline and may have no API key configured
+        self.client = OpenAI(api_key=OPENAI_API_KEY or ("replay-only" if self.llm_cache.mode == 'replay' else None))
         self.logger = logging.getLogger(__name__)
         self.seo_tool = SEOKeywordTool()  # Initialize SEOKeywordTool
+        self.openai_limiter = get_rate_limiter('openai')
+        self.link_cache = get_internal_link_cache()
+        self.link_index = get_internal_link_index()
+        self.link_verifier = get_link_verifier()
 
     def check_url(self, url: str) -> bool:
-        """Check if a URL is valid and accessible"""
-        try:
-            response = requests.head(url, timeout=5, allow_redirects=True)
-            return response.status_code == 200
-        except:
-            return False
-
-    def generate_multiple_posts(self, keywords: List[str], keyword_data: List[Dict] = None) -> List[Dict]:
-        """Generate multiple blog posts with keyword data."""
-        posts = []
-        for i, keyword in enumerate(keywords):
-            data = keyword_data[i] if keyword_data else None
-            post = self.generate_post(keyword, data)
-            posts.append(post)
+        """Check if a URL is valid and accessible, via the shared validation cache"""
+        return self.seo_tool.is_url_accessible(url)
+
+    def generate_multiple_posts(self, keywords: List[str], keyword_data: List[Dict] = None,
+                                max_workers: int = GENERATION_CONCURRENCY) -> List[Dict]:
+        """Generate multiple blog posts with keyword data, in parallel; posts keep the keyword order."""
+        jobs = [(keyword, keyword_data[i] if keyword_data else None) for i, keyword in enumerate(keywords)]
+        posts = [None] * len(jobs)
+        for i, post in self.generate_posts_concurrently(jobs, max_workers):
+            posts[i] = post
         return posts
 
+    def generate_posts_concurrently(self, jobs: List[Tuple[str, Dict]], max_workers: int = GENERATION_CONCURRENCY,
+                                    finish: Optional[Callable[[Dict, Dict], None]] = None,
+                                    first_variants: Optional[Dict[str, int]] = None
+                                    ) -> Iterator[Tuple[int, Optional[Dict]]]:
+        """Generate posts for (keyword, keyword_data) jobs on a thread pool.
+
+        Yields (job index, post) as each post completes; see
+        ``stream_posts_concurrently`` for the details.
+        """
+        for i, event in self.stream_posts_concurrently(jobs, max_workers, finish, first_variants):
+            if event['type'] == 'post':
+                yield i, event['post']
+
+    def stream_posts_concurrently(self, jobs: List[Tuple[str, Dict]], max_workers: int = GENERATION_CONCURRENCY,
+                                  finish: Optional[Callable[[Dict, Dict], None]] = None,
+                                  first_variants: Optional[Dict[str, int]] = None
+                                  ) -> Iterator[Tuple[int, Dict]]:
+        """Generate posts for (keyword, keyword_data) jobs on a thread pool, streaming their progress.
+
+        Yields (job index, event) for the ``generate_post_stream`` events of
+        all jobs as they happen; every job ends with one 'post' event, whose
+        post is None if generation failed. ``finish(post, keyword_data)`` runs
+        on the worker before that, e.g. to fetch the post's image. Worker
+        threads must not call Streamlit. API calls are throttled by the
+        shared per-provider rate limiters, and unstarted jobs are cancelled
+        if the caller stops iterating. ``first_variants`` gives the variant
+        number of each keyword's first job (e.g. from
+        ``PostStore.start_attempts``), so a keyword generated again is not
+        answered from the completion cache; it defaults to 0.
+        """
+        events = queue.Queue()
+        pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="post-generation")
+        try:
+            variants = {keyword: first - 1 for keyword, first in (first_variants or {}).items()}
+            for i, (keyword, data) in enumerate(jobs):
+                # Repeated keywords are separate variants, so they are not answered from the same cache entry
+                variant = variants[keyword] = variants.get(keyword, -1) + 1
+                pool.submit(self._stream_job, i, keyword, data, finish, variant, events)
+            remaining = len(jobs)
+            while remaining:
+                i, event = events.get()
+                if event['type'] == 'post':
+                    remaining -= 1
+                yield i, event
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _stream_job(self, index: int, keyword: str, keyword_data: Dict,
+                    finish: Optional[Callable[[Dict, Dict], None]], variant: int, events: queue.Queue) -> None:
+        """Generate one post, forwarding its events to ``events``, and run the ``finish`` step on it."""
+        post = None
+        started = time.monotonic()
+        try:
+            for event in self.generate_post_stream(keyword, keyword_data, variant):
+                if event['type'] == 'post':
+                    post = event['post']
+                else:
+                    events.put((index, event))
+            if post and finish:
+                events.put((index, {'type': 'status', 'message': "Finishing post (image)..."}))
+                try:
+                    finish(post, keyword_data or {})
+                except Exception as e:
+                    self.logger.error(f"Error finishing post for {keyword}: {str(e)}")
+            if post:
+                post.setdefault('metrics', {})['wall_seconds'] = round(time.monotonic() - started, 3)
+        except Exception as e:
+            self.logger.error(f"Error generating post for {keyword}: {str(e)}")
+        finally:
+            events.put((index, {'type': 'post', 'post': post}))
+
     def search_and_validate_urls(self, query: str, num_results: int = 3) -> list:
         """Search for URLs using SERP and validate them"""
         try:
@@ -44,14 +127,14 @@ class ContentGenerator:
             # Get pre-validated URLs from SEOKeywordTool
             urls = self.seo_tool.search_urls(query, num_results)
             
+            # Fetch page metadata for all URLs at once
             valid_urls = []
-            for url in urls:
-                valid_urls.append({
-                    "url": url,
-                    "title": self.seo_tool.get_page_title(url),
-                    "description": self.seo_tool.get_meta_description(url)
-                })
-                self.logger.info(f"✓ Added URL with metadata: {url}")
+            if urls:
+                with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+                    metadata = list(pool.map(self.seo_tool.get_page_metadata, urls))
+                for url, page in zip(urls, metadata):
+                    valid_urls.append({"url": url, **page})
+                    self.logger.info(f"✓ Added URL with metadata: {url}")
             
             self.logger.info(f"Found {len(valid_urls)} valid URLs")
             return valid_urls
@@ -61,18 +144,39 @@ class ContentGenerator:
             self.logger.error("Full error:", exc_info=True)
             return []
 
-    def generate_post(self, keyword: str, keyword_data: Dict = None) -> Dict:
+    def generate_post(self, keyword: str, keyword_data: Dict = None, variant: int = 0) -> Dict:
         """Generate a single blog post using keyword data."""
+        post = None
+        for event in self.generate_post_stream(keyword, keyword_data, variant):
+            if event['type'] == 'post':
+                post = event['post']
+        return post
+
+    def generate_post_stream(self, keyword: str, keyword_data: Dict = None, variant: int = 0,
+                             partial_interval: float = 0.2) -> Iterator[Dict]:
+        """Generate a single blog post, yielding progress events as it is written.
+
+        Events are dicts with a 'type':
+        - 'status': a research step, with a 'message'
+        - 'partial': the title/excerpt/content parsed so far from the streamed
+          response, under 'sections' (at most every ``partial_interval`` seconds)
+        - 'post': the finished post; not yielded if generation failed
+
+        Completions go through the shared completion cache, so re-running an
+        identical generation is free. ``variant`` separates posts that are
+        meant to differ for the same keyword.
+        """
         try:
             if self.test_mode:
                 # Return test content if in test mode
-                return {
+                yield {'type': 'post', 'post': {
                     'keyword': keyword,
                     'title': f"Test Title for {keyword}",
                     'excerpt': f"This is a test excerpt for a blog post about {keyword}.",
                     'content': f"This is a test blog post about {keyword}.",
                     'status': 'generated'
-                }
+                }}
+                return
             # Log function call
             self.logger.info("\n=== Starting Post Generation ===")
             self.logger.info(f"Keyword: {keyword}")
@@ -80,7 +184,7 @@ class ContentGenerator:
 
             if not keyword:
                 self.logger.error("No keyword provided")
-                return None
+                return
 
             # Track function calls
             function_calls = {
@@ -125,9 +229,218 @@ class ContentGenerator:
                 }
             ]
 
-            system_prompt = f"""You are a {self.persona}. 
+            messages = self.build_messages(keyword, keyword_data)
+
+            # The tools API lets the model request several searches per round
+            tools = [{"type": "function", "function": function} for function in functions]
+            deadline = time.monotonic() + POST_DEADLINE_SECONDS
+            rounds = 0
+            metrics = PostMetrics("gpt-4")
+
+            # Process tool calls and generate content
+            while True:
+                remaining = deadline - time.monotonic()
+                # Once out of rounds or research time, the model has to write with what it has
+                allow_tools = rounds < MAX_TOOL_ROUNDS and remaining > POST_WRITE_RESERVE_SECONDS
+                request = {
+                    "model": "gpt-4",
+                    "messages": messages,
+                    "tools": tools,
+                    "tool_choice": "auto" if allow_tools else "none",
+                    "temperature": 0.7,
+                    "max_tokens": 2000
+                }
+                completion = {}
+                parser = TagStreamParser()
+                last_partial = 0.0
+                round_started = time.monotonic()
+                for text in self._stream_completion(request, max(1.0, remaining),
+                                                    {"variant": variant} if variant else None, completion):
+                    if parser.feed(text) and time.monotonic() - last_partial >= partial_interval:
+                        last_partial = time.monotonic()
+                        yield {'type': 'partial', 'sections': parser.result()}
+                response = ChatCompletion.model_validate(completion['response'])
+                round_metrics = metrics.add_round(completion['response'].get('usage'),
+                                                  time.monotonic() - round_started, completion.get('cached', False))
+
+                message = response.choices[0].message
+                if not message.tool_calls:
+                    self.logger.info("\n=== Function Call Summary ===")
+                    self.logger.info(f"Rounds: {rounds}")
+                    self.logger.info(f"search_urls called: {function_calls['search_urls']} times")
+                    self.logger.info(f"validate_url called: {function_calls['validate_url']} times")
+                    break
+
+                rounds += 1
+                messages.append({
+                    "role": "assistant",
+                    "content": message.content,
+                    "tool_calls": [tool_call.model_dump() for tool_call in message.tool_calls]
+                })
+                for tool_call in message.tool_calls:
+                    if tool_call.function.name in function_calls:
+                        function_calls[tool_call.function.name] += 1
+                    yield {'type': 'status', 'message': f"Researching: {tool_call.function.name} {tool_call.function.arguments}"}
+                tools_started = time.monotonic()
+                results = self._run_tool_calls(message.tool_calls, deadline - POST_WRITE_RESERVE_SECONDS)
+                round_metrics['tool_calls'] = len(message.tool_calls)
+                round_metrics['tool_seconds'] = round(time.monotonic() - tools_started, 3)
+                for tool_call, result in zip(message.tool_calls, results):
+                    messages.append({
+                        "role": "tool",
+                        "tool_call_id": tool_call.id,
+                        "content": json.dumps(result)
+                    })
+
+            # Validate the sections parsed while streaming
+            if not message.content:
+                self.logger.error("No content generated")
+                return
+
+            sections = parser.result()
+            yield {'type': 'partial', 'sections': sections}
+            if not sections['title'] or not sections['content']:
+                self.logger.error("Missing required content elements")
+                return
+            # A response cut off at max_tokens has an unclosed, truncated body
+            if 'content' not in parser.closed or response.choices[0].finish_reason == 'length':
+                self.logger.error(f"Response for {keyword} was cut off before the end of the content")
+                return
+
+            post = self.build_post(keyword, keyword_data, sections, metrics.as_dict())
+            # The model still invents or mangles citations, so check every link before the post is used
+            yield {'type': 'status', 'message': "Checking links..."}
+            self.link_verifier.verify_post(post)
+
+            self.logger.info("\n=== Post Generation Complete ===")
+            yield {'type': 'post', 'post': post}
+
+        except Exception as e:
+            self.logger.error(f"Error generating post: {str(e)}")
+            self.logger.error("Full error:", exc_info=True)
+
+    def generate_variants(self, keyword: str, keyword_data: Dict = None, num_variants: int = 2,
+                          headline_only: bool = False, variant: int = 0) -> List[Dict]:
+        """Generate several versions of a post from one shared research pass.
+
+        Sources are searched once, then all drafts are requested in a single
+        completion (``n=num_variants``), so N drafts cost one research pass
+        and one prompt plus N completions. Each draft is returned as a
+        separate post, with its share of the tokens and cost in its metrics.
+        With ``headline_only`` a single draft is written and a second, small
+        request proposes alternative titles for A/B tests; the result is one
+        post whose ``title_variants`` lists all ``num_variants`` headlines.
+        ``variant`` separates repeated generations in the completion cache,
+        as for ``generate_post_stream``.
+        """
+        keyword_data = keyword_data or {}
+        if self.test_mode:
+            return [self.generate_post(keyword, keyword_data, variant + i) for i in range(num_variants)]
+        try:
+            metrics = PostMetrics("gpt-4")
+            research_started = time.monotonic()
+            sources = self.research_sources(keyword)
+            research_seconds = time.monotonic() - research_started
+
+            drafts = 1 if headline_only else num_variants
+            request = {
+                "model": "gpt-4",
+                "messages": self.build_messages(keyword, keyword_data, sources),
+                "temperature": 0.9 if drafts > 1 else 0.7,
+                "max_tokens": 2000,
+                "n": drafts
+            }
+            round_started = time.monotonic()
+            key_extra = {"variant": variant} if variant else None
+            response, cached = self._complete(request, key_extra)
+            round_metrics = metrics.add_round(response.get('usage'), time.monotonic() - round_started, cached)
+            round_metrics.update(tool_calls=1, tool_seconds=round(research_seconds, 3))
+
+            sections = []
+            for choice in response['choices']:
+                parser = TagStreamParser()
+                parser.feed(choice['message'].get('content') or "")
+                result = parser.result()
+                if not result['title'] or not result['content']:
+                    self.logger.error(f"Variant {choice['index']} for {keyword} is missing required content elements")
+                elif 'content' not in parser.closed or choice.get('finish_reason') == 'length':
+                    self.logger.error(f"Variant {choice['index']} for {keyword} was cut off before the end of the content")
+                else:
+                    sections.append(result)
+            if not sections:
+                return []
+
+            if headline_only:
+                titles = self._headline_variants(keyword, sections[0], num_variants - 1, metrics, key_extra)
+                post = self.build_post(keyword, keyword_data, sections[0], metrics.as_dict())
+                post['title_variants'] = [post['title']] + [t for t in titles if t != post['title']]
+                posts = [post]
+            else:
+                posts = [self.build_post(keyword, keyword_data, result, {**metrics.as_dict(len(sections)),
+                                                                         'variants': len(sections)})
+                         for result in sections]
+            self.link_verifier.verify_posts(posts)
+            return posts
+
+        except Exception as e:
+            self.logger.error(f"Error generating variants for {keyword}: {str(e)}")
+            self.logger.error("Full error:", exc_info=True)
+            return []
+
+    def _headline_variants(self, keyword: str, sections: Dict[str, str], count: int,
+                           metrics: PostMetrics, key_extra: Optional[Dict] = None) -> List[str]:
+        """Ask for ``count`` alternative titles for a written post."""
+        if count <= 0:
+            return []
+        request = {
+            "model": "gpt-4",
+            "messages": [
+                {"role": "system", "content": f"You are a {self.persona}. Write engaging, direct blog post titles "
+                                              "without colons, under 60 characters, focused on benefits."},
+                {"role": "user", "content": f"Write {count} alternative titles for this blog post about {keyword}, "
+                                            f"each on its own line as <title>...</title>.\n\n"
+                                            f"Current title: {sections['title']}\nExcerpt: {sections['excerpt']}"}
+            ],
+            "temperature": 0.9,
+            "max_tokens": 300
+        }
+        started = time.monotonic()
+        response, cached = self._complete(request, key_extra)
+        metrics.add_round(response.get('usage'), time.monotonic() - started, cached)
+        content = response['choices'][0]['message'].get('content') or ""
+        titles = [title.strip() for title in re.findall(r"<title>(.*?)</title>", content, re.DOTALL)]
+        return [title for title in titles if title][:count]
+
+    def _complete(self, request: Dict, key_extra: Optional[Dict] = None) -> Tuple[Dict, bool]:
+        """Run a non-streaming chat completion through the completion cache; returns (response, cached)."""
+        cached = self.llm_cache.lookup('openai', request, key_extra)
+        if cached is not None:
+            return cached, True
+        self.openai_limiter.acquire()
+        response = self.client.chat.completions.create(**request, timeout=POST_DEADLINE_SECONDS).model_dump()
+        self.llm_cache.store('openai', request, response, key_extra)
+        return response, False
+
+    def build_messages(self, keyword: str, keyword_data: Dict, sources: Optional[List[Dict]] = None) -> List[Dict]:
+        """Build the chat messages that ask for a post about ``keyword``.
+
+        Without ``sources`` the model is told to research with the search_urls
+        tool. Batch requests cannot call tools, so they pass precomputed
+        ``sources`` (url/title/description dicts, as returned by
+        ``search_and_validate_urls``) for the model to cite instead.
+        """
+        research = "- First, use search_urls to find at least 5 relevant sources before writing"
+        url_rule = "- Use the exact URLs provided by search_urls"
+        gather = "First, gather multiple sources using search_urls, then write detailed content"
+        if sources is not None:
+            research = "- Cite the sources listed at the end; they have already been checked"
+            url_rule = "- Use the exact URLs from the source list"
+            gather = "Using the sources listed in your instructions, write detailed content"
+        keyword_data = keyword_data or {}
+
+        system_prompt = f"""You are a {self.persona}. 
             When writing content:
-            - First, use search_urls to find at least 5 relevant sources before writing
+            {research}
             - Use proper HTML anchor tags to cite sources, example: <a href="URL_HERE">relevant text</a>
             - Write comprehensive, detailed content (minimum 1000 words)
             - Include at least 4-5 main sections with descriptive subheadings using <h2> tags
@@ -140,7 +453,7 @@ class ContentGenerator:
             - Use natural anchor text that relates to the linked content
             - Place internal links where they add value to the reader
             - Available internal posts for linking:
-            {self._format_internal_links()}
+            {self._format_internal_links(f"{keyword} {keyword_data.get('frequent_word', '')}")}
             
             Content Structure:
             - Engaging introduction (2-3 paragraphs)
@@ -167,7 +480,7 @@ class ContentGenerator:
             - When citing sources, use this format:
               <a href="URL">According to [Source Name]</a>, or
               <a href="URL">research shows</a>
-            - Use the exact URLs provided by search_urls
+            {url_rule}
             - Include at least 2-5 citations with anchor tags
             
             Format your response as:
@@ -176,98 +489,164 @@ class ContentGenerator:
             <content>Your HTML content here</content>
             """
 
-            user_prompt = f"""Write a comprehensive, well-researched blog post about {keyword}.
+        user_prompt = f"""Write a comprehensive, well-researched blog post about {keyword}.
             Intent: {keyword_data.get('intent', 'informational')}
             Key Topic: {keyword_data.get('frequent_word', '')}
             
-            First, gather multiple sources using search_urls, then write detailed content 
+            {gather} 
             incorporating insights from these sources. Make sure to use proper HTML anchor 
             tags when citing sources."""
 
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
+        if sources is not None:
+            system_prompt += "\n            Sources:\n" + "\n".join(
+                f"            - {source.get('title', '')}: {source['url']} {source.get('description', '')}".rstrip()
+                for source in sources
+            ) + "\n"
 
-            # Process function calls and generate content
-            while True:
-                response = self.client.chat.completions.create(
-                    model="gpt-4",
-                    messages=messages,
-                    functions=functions,
-                    function_call="auto",
-                    temperature=0.7,
-                    max_tokens=2000
-                )
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
 
-                message = response.choices[0].message
-                if not hasattr(message, 'function_call') or message.function_call is None:
-                    self.logger.info("\n=== Function Call Summary ===")
-                    self.logger.info(f"search_urls called: {function_calls['search_urls']} times")
-                    self.logger.info(f"validate_url called: {function_calls['validate_url']} times")
-                    break
+    def build_post(self, keyword: str, keyword_data: Dict, sections: Dict[str, str], metrics: Dict) -> Dict:
+        """Assemble a post from the parsed title/excerpt/content sections of a response."""
+        return {
+            'keyword': keyword,
+            'title': sections['title'],
+            'content': sections['content'],
+            'excerpt': sections['excerpt'] or self.generate_excerpt(sections['content']),  # Fallback to generated excerpt
+            'intent': keyword_data.get('intent', ''),
+            'volume': keyword_data.get('volume', 0),
+            'frequent_word': keyword_data.get('frequent_word', ''),
+            'tab': keyword_data.get('tab', ''),
+            'metrics': metrics
+        }
 
-                function_call = message.function_call
-                if function_call.name == "search_urls":
-                    function_calls["search_urls"] += 1
-                    args = json.loads(function_call.arguments)
-                    urls = self.search_and_validate_urls(args["query"], args.get("num_results", 5))  # Increased to 5
-                    
-                    # If we didn't get enough URLs, try a modified search
-                    if len(urls) < 3:
-                        self.logger.info("Not enough URLs found, trying alternative search...")
-                        alternative_query = f"{args['query']} research studies benefits"
-                        additional_urls = self.search_and_validate_urls(alternative_query, 3)
-                        urls.extend(additional_urls)
-                    
-                    messages.append({
-                        "role": "function",
-                        "name": "search_urls",
-                        "content": json.dumps({
-                            "urls": urls,
-                            "message": "If any URL is invalid, keep the content and request another URL"
-                        })
-                    })
-                elif function_call.name == "validate_url":
-                    function_calls["validate_url"] += 1
-                    args = json.loads(function_call.arguments)
-                    is_valid = self.check_url(args["url"])
-                    messages.append({
-                        "role": "function",
-                        "name": "validate_url",
-                        "content": json.dumps({"valid": is_valid, "url": args["url"]})
-                    })
+    def _stream_completion(self, request: Dict, timeout: float, key_extra: Optional[Dict],
+                           completion: Dict) -> Iterator[str]:
+        """Run a chat completion with streaming, yielding content text as it arrives.
 
-            # Parse and validate content
-            content = message.content
-            if not content:
-                self.logger.error("No content generated")
-                return None
+        The full response, assembled from the stream in the non-streaming
+        response format, is stored in the completion cache and left in
+        ``completion['response']``. Cached responses are yielded in one piece,
+        and flagged with ``completion['cached']``.
+        """
+        cached = self.llm_cache.lookup('openai', request, key_extra)
+        if cached is not None:
+            completion['response'] = cached
+            completion['cached'] = True
+            if cached['choices'][0]['message'].get('content'):
+                yield cached['choices'][0]['message']['content']
+            return
 
-            title = self.extract_tag_content(content, "title")
-            body = self.extract_tag_content(content, "content")
-            excerpt = self.extract_tag_content(content, "excerpt")
+        self.openai_limiter.acquire()
+        stream = self.client.chat.completions.create(
+            **request, stream=True, stream_options={"include_usage": True}, timeout=timeout
+        )
+        content, tool_calls, finish_reason, usage, first_chunk = [], {}, None, None, None
+        for chunk in stream:
+            first_chunk = first_chunk or chunk
+            if chunk.usage:
+                usage = chunk.usage.model_dump()
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            if choice.delta.content:
+                content.append(choice.delta.content)
+                yield choice.delta.content
+            # Tool calls arrive in fragments, keyed by their position
+            for fragment in choice.delta.tool_calls or []:
+                tool_call = tool_calls.setdefault(fragment.index, {
+                    "id": None, "type": "function", "function": {"name": "", "arguments": ""}
+                })
+                if fragment.id:
+                    tool_call["id"] = fragment.id
+                if fragment.function and fragment.function.name:
+                    tool_call["function"]["name"] += fragment.function.name
+                if fragment.function and fragment.function.arguments:
+                    tool_call["function"]["arguments"] += fragment.function.arguments
 
-            if not title or not body:
-                self.logger.error("Missing required content elements")
-                return None
+        response = {
+            "id": first_chunk.id if first_chunk else "",
+            "object": "chat.completion",
+            "created": first_chunk.created if first_chunk else int(time.time()),
+            "model": first_chunk.model if first_chunk else request["model"],
+            "choices": [{
+                "index": 0,
+                "finish_reason": finish_reason or "stop",
+                "message": {
+                    "role": "assistant",
+                    "content": "".join(content) or None,
+                    "tool_calls": [tool_calls[i] for i in sorted(tool_calls)] or None
+                }
+            }],
+            "usage": usage
+        }
+        self.llm_cache.store('openai', request, response, key_extra)
+        completion['response'] = response
 
-            self.logger.info("\n=== Post Generation Complete ===")
-            return {
-                'keyword': keyword,
-                'title': title,
-                'content': body,
-                'excerpt': excerpt or self.generate_excerpt(body),  # Fallback to generated excerpt
-                'intent': keyword_data.get('intent', ''),
-                'volume': keyword_data.get('volume', 0),
-                'frequent_word': keyword_data.get('frequent_word', ''),
-                'tab': keyword_data.get('tab', '')
-            }
+    def _run_tool_calls(self, tool_calls: List, deadline: float) -> List[Dict]:
+        """Run all tool calls of one round concurrently, returning their results in order.
 
+        Calls still running at ``deadline`` (a ``time.monotonic()`` value) are
+        reported to the model as timed out instead of being waited for.
+        """
+        pool = ThreadPoolExecutor(max_workers=len(tool_calls), thread_name_prefix="tool-call")
+        try:
+            futures = [pool.submit(self._run_tool_call, tool_call) for tool_call in tool_calls]
+            results = []
+            for tool_call, future in zip(tool_calls, futures):
+                try:
+                    results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+                except FutureTimeoutError:
+                    self.logger.warning(f"Tool call {tool_call.function.name} timed out")
+                    results.append({"error": "Timed out; write the post with the sources you already have"})
+            return results
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run_tool_call(self, tool_call) -> Dict:
+        """Execute a single search_urls or validate_url tool call.
+
+        Results are recorded in the completion cache but only read back in
+        replay mode, so offline replays see the same search results as the
+        recorded run while live runs always search again.
+        """
+        try:
+            args = json.loads(tool_call.function.arguments)
+            request = {"name": tool_call.function.name, "arguments": args}
+            return self.llm_cache.complete('tool', request, lambda: self._execute_tool(tool_call.function.name, args),
+                                           reuse=False)
         except Exception as e:
-            self.logger.error(f"Error generating post: {str(e)}")
-            self.logger.error("Full error:", exc_info=True)
-            return None
+            self.logger.error(f"Error in tool call {tool_call.function.name}: {str(e)}")
+            return {"error": str(e)}
+
+    def research_sources(self, query: str, num_results: int = 5) -> List[Dict]:
+        """Find sources for a post up front, as the search_urls tool would for the model."""
+        request = {"name": "search_urls", "arguments": {"query": query, "num_results": num_results}}
+        result = self.llm_cache.complete('tool', request, lambda: self._execute_tool("search_urls", request["arguments"]),
+                                         reuse=False)
+        return result["urls"]
+
+    def _execute_tool(self, name: str, args: Dict) -> Dict:
+        """Run a tool by name with parsed arguments."""
+        if name == "search_urls":
+            urls = self.search_and_validate_urls(args["query"], args.get("num_results", 5))  # Increased to 5
+
+            # If we didn't get enough URLs, try a modified search
+            if len(urls) < 3:
+                self.logger.info("Not enough URLs found, trying alternative search...")
+                alternative_query = f"{args['query']} research studies benefits"
+                urls.extend(self.search_and_validate_urls(alternative_query, 3))
+
+            return {
+                "urls": urls,
+                "message": "If any URL is invalid, keep the content and request another URL"
+            }
+        if name == "validate_url":
+            return {"valid": self.check_url(args["url"]), "url": args["url"]}
+        return {"error": f"Unknown function: {name}"}
 
     def generate_excerpt(self, content: str, max_length: int = 200) -> str:
         """Generate an excerpt from content if none provided"""
@@ -287,45 +666,13 @@ class ContentGenerator:
         end = text.find(f"</{tag}>")
         return text[start:end].strip() if start > -1 and end > -1 else ""
 
-    def get_internal_links(self) -> List[Dict]:
-        """Get existing blog posts for internal linking"""
-        try:
-            blog_url = "https://www.beastputty.com/blogs/molding-destiny"
-            response = requests.get(blog_url)
-            if response.status_code != 200:
-                self.logger.error(f"Failed to fetch blog posts: {response.status_code}")
-                return []
-
-            # Parse the blog listing page
-            internal_links = []
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Find all blog post links
-            for article in soup.find_all('article'):
-                try:
-                    link = article.find('a')
-                    if link:
-                        title = link.get_text().strip()
-                        url = f"https://www.beastputty.com{link['href']}"
-                        internal_links.append({
-                            "title": title,
-                            "url": url,
-                            "description": article.find('p', class_='excerpt').get_text().strip() if article.find('p', class_='excerpt') else ""
-                        })
-                except Exception as e:
-                    self.logger.warning(f"Error parsing article: {str(e)}")
-                    continue
-
-            self.logger.info(f"Found {len(internal_links)} internal blog posts")
-            return internal_links
-
-        except Exception as e:
-            self.logger.error(f"Error fetching internal links: {str(e)}")
-            return []
+    def get_internal_links(self, query: str, k: int = INTERNAL_LINKS_TOP_K) -> List[Dict]:
+        """Get the existing blog posts most relevant to ``query``, for internal linking"""
+        return self.link_index.top_links(query, k)
 
-    def _format_internal_links(self) -> str:
-        """Format internal links for the prompt"""
-        internal_links = self.get_internal_links()
+    def _format_internal_links(self, query: str) -> str:
+        """Format the internal links relevant to ``query`` for the prompt"""
+        internal_links = self.get_internal_links(query)
         formatted_links = []
         for link in internal_links:
             formatted_links.append(f"- {link['title']}: {link['url']}")
@@ -1,50 +1,487 @@
+import bisect
 import json
 import os
+import sys
+import threading
+import time
 import uuid
-from datetime import datetime
-from typing import Dict, List, Optional, Union
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple, Union
 import pandas as pd
 from pathlib import Path
 from io import StringIO
+from contextlib import contextmanager
+from modules.file_lock import FileLock
+from modules.keyword_import import CHUNK_ROWS, ImportStats, drop_seen, iter_file_chunks
+from modules.storage_backends import PAYLOAD_KEYS, REFERENCE_KEYS, make_backend
+
+# Reserved top-level key in db.json holding snapshot bookkeeping
+SNAPSHOT_META_KEY = "_meta"
+
+
+class ConcurrentUpdateError(Exception):
+    """Raised when a DataFrame changed since the revision the caller read."""
+
+
+class JournalGapError(Exception):
+    """Raised when journal records are missing between the applied offset and the file."""
+
+
+# Timestamp fields that can be used to order and range-query DataFrames
+TIMESTAMP_FIELDS = ('created_at', 'modified_at')
+
+
+def _metadata_key(key: str, value) -> Tuple[str, str]:
+    """Build a hashable index key for a metadata key/value pair."""
+    return key, json.dumps(value, sort_keys=True, default=str)
+
+
+def _frame_state(df: pd.DataFrame) -> Dict:
+    """Return the JSON ``split`` form of a DataFrame used for version diffs."""
+    return json.loads(df.to_json(orient='split'))
+
+
+def _state_to_frame(state: Dict) -> pd.DataFrame:
+    """Rebuild a DataFrame from its ``split`` form."""
+    return pd.read_json(StringIO(json.dumps(state)), orient='split')
+
+
+def _diff_states(old: Dict, new: Dict) -> Dict:
+    """Compute a row-level delta (added/removed/changed cells) from old to new."""
+    old_columns, new_columns = old['columns'], new['columns']
+    old_rows = {idx: dict(zip(old_columns, row)) for idx, row in zip(old['index'], old['data'])}
+
+    added, changed = [], []
+    for idx, row in zip(new['index'], new['data']):
+        previous = old_rows.get(idx)
+        if previous is None:
+            added.append([idx, row])
+            continue
+        cells = {
+            column: value for column, value in zip(new_columns, row)
+            if column not in previous or previous[column] != value
+        }
+        if cells:
+            changed.append([idx, cells])
+
+    new_index = set(new['index'])
+    removed = [idx for idx in old['index'] if idx not in new_index]
+    delta = {'columns': new_columns, 'removed': removed, 'added': added, 'changed': changed}
+
+    # Only store the row order when it isn't the natural "kept rows, then added rows"
+    natural_order = [idx for idx in old['index'] if idx in new_index] + [idx for idx, _ in added]
+    if natural_order != new['index']:
+        delta['index'] = new['index']
+    return delta
+
+
+def _state_rows(state: Dict) -> Dict:
+    """Turn a ``split`` state into an ordered {index: {column: value}} row map."""
+    return {idx: dict(zip(state['columns'], row)) for idx, row in zip(state['index'], state['data'])}
+
+
+def _rows_state(rows: Dict, columns: List[str]) -> Dict:
+    """Turn a row map back into a ``split`` state with the given columns."""
+    index = list(rows)
+    return {
+        'columns': columns,
+        'index': index,
+        'data': [[rows[idx].get(column) for column in columns] for idx in index]
+    }
+
+
+def _apply_delta_rows(rows: Dict, delta: Dict) -> Dict:
+    """Apply one delta produced by ``_diff_states`` to a row map and return it."""
+    for idx in delta['removed']:
+        rows.pop(idx, None)
+    for idx, cells in delta['changed']:
+        rows[idx].update(cells)
+    for idx, row in delta['added']:
+        rows[idx] = dict(zip(delta['columns'], row))
+    if 'index' in delta:
+        # Reorder so later deltas see the same row order as at diff time
+        rows = {idx: rows[idx] for idx in delta['index']}
+    return rows
+
+
+def _apply_deltas(state: Dict, deltas: List[Dict], columns: Optional[List[str]] = None) -> Dict:
+    """Apply a chain of deltas produced by ``_diff_states`` to a ``split`` state.
+
+    When ``columns`` is given, only those columns are returned.
+    """
+    rows = _state_rows(state)
+    state_columns = state['columns']
+    for delta in deltas:
+        rows = _apply_delta_rows(rows, delta)
+        state_columns = delta['columns']
+
+    if columns is not None:
+        state_columns = [column for column in state_columns if column in columns]
+    return _rows_state(rows, state_columns)
+
+
+@dataclass
+class RetentionPolicy:
+    """Which versions ``apply_retention`` keeps; a version survives if any rule keeps it.
+
+    - ``keep_last``: the newest N versions.
+    - ``daily_after_days``: every version younger than this many days, and
+      the last version of each calendar day for older ones.
+    - ``keep_tagged``: versions with a tag (see ``tag_version``).
+
+    The latest version is always kept.
+    """
+    keep_last: Optional[int] = 50
+    daily_after_days: Optional[int] = 7
+    keep_tagged: bool = True
+
+    def select(self, versions: List[Dict], now: Optional[datetime] = None) -> List[int]:
+        """Get the sorted indexes of the versions to keep."""
+        now = now or datetime.now()
+        count = len(versions)
+        keep = {count - 1} if count else set()
+
+        if self.keep_last:
+            keep.update(range(max(0, count - self.keep_last), count))
+        if self.daily_after_days is not None:
+            cutoff = now - timedelta(days=self.daily_after_days)
+            last_of_day = {}
+            for index, version in enumerate(versions):
+                timestamp = datetime.fromisoformat(version['timestamp'])
+                if timestamp >= cutoff:
+                    keep.add(index)
+                else:
+                    last_of_day[timestamp.date()] = index
+            keep.update(last_of_day.values())
+        if self.keep_tagged:
+            keep.update(index for index, version in enumerate(versions) if version.get('tag'))
+        return sorted(keep)
+
 
 class DataFrameStorage:
-    def __init__(self, data_dir: str = "data"):
-        """Initialize the DataFrame storage system."""
+    def __init__(self, data_dir: str = "data", journal: bool = True, compact_every: int = 200,
+                 keyframe_every: int = 1000, backend: str = "json"):
+        """Initialize the DataFrame storage system.
+
+        With ``journal`` enabled, changes are appended to ``db.journal`` and
+        folded into the ``db.json`` snapshot every ``compact_every`` records.
+        Versions are stored as deltas against the previous version, with a full
+        keyframe at most ``keyframe_every`` versions apart. ``backend`` picks
+        where version payloads live (see ``modules.storage_backends``); frame
+        data is only loaded on first access.
+        """
         self.data_dir = Path(data_dir)
         self.db_file = self.data_dir / "db.json"
+        self.journal_file = self.data_dir / "db.journal"
+        self.journal = journal
+        self.compact_every = compact_every
+        self.keyframe_every = keyframe_every
+        self.backend = make_backend(backend, self.data_dir)
         self.dataframes: Dict[str, Dict] = {}
+        # Latest version of each frame in split form, used as the diff base
+        self._heads: Dict[str, Dict] = {}
+        # Per-frame (versions, delta bytes, keyframe bytes) since the last keyframe
+        self._chains: Dict[str, List[int]] = {}
+        # Sorted (timestamp, df_id) lists per timestamp field, and per metadata
+        # key/value pair sorted by creation time
+        self._time_index: Dict[str, List[Tuple[str, str]]] = {field: [] for field in TIMESTAMP_FIELDS}
+        self._metadata_index: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        self._journal_seq = 0
+        self._journal_records = 0
+        # Byte offset up to which the journal has been applied, and the
+        # (inode, mtime, size) of the snapshot it builds on
+        self._journal_offset = 0
+        self._snapshot_signature = None
+        # Bumped on every full reload, so long-running work can detect one
+        self._generation = 0
+        # Guards in-memory state against the background compaction thread;
+        # the file lock serializes writers across processes
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(self.data_dir / "db.lock")
         self._initialize_storage()
 
     def _initialize_storage(self) -> None:
-        """Create data directory and load existing data if available."""
+        """Create data directory, load the snapshot and replay the journal."""
+        self.data_dir.mkdir(exist_ok=True)
+        self._load()
         try:
-            self.data_dir.mkdir(exist_ok=True)
-            if self.db_file.exists():
-                with open(self.db_file, 'r') as f:
-                    stored_data = json.load(f)
-                    for df_id, df_info in stored_data.items():
-                        # Use StringIO for JSON reading
-                        df_data = pd.read_json(StringIO(df_info['data']))
-                        df_info['data'] = df_data
-                        self.dataframes[df_id] = df_info
+            if self.journal and self._journal_records >= self.compact_every:
+                self.compact()
         except Exception as e:
-            print(f"Error initializing storage: {str(e)}")
+            print(f"Error compacting storage: {str(e)}")
+
+    def _get_snapshot_signature(self) -> Optional[Tuple[int, int, int]]:
+        """Identify the current snapshot file; it changes on every atomic replace."""
+        try:
+            stat = self.db_file.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> None:
+        """Load the snapshot and replay the whole journal, replacing in-memory state."""
+        with self._lock:
             self.dataframes = {}
+            self._heads = {}
+            self._chains = {}
+            self._time_index = {field: [] for field in TIMESTAMP_FIELDS}
+            self._metadata_index = {}
+            self._journal_seq = 0
+            self._journal_records = 0
+            self._journal_offset = 0
+            self._generation += 1
+            self._snapshot_signature = self._get_snapshot_signature()
+
+            try:
+                if self.db_file.exists():
+                    with open(self.db_file, 'r') as f:
+                        stored_data = json.load(f)
+                        meta = stored_data.pop(SNAPSHOT_META_KEY, {})
+                        self._journal_seq = meta.get('journal_seq', 0)
+                        for df_id, df_info in stored_data.items():
+                            # Frame data is rebuilt from its versions on first access
+                            df_info['data'] = None
+                            df_info.setdefault('revision', len(df_info['versions']) - 1)
+                            self.dataframes[df_id] = df_info
+                            self._index_add(df_info)
+            except Exception as e:
+                print(f"Error initializing storage: {str(e)}")
+                self.dataframes = {}
+                self._time_index = {field: [] for field in TIMESTAMP_FIELDS}
+                self._metadata_index = {}
+
+            try:
+                self._replay_journal()
+            except Exception as e:
+                print(f"Error replaying storage journal: {str(e)}")
+
+    def refresh(self) -> None:
+        """Pick up changes committed by other processes.
+
+        If the snapshot was replaced (another process compacted), everything
+        is reloaded; otherwise only journal records past the last applied
+        offset are read. Never waits on the writer lock.
+        """
+        with self._lock:
+            if self._get_snapshot_signature() != self._snapshot_signature:
+                self._load()
+                return
+            try:
+                self._replay_journal()
+            except JournalGapError:
+                self._load()
+
+    def _replay_journal(self, truncate: bool = False) -> None:
+        """Apply journal records past the last applied offset.
+
+        Replay stops at an incomplete final line, which is either a writer
+        mid-append or a crash. With ``truncate`` (only safe while holding the
+        writer lock) a leftover torn tail is cut off so later appends start on
+        a clean line.
+        """
+        if not self.journal_file.exists():
+            return
+
+        with open(self.journal_file, 'rb') as f:
+            f.seek(self._journal_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if record['seq'] > self._journal_seq + 1:
+                    # Records were lost to us, e.g. the journal was truncated
+                    # under our offset by another process's compaction
+                    raise JournalGapError(f"Expected journal record {self._journal_seq + 1}, got {record['seq']}")
+                self._journal_offset += len(line)
+                self._journal_records += 1
+                if record['seq'] <= self._journal_seq:
+                    continue
+                self._apply_record(record)
+                self._journal_seq = record['seq']
+
+        if truncate and self._journal_offset < self.journal_file.stat().st_size:
+            print(f"Discarding incomplete journal tail in {self.journal_file}")
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(self._journal_offset)
+
+    @contextmanager
+    def _writing(self):
+        """Hold the writer locks, with in-memory state caught up to disk."""
+        with self._lock, self._file_lock:
+            self.refresh()
+            self._replay_journal(truncate=True)
+            yield
+
+    def _apply_record(self, record: Dict) -> None:
+        """Apply a single journal record to the in-memory state."""
+        if record['op'] == 'add':
+            df_info = record['info']
+            df_info['data'] = None
+            self.dataframes[df_info['id']] = df_info
+            self._index_add(df_info)
+        elif record['op'] == 'update':
+            df_id = record['id']
+            version = record['version']
+            df_info = self.dataframes[df_id]
+            df_info['versions'].append(version)
+            df_info['revision'] = record.get('revision', df_info['revision'] + 1)
+            self._index_touch(df_info, version['timestamp'])
+            df_info['data'] = None
+            self._heads.pop(df_id, None)
+            self._chains.pop(df_id, None)
+        elif record['op'] == 'tag':
+            self.dataframes[record['id']]['versions'][record['version']]['tag'] = record['tag']
+        else:
+            raise ValueError(f"Unknown journal operation: {record['op']}")
+
+    def _index_add(self, df_info: Dict) -> None:
+        """Add a DataFrame entry to the timestamp and metadata indexes."""
+        df_id = df_info['id']
+        for field in TIMESTAMP_FIELDS:
+            bisect.insort(self._time_index[field], (df_info[field], df_id))
+        for key, value in df_info['metadata'].items():
+            postings = self._metadata_index.setdefault(_metadata_key(key, value), [])
+            bisect.insort(postings, (df_info['created_at'], df_id))
+
+    def _index_touch(self, df_info: Dict, timestamp: str) -> None:
+        """Move a DataFrame entry to a new modification time in the index."""
+        entries = self._time_index['modified_at']
+        position = bisect.bisect_left(entries, (df_info['modified_at'], df_info['id']))
+        if position < len(entries) and entries[position][1] == df_info['id']:
+            del entries[position]
+        df_info['modified_at'] = timestamp
+        bisect.insort(entries, (timestamp, df_info['id']))
+
+    def _rebuild_state(self, df_id: str, version_index: int,
+                       columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, List[Dict]]:
+        """Load the keyframe at or before a version and the deltas after it."""
+        versions = self.dataframes[df_id]['versions']
+        if not -len(versions) <= version_index < len(versions):
+            raise IndexError("Version index out of range")
+        version_index %= len(versions)
+
+        start = version_index
+        while not self.backend.is_keyframe(versions[start]):
+            start -= 1
+        keyframe = self.backend.read_keyframe(versions[start], columns)
+        deltas = [self.backend.read_delta(version) for version in versions[start + 1:version_index + 1]]
+        return keyframe, deltas
+
+    def _head(self, df_id: str) -> Dict:
+        """Get the split form of the latest version of a DataFrame."""
+        if df_id not in self._heads:
+            keyframe, deltas = self._rebuild_state(df_id, -1)
+            self._heads[df_id] = _apply_deltas(_frame_state(keyframe), deltas)
+        return self._heads[df_id]
+
+    def _chain(self, df_id: str) -> List[int]:
+        """Get the delta chain stats since the last keyframe of a DataFrame."""
+        if df_id not in self._chains:
+            length, delta_bytes = 0, 0
+            for version in reversed(self.dataframes[df_id]['versions']):
+                if self.backend.is_keyframe(version):
+                    self._chains[df_id] = [length, delta_bytes, self.backend.payload_size(version)]
+                    break
+                length += 1
+                delta_bytes += self.backend.payload_size(version)
+        return self._chains[df_id]
+
+    def _encode_version(self, df_id: str, df: pd.DataFrame) -> Dict:
+        """Encode a new version as a delta, or as a keyframe when due.
+
+        A keyframe is written once the deltas since the last one add up to its
+        size (so rebuilding costs at most about twice the frame) or the chain
+        reaches ``keyframe_every`` versions.
+        """
+        version_index = len(self.dataframes[df_id]['versions'])
+        new_state = _frame_state(df)
+        old_state = self._head(df_id)
+        self._heads[df_id] = new_state
+
+        length, delta_bytes, keyframe_bytes = self._chain(df_id)
+        if len(set(new_state['index'])) == len(new_state['index']) and length + 1 < self.keyframe_every:
+            delta = _diff_states(old_state, new_state)
+            size = len(json.dumps(delta))
+            if delta_bytes + size < keyframe_bytes:
+                self._chains[df_id] = [length + 1, delta_bytes + size, keyframe_bytes]
+                return self.backend.write_delta(df_id, version_index, delta)
+
+        payload = self.backend.write_keyframe(df_id, version_index, df)
+        self._chains[df_id] = [0, 0, payload['size']]
+        return payload
+
+    def _append_journal(self, record: Dict) -> None:
+        """Durably append a change record to the journal."""
+        self._journal_seq += 1
+        record['seq'] = self._journal_seq
+        line = (json.dumps(record) + "\n").encode()
+        try:
+            # A single write of a whole line, appended under the writer lock
+            with open(self.journal_file, 'ab') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+                self._journal_offset = f.tell()
+        except Exception as e:
+            raise Exception(f"Error writing journal: {str(e)}")
+
+        self._journal_records += 1
+        if self._journal_records >= self.compact_every:
+            self.compact()
+
+    def _persist(self, record: Dict) -> None:
+        """Persist a change, either to the journal or as a full snapshot."""
+        if self.journal:
+            self._append_journal(record)
+        else:
+            self._save_to_disk()
+
+    def _serialize_info(self, df_info: Dict) -> Dict:
+        """Return a JSON-serializable copy of a DataFrame entry.
+
+        Frame data is not stored separately; it is the latest version.
+        """
+        return {key: value for key, value in df_info.items() if key != 'data'}
 
     def _save_to_disk(self) -> None:
-        """Save all DataFrames to disk."""
+        """Atomically write a snapshot of all DataFrames to disk."""
         try:
-            serialized_data = {}
+            serialized_data = {
+                SNAPSHOT_META_KEY: {'journal_seq': self._journal_seq}
+            }
             for df_id, df_info in self.dataframes.items():
-                serialized_info = df_info.copy()
-                serialized_info['data'] = df_info['data'].to_json()
-                serialized_data[df_id] = serialized_info
+                serialized_data[df_id] = self._serialize_info(df_info)
 
-            with open(self.db_file, 'w') as f:
+            tmp_file = self.db_file.with_suffix('.json.tmp')
+            with open(tmp_file, 'w') as f:
                 json.dump(serialized_data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.db_file)
+            # Our own commit must not look like another process's compaction
+            self._snapshot_signature = self._get_snapshot_signature()
         except Exception as e:
             raise Exception(f"Error saving to disk: {str(e)}")
 
+    def compact(self) -> None:
+        """Fold the journal into a fresh snapshot and truncate it.
+
+        The snapshot records the last applied journal sequence number, so a
+        crash between the snapshot rename and the truncate is harmless: the
+        stale records are skipped on the next replay.
+        """
+        with self._writing():
+            self._save_to_disk()
+            if self.journal_file.exists():
+                with open(self.journal_file, 'w'):
+                    pass
+            self._journal_records = 0
+            self._journal_offset = 0
+
     def add_dataframe(self, df: pd.DataFrame, source: str, metadata: Optional[Dict] = None) -> str:
         """Add a new DataFrame with metadata."""
         df_id = str(uuid.uuid4())
@@ -57,37 +494,224 @@ class DataFrameStorage:
             'source': source,
             'metadata': metadata or {},
             'data': df,
-            'versions': [{
+            'revision': 0
+        }
+        
+        with self._writing():
+            # Written under the writer lock, so retention cannot delete a reused blob before it is referenced
+            df_info['versions'] = [{
                 'timestamp': timestamp,
-                'data': df.to_json(),
+                **self.backend.write_keyframe(df_id, 0, df),
                 'comment': 'Initial version'
             }]
-        }
-        
-        self.dataframes[df_id] = df_info
-        self._save_to_disk()
+            self.dataframes[df_id] = df_info
+            self._index_add(df_info)
+            self._heads[df_id] = _frame_state(df)
+            self._chains[df_id] = [0, 0, df_info['versions'][0]['size']]
+            self._persist({'op': 'add', 'info': self._serialize_info(df_info)})
         return df_id
 
-    def update_dataframe(self, df_id: str, df: pd.DataFrame, comment: str = "") -> None:
-        """Update an existing DataFrame and maintain version history."""
+    def update_dataframe(self, df_id: str, df: pd.DataFrame, comment: str = "",
+                         tag: Optional[str] = None, expected_revision: Optional[int] = None) -> int:
+        """Update an existing DataFrame and maintain version history.
+
+        A ``tag`` marks the version so retention policies can keep it. If
+        ``expected_revision`` is given and the stored revision differs (another
+        session or process updated the frame since it was read), a
+        ``ConcurrentUpdateError`` is raised instead of overwriting. Returns
+        the new revision.
+        """
+        with self._writing():
+            if df_id not in self.dataframes:
+                raise KeyError(f"DataFrame with id {df_id} not found")
+
+            df_info = self.dataframes[df_id]
+            if expected_revision is not None and expected_revision != df_info['revision']:
+                raise ConcurrentUpdateError(
+                    f"DataFrame {df_id} is at revision {df_info['revision']}, expected {expected_revision}"
+                )
+
+            timestamp = datetime.now().isoformat()
+            
+            # Add new version, delta-encoded against the previous one
+            version = {
+                'timestamp': timestamp,
+                **self._encode_version(df_id, df),
+                'comment': comment
+            }
+            if tag:
+                version['tag'] = tag
+            df_info['versions'].append(version)
+            
+            # Update current data
+            df_info['data'] = df
+            df_info['revision'] += 1
+            self._index_touch(df_info, timestamp)
+            
+            self._persist({'op': 'update', 'id': df_id, 'version': version, 'revision': df_info['revision']})
+            return df_info['revision']
+
+    def tag_version(self, df_id: str, version_index: int, tag: str) -> None:
+        """Tag an existing version so retention policies keep it."""
+        with self._writing():
+            if df_id not in self.dataframes:
+                raise KeyError(f"DataFrame with id {df_id} not found")
+
+            versions = self.dataframes[df_id]['versions']
+            if not -len(versions) <= version_index < len(versions):
+                raise IndexError("Version index out of range")
+            version_index %= len(versions)
+            versions[version_index]['tag'] = tag
+            self._persist({'op': 'tag', 'id': df_id, 'version': version_index, 'tag': tag})
+
+    def _retain_versions(self, df_id: str, versions: List[Dict], keep: List[int]) -> Tuple[List[Dict], List[Dict]]:
+        """Rewrite a version list down to the kept indexes.
+
+        Kept versions whose predecessor is also kept are reused as-is. The
+        first kept version after a gap is re-encoded as a delta against the
+        last kept version before the gap (or as a keyframe if there is none).
+        Returns the new version list and the replaced or dropped entries.
+        """
+        kept = set(keep)
+        retained, dropped = [], []
+        rows, columns, gap_base = None, [], None
+        for index, version in enumerate(versions[:keep[-1] + 1]):
+            if self.backend.is_keyframe(version):
+                state = _frame_state(self.backend.read_keyframe(version))
+                rows, columns = _state_rows(state), state['columns']
+            else:
+                delta = self.backend.read_delta(version)
+                rows, columns = _apply_delta_rows(rows, delta), delta['columns']
+
+            if index not in kept:
+                dropped.append(version)
+                continue
+
+            if index == 0 or index - 1 in kept:
+                retained.append(version)
+            else:
+                state = _rows_state(rows, columns)
+                if gap_base is None:
+                    payload = self.backend.write_keyframe(df_id, len(retained), _state_to_frame(state))
+                else:
+                    payload = self.backend.write_delta(df_id, len(retained), _diff_states(gap_base, state))
+                entry = {key: value for key, value in version.items()
+                         if key not in PAYLOAD_KEYS}
+                retained.append({**entry, **payload})
+                dropped.append(version)
+
+            if index + 1 not in kept:
+                # Remember this version as the base for the next re-encoded one
+                gap_base = _rows_state(rows, columns)
+        return retained, dropped
+
+    def _disk_usage(self) -> int:
+        """Get the bytes used by this storage on disk."""
+        paths = [self.db_file, self.journal_file]
+        for payload_dir in (self.data_dir / "frames", self.data_dir / "blobs"):
+            if payload_dir.exists():
+                paths.extend(path for path in payload_dir.rglob('*') if path.is_file())
+        return sum(path.stat().st_size for path in paths if path.exists())
+
+    def _measure_load_time(self) -> float:
+        """Time a fresh instance loading the snapshot and every current frame."""
+        start = time.perf_counter()
+        storage = DataFrameStorage(self.data_dir, journal=self.journal, compact_every=sys.maxsize,
+                                   keyframe_every=self.keyframe_every, backend=self.backend.name)
+        for df_id in storage.dataframes:
+            storage.get_dataframe(df_id)
+        return time.perf_counter() - start
+
+    def _referenced_payloads(self) -> set:
+        """Get the payload file names and blob digests referenced by any current version."""
+        with self._lock:
+            return {
+                version.get(key) for df_info in self.dataframes.values()
+                for version in df_info['versions'] for key in REFERENCE_KEYS
+            }
+
+    def apply_retention(self, policy: RetentionPolicy, measure: bool = True) -> Dict:
+        """Drop versions not kept by ``policy``, compact, and report the effect.
+
+        The expensive part (rebuilding and re-encoding versions) runs without
+        holding the lock; versions appended meanwhile are kept, since they
+        build on the latest version, which every policy keeps.
+        """
+        bytes_before = self._disk_usage()
+        load_before = self._measure_load_time() if measure else None
+
+        with self._lock:
+            self.refresh()
+            generation = self._generation
+            snapshot = {df_id: list(df_info['versions']) for df_id, df_info in self.dataframes.items()}
+
+        now = datetime.now()
+        rewritten, dropped = {}, []
+        for df_id, versions in snapshot.items():
+            keep = policy.select(versions, now)
+            if len(keep) == len(versions):
+                continue
+            rewritten[df_id], removed = self._retain_versions(df_id, versions, keep)
+            dropped.extend(removed)
+
+        with self._writing():
+            if self._generation != generation:
+                # Another process compacted meanwhile; our version lists are stale
+                print("Skipping retention: storage was compacted by another process")
+                # The originals are still in use; only the payloads re-encoded above are orphaned
+                referenced = self._referenced_payloads()
+                for retained in rewritten.values():
+                    for version in retained:
+                        self.backend.delete_payload(version, referenced)
+                return {'skipped': True}
+            for df_id, retained in rewritten.items():
+                df_info = self.dataframes.get(df_id)
+                if df_info is None:
+                    continue
+                df_info['versions'] = retained + df_info['versions'][len(snapshot[df_id]):]
+                self._chains.pop(df_id, None)
+            self.compact()
+
+            # Only delete replaced payloads once the snapshot no longer references
+            # them, and while still holding the writer lock, since another writer
+            # may reuse a stored blob for identical content
+            referenced = self._referenced_payloads()
+            for version in dropped:
+                self.backend.delete_payload(version, referenced)
+
+        bytes_after = self._disk_usage()
+        load_after = self._measure_load_time() if measure else None
+        return {
+            'frames_pruned': len(rewritten),
+            'versions_removed': sum(len(snapshot[df_id]) - len(rewritten[df_id]) for df_id in rewritten),
+            'bytes_before': bytes_before,
+            'bytes_after': bytes_after,
+            'bytes_reclaimed': bytes_before - bytes_after,
+            'load_seconds_before': load_before,
+            'load_seconds_after': load_after
+        }
+
+    def compact_in_background(self, policy: RetentionPolicy,
+                              on_done: Optional[Callable[[Dict], None]] = None) -> threading.Thread:
+        """Run ``apply_retention`` on a daemon thread, off the request path."""
+        def run():
+            try:
+                report = self.apply_retention(policy)
+                if on_done:
+                    on_done(report)
+            except Exception as e:
+                print(f"Error during background compaction: {str(e)}")
+
+        thread = threading.Thread(target=run, name="storage-compaction", daemon=True)
+        thread.start()
+        return thread
+
+    def get_revision(self, df_id: str) -> int:
+        """Get the revision stamp of a DataFrame, for ``update_dataframe(expected_revision=...)``."""
+        self.refresh()
         if df_id not in self.dataframes:
             raise KeyError(f"DataFrame with id {df_id} not found")
-
-        timestamp = datetime.now().isoformat()
-        df_info = self.dataframes[df_id]
-        
-        # Add new version
-        df_info['versions'].append({
-            'timestamp': timestamp,
-            'data': df.to_json(),
-            'comment': comment
-        })
-        
-        # Update current data
-        df_info['data'] = df
-        df_info['modified_at'] = timestamp
-        
-        self._save_to_disk()
+        return self.dataframes[df_id]['revision']
 
     def get_dataframe_info(self, df_id: str) -> Optional[Dict]:
         """Get DataFrame info by ID"""
@@ -99,47 +723,149 @@ class DataFrameStorage:
             print(f"Error getting DataFrame info for {df_id}: {str(e)}")
             return None
 
-    def get_dataframe(self, df_id: str) -> pd.DataFrame:
-        """Retrieve a DataFrame by ID"""
+    def get_dataframe(self, df_id: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Retrieve a DataFrame by ID, optionally only the given columns.
+
+        The full frame is loaded on first access and kept in memory; projected
+        reads skip the other columns on disk and are not cached.
+        """
         try:
+            self.refresh()
             df_info = self.get_dataframe_info(df_id)
             if not df_info:
                 return pd.DataFrame()
-            
-            # Return the DataFrame directly since it's already loaded
-            return df_info['data']
+
+            if df_info['data'] is None:
+                if columns is not None:
+                    return self.get_version(df_id, -1, columns)
+                df_info['data'] = self.get_version(df_id, -1)
+
+            df = df_info['data']
+            if columns is not None:
+                df = df[[c for c in df.columns if c in columns]]
+            return df
         except Exception as e:
             print(f"Error retrieving DataFrame {df_id}: {str(e)}")
             return pd.DataFrame()
 
     def get_version_history(self, df_id: str) -> List[Dict]:
-        """Get version history for a DataFrame."""
+        """Get version history for a DataFrame (without the version data)."""
         if df_id not in self.dataframes:
             raise KeyError(f"DataFrame with id {df_id} not found")
-        return self.dataframes[df_id]['versions']
+        return [
+            {
+                'version': index,
+                'timestamp': version['timestamp'],
+                'comment': version.get('comment', ''),
+                'tag': version.get('tag'),
+                'keyframe': self.backend.is_keyframe(version)
+            }
+            for index, version in enumerate(self.dataframes[df_id]['versions'])
+        ]
+
+    def get_version(self, df_id: str, version_index: int, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Rebuild a DataFrame as of a given version, optionally only the given columns."""
+        if df_id not in self.dataframes:
+            raise KeyError(f"DataFrame with id {df_id} not found")
+
+        # Start from the nearest keyframe, then replay deltas forward
+        try:
+            keyframe, deltas = self._rebuild_state(df_id, version_index, columns)
+        except FileNotFoundError:
+            # Another process pruned the payload files we knew about
+            self._load()
+            keyframe, deltas = self._rebuild_state(df_id, version_index, columns)
+        if not deltas:
+            return keyframe
+        return _state_to_frame(_apply_deltas(_frame_state(keyframe), deltas, columns))
 
     def query_by_metadata(self, query: Dict) -> List[str]:
-        """Query DataFrames by metadata and return matching IDs."""
+        """Query DataFrames by metadata and return matching IDs, oldest first.
+
+        IDs are ordered by creation time (ties broken by ID), so the last
+        entry is always the most recently created match.
+        """
+        self.refresh()
+        if not query:
+            return [df_id for _, df_id in self._time_index['created_at']]
+
+        postings = [self._metadata_index.get(_metadata_key(k, v), []) for k, v in query.items()]
+        postings.sort(key=len)
+        others = [{df_id for _, df_id in entries} for entries in postings[1:]]
+        return [
+            df_id for _, df_id in postings[0]
+            if all(df_id in ids for ids in others)
+        ]
+
+    def query_range(self, start: Optional[str] = None, end: Optional[str] = None,
+                    field: str = 'created_at', descending: bool = False,
+                    limit: Optional[int] = None, **metadata) -> List[str]:
+        """Get IDs with ``start <= field < end``, ordered by that timestamp field.
+
+        ``start``/``end`` are ISO timestamps (either may be omitted). Extra
+        keyword arguments filter on metadata, e.g. ``type="keywords"``.
+        """
+        if field not in TIMESTAMP_FIELDS:
+            raise ValueError(f"Unknown timestamp field: {field}")
+
+        self.refresh()
+        # Creation-time ranges over one metadata pair can use its posting list
+        if field == 'created_at' and len(metadata) == 1:
+            entries = self._metadata_index.get(_metadata_key(*next(iter(metadata.items()))), [])
+            allowed = None
+        else:
+            entries = self._time_index[field]
+            allowed = set(self.query_by_metadata(metadata)) if metadata else None
+
+        low = bisect.bisect_left(entries, (start,)) if start is not None else 0
+        high = bisect.bisect_left(entries, (end,)) if end is not None else len(entries)
+        positions = range(high - 1, low - 1, -1) if descending else range(low, high)
+
         matching_ids = []
-        for df_id, df_info in self.dataframes.items():
-            metadata = df_info['metadata']
-            if all(metadata.get(k) == v for k, v in query.items()):
-                matching_ids.append(df_id)
+        for position in positions:
+            df_id = entries[position][1]
+            if allowed is not None and df_id not in allowed:
+                continue
+            matching_ids.append(df_id)
+            if limit is not None and len(matching_ids) >= limit:
+                break
         return matching_ids
 
-    def bulk_upload(self, file_path: str, source: str) -> List[str]:
-        """Bulk upload DataFrames from a file."""
+    def latest(self, by: str = 'created_at', **metadata) -> Optional[str]:
+        """Get the ID of the most recently created (or ``by='modified_at'``) match.
+
+        Example: ``storage.latest(type="generated_posts")``.
+        """
+        matching_ids = self.query_range(field=by, descending=True, limit=1, **metadata)
+        return matching_ids[0] if matching_ids else None
+
+    def bulk_upload(self, file_path: str, source: str, dedup_on: Optional[str] = None,
+                    chunksize: int = CHUNK_ROWS) -> List[str]:
+        """Bulk upload DataFrames from a file, reading it in chunks.
+
+        With ``dedup_on`` set, rows repeating an earlier value of that column
+        are dropped while reading. Import statistics, including rows per
+        second, are recorded in the frame metadata under ``import_stats``.
+        """
         try:
-            if file_path.endswith('.csv'):
-                df = pd.read_csv(file_path)
-            elif file_path.endswith('.xlsx'):
-                df = pd.read_excel(file_path)
-            elif file_path.endswith('.json'):
-                df = pd.read_json(file_path)
-            else:
-                raise ValueError("Unsupported file format")
+            stats = ImportStats()
+            seen = set()
+            frames = []
+            start = time.perf_counter()
+            for chunk in iter_file_chunks(file_path, chunksize):
+                stats.rows_read += len(chunk)
+                if dedup_on is not None:
+                    chunk = drop_seen(chunk, dedup_on, seen)
+                frames.append(chunk)
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            stats.rows_imported = len(df)
+            stats.skipped = stats.rows_read - len(df)
+            stats.seconds = time.perf_counter() - start
 
-            df_id = self.add_dataframe(df, source, {'original_file': file_path})
+            df_id = self.add_dataframe(df, source, {
+                'original_file': file_path,
+                'import_stats': stats.as_dict()
+            })
             return [df_id]
         except Exception as e:
             raise Exception(f"Error during bulk upload: {str(e)}")
@@ -152,12 +878,5 @@ class DataFrameStorage:
 
     def restore_version(self, df_id: str, version_index: int) -> None:
         """Restore a DataFrame to a previous version."""
-        if df_id not in self.dataframes:
-            raise KeyError(f"DataFrame with id {df_id} not found")
-            
-        df_info = self.dataframes[df_id]
-        if version_index >= len(df_info['versions']):
-            raise IndexError("Version index out of range")
-            
-        version_data = pd.read_json(df_info['versions'][version_index]['data'])
-        self.update_dataframe(df_id, version_data, f"Restored to version {version_index}") 
\ No newline at end of file
+        version_data = self.get_version(df_id, version_index)
+        self.update_dataframe(df_id, version_data, f"Restored to version {version_index}")
@@ -0,0 +1,122 @@
+import re
+import threading
+import zlib
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+import numpy as np
+from config.config import DEDUP_THRESHOLD
+
+TAG_RE = re.compile(r'<[^>]+>')
+WORD_RE = re.compile(r'\w+')
+
+
+def shingles(text: str, size: int = 3) -> Set[str]:
+    """Get the overlapping ``size``-word sequences of a post body, ignoring HTML tags and case."""
+    words = WORD_RE.findall(TAG_RE.sub(' ', text or '').lower())
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """Computes MinHash signatures of texts, whose agreement estimates shingle Jaccard similarity."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Multiply-shift hash family: h(x) = (a * x + b) mod 2**64 >> 32, with odd a
+        rng = np.random.RandomState(seed)
+        self._a = (rng.randint(0, 2 ** 32, size=num_perm, dtype=np.uint64) << np.uint64(32)) \
+            | rng.randint(0, 2 ** 32, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = (rng.randint(0, 2 ** 32, size=num_perm, dtype=np.uint64) << np.uint64(32)) \
+            | rng.randint(0, 2 ** 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        values = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(text, self.shingle_size)]
+        if not values:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        x = np.array(values, dtype=np.uint64)[:, None]
+        hashed = (x * self._a + self._b) >> np.uint64(32)
+        return hashed.min(axis=0).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimate the Jaccard similarity of two texts from their signatures."""
+    return float(np.mean(a == b))
+
+
+class NearDuplicateIndex:
+    """In-memory MinHash LSH index of post bodies.
+
+    Signatures are split into ``bands``; texts sharing any band land in the
+    same bucket and become candidates, so a lookup only compares against a
+    few posts instead of all of them. Candidates are confirmed by their
+    estimated similarity. With 32 bands of 4 rows, pairs at 0.5 similarity
+    are found ~87% of the time and pairs at 0.6 over 99%.
+    """
+
+    def __init__(self, hasher: Optional[MinHasher] = None, bands: int = 32, threshold: float = DEDUP_THRESHOLD):
+        self.hasher = hasher or MinHasher()
+        if self.hasher.num_perm % bands:
+            raise ValueError("The number of permutations must be a multiple of the number of bands")
+        self.bands = bands
+        self.rows = self.hasher.num_perm // bands
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, Set[Hashable]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _query(self, signature: np.ndarray, exclude: Optional[Hashable]) -> List[Tuple[Hashable, float]]:
+        candidates = set()
+        for band, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(band.get(key, ()))
+        candidates.discard(exclude)
+        matches = [(key, similarity(signature, self._signatures[key])) for key in candidates]
+        return sorted((m for m in matches if m[1] >= self.threshold), key=lambda m: m[1], reverse=True)
+
+    def _add(self, key: Hashable, signature: np.ndarray) -> None:
+        self._remove(key)
+        self._signatures[key] = signature
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            band.setdefault(band_key, set()).add(key)
+
+    def _remove(self, key: Hashable) -> Optional[np.ndarray]:
+        signature = self._signatures.pop(key, None)
+        if signature is not None:
+            for band, band_key in zip(self._buckets, self._band_keys(signature)):
+                band[band_key].discard(key)
+                if not band[band_key]:
+                    del band[band_key]
+        return signature
+
+    def query(self, signature: np.ndarray, exclude: Optional[Hashable] = None) -> List[Tuple[Hashable, float]]:
+        """Get (key, similarity) of indexed texts at least ``threshold`` similar, most similar first."""
+        with self._lock:
+            return self._query(signature, exclude)
+
+    def add(self, key: Hashable, signature: np.ndarray) -> None:
+        with self._lock:
+            self._add(key, signature)
+
+    def add_if_unique(self, key: Hashable, signature: np.ndarray) -> List[Tuple[Hashable, float]]:
+        """Add a text unless it has near-duplicates, atomically; returns the near-duplicates."""
+        with self._lock:
+            matches = self._query(signature, key)
+            if not matches:
+                self._add(key, signature)
+            return matches
+
+    def rename(self, old_key: Hashable, new_key: Hashable) -> None:
+        with self._lock:
+            signature = self._remove(old_key)
+            if signature is not None:
+                self._add(new_key, signature)
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove(key)
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+from typing import Dict, Iterable, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config.config import (HTTP_POOL_SIZE, HTTP_RETRIES, HTTP_BACKOFF_SECONDS, HTTP_KEEPALIVE_SECONDS,
+                           HTTP_MAX_RETRY_WAIT_SECONDS)
+from modules.rate_limiter import retry_after_seconds
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Responses worth retrying; only idempotent requests are retried automatically
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_METHODS = frozenset(['HEAD', 'GET', 'OPTIONS'])
+
+
+class CappedRetry(Retry):
+    """Retry policy that waits at most ``HTTP_MAX_RETRY_WAIT_SECONDS`` for a Retry-After.
+
+    Request timeouts do not cover the sleep between retries, so an uncapped
+    Retry-After would hold up the calling worker for as long as the server
+    asks.
+    """
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        return min(retry_after, HTTP_MAX_RETRY_WAIT_SECONDS) if retry_after is not None else None
+
+
+def make_session(pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_RETRIES,
+                 backoff: float = HTTP_BACKOFF_SECONDS, respect_retry_after: bool = True) -> requests.Session:
+    """Create a requests session with keep-alive connection pools and retries.
+
+    Each host gets a pool of up to ``pool_size`` connections, so repeated
+    requests to a host reuse connections instead of paying a new TCP and
+    TLS handshake. Idempotent requests are retried ``retries`` times on
+    connection errors and ``RETRY_STATUSES``, backing off exponentially
+    from ``backoff`` seconds or, with ``respect_retry_after``, as long as
+    Retry-After asks; waits are capped at ``HTTP_MAX_RETRY_WAIT_SECONDS``.
+    Other requests (e.g. POSTs that start a job) are never retried here.
+    """
+    session = requests.Session()
+    retry = CappedRetry(
+        total=retries,
+        backoff_factor=backoff,
+        backoff_max=HTTP_MAX_RETRY_WAIT_SECONDS,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        respect_retry_after_header=respect_retry_after,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+_default_session: Optional[requests.Session] = None
+_default_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Get the process-wide HTTP session, shared by every outbound client and thread."""
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = make_session()
+        return _default_session
+
+
+class AsyncHttpClient:
+    """aiohttp counterpart of ``make_session``, for checking many URLs from a single thread.
+
+    Use as ``async with AsyncHttpClient() as client``. Connections are kept
+    alive and capped at ``pool_size`` in total and per host; idempotent
+    requests are retried like the synchronous session's.
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_RETRIES,
+                 backoff: float = HTTP_BACKOFF_SECONDS, timeout: float = 10, verify_ssl: bool = True):
+        if aiohttp is None:
+            raise ImportError("AsyncHttpClient requires aiohttp: pip install aiohttp")
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.verify_ssl = verify_ssl
+        self.session = None
+
+    async def __aenter__(self) -> 'AsyncHttpClient':
+        connector = aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.pool_size,
+                                         keepalive_timeout=HTTP_KEEPALIVE_SECONDS, ttl_dns_cache=300,
+                                         **({} if self.verify_ssl else {'ssl': False}))
+        self.session = aiohttp.ClientSession(connector=connector,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.session.close()
+
+    async def request(self, method: str, url: str, **kwargs) -> 'aiohttp.ClientResponse':
+        """Send a request and read its body, retrying idempotent requests; the body stays readable."""
+        retries = self.retries if method.upper() in RETRY_METHODS else 0
+        for attempt in range(retries + 1):
+            try:
+                response = await self.session.request(method, url, **kwargs)
+                await response.read()
+                if response.status not in RETRY_STATUSES or attempt == retries:
+                    return response
+                wait = retry_after_seconds(response.headers.get('Retry-After'), self.backoff * 2 ** attempt)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == retries:
+                    raise
+                wait = self.backoff * 2 ** attempt
+            await asyncio.sleep(min(wait, HTTP_MAX_RETRY_WAIT_SECONDS))
+
+    async def check(self, url: str) -> bool:
+        """Check that a URL is reachable; falls back to GET for servers that reject HEAD."""
+        try:
+            response = await self.request('HEAD', url, allow_redirects=True)
+            if response.status in (403, 405, 501):
+                response = await self.request('GET', url, allow_redirects=True)
+            return response.status < 400
+        except Exception:
+            return False
+
+    async def check_all(self, urls: Iterable[str]) -> Dict[str, bool]:
+        """Check many URLs concurrently; returns {url: reachable}."""
+        urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self.check(url) for url in urls))
+        return dict(zip(urls, results))
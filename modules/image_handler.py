@@ -2,6 +2,8 @@ import requests
 import os
 from time import sleep
 from config.config import HUGGINGFACE_API_KEY
+from modules.rate_limiter import get_rate_limiter
+from modules.http_client import get_http_session
 import time
 import random
 import logging
@@ -17,6 +19,9 @@ class ImageHandler:
             datefmt='%H:%M:%S'
         )
         self.logger = logging.getLogger(__name__)
+        self.limiter = get_rate_limiter('starryai')
+        # Polls and downloads reuse connections to StarryAI and its image host
+        self.session = get_http_session()
 
     def fetch_image(self, keyword: str, max_retries: int = 3, initial_timeout: int = 20) -> str:
         """Generate an image based on the keyword using StarryAI."""
@@ -52,7 +57,11 @@ class ImageHandler:
             
             self.logger.info(f"Sending generation request with params: {generation_params}")
             
-            response = requests.post(
+            # Only creations count against the StarryAI limit; polling does not
+            waited = self.limiter.acquire()
+            if waited:
+                self.logger.info(f"Waited {waited:.1f}s for the StarryAI rate limit")
+            response = self.session.post(
                 'https://api.starryai.com/creations/',
                 headers=headers,
                 json=generation_params,
@@ -86,7 +95,7 @@ class ImageHandler:
             while retry_count < max_retries:
                 try:
                     # Use the GET creation endpoint from the docs
-                    status_response = requests.get(
+                    status_response = self.session.get(
                         f'https://api.starryai.com/creations/{creation_id}',
                         headers=headers,
                         timeout=10
@@ -138,7 +147,7 @@ class ImageHandler:
                                 
                                 # Download and save the image
                                 try:
-                                    image_response = requests.get(image_url, timeout=30)
+                                    image_response = self.session.get(image_url, timeout=30)
                                     if image_response.status_code == 200:
                                         with open(filename, 'wb') as f:
                                             f.write(image_response.content)
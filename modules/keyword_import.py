@@ -0,0 +1,128 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Set
+import pandas as pd
+
+# Rows per chunk; bounds how much of a file is held in memory at once
+CHUNK_ROWS = 50_000
+
+# Normalized Lowfruits keyword columns, in keywords grid order
+KEYWORD_COLUMNS = ['query', 'tab', 'intent', 'volume', 'frequent_word']
+
+
+@dataclass
+class ImportStats:
+    """Running totals for a keyword import."""
+    rows_read: int = 0
+    rows_imported: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            'rows_read': self.rows_read,
+            'rows_imported': self.rows_imported,
+            'skipped': self.skipped,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1)
+        }
+
+
+def _source_name(source) -> str:
+    return str(getattr(source, 'name', source)).lower()
+
+
+def _iter_xlsx_chunks(source, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Stream the first worksheet of an XLSX file through openpyxl's read-only row iterator."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else f"column_{i}" for i, c in enumerate(header)]
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunksize:
+                yield pd.DataFrame.from_records(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame.from_records(batch, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_file_chunks(source, chunksize: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Read a CSV, XLSX, JSON or JSON Lines file (path or file object) in chunks of rows."""
+    name = _source_name(source)
+    if name.endswith('.csv'):
+        with pd.read_csv(source, chunksize=chunksize) as reader:
+            yield from reader
+    elif name.endswith('.xlsx'):
+        yield from _iter_xlsx_chunks(source, chunksize)
+    elif name.endswith('.jsonl'):
+        with pd.read_json(source, lines=True, chunksize=chunksize) as reader:
+            yield from reader
+    elif name.endswith('.json'):
+        # Plain JSON has no row boundaries to stream on
+        yield pd.read_json(source)
+    else:
+        raise ValueError("Unsupported file format")
+
+
+def normalize_keywords(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Map a raw Lowfruits export chunk onto ``KEYWORD_COLUMNS``."""
+    chunk.columns = chunk.columns.astype(str).str.strip().str.lower()
+    size = len(chunk)
+    df = pd.DataFrame({
+        'query': chunk['query'].astype('string').str.strip(),
+        'tab': chunk['tab'],
+        'intent': chunk['intent'] if 'intent' in chunk.columns else pd.Series([None] * size, index=chunk.index),
+        'volume': (pd.to_numeric(chunk['volume'], errors='coerce').fillna(0).astype('int64')
+                   if 'volume' in chunk.columns else 0),
+        'frequent_word': chunk['frequent word'].fillna('') if 'frequent word' in chunk.columns else ''
+    })
+    df = df[df['query'].notna() & (df['query'] != '')]
+    df['query'] = df['query'].astype(object)
+    return df
+
+
+def drop_seen(chunk: pd.DataFrame, column: str, seen: Set) -> pd.DataFrame:
+    """Drop rows whose ``column`` value is in ``seen`` or repeats within the chunk; record the rest."""
+    chunk = chunk[~chunk[column].isin(seen)].drop_duplicates(subset=[column])
+    seen.update(chunk[column])
+    return chunk
+
+
+def read_keyword_file(source, seen: Optional[Set] = None, stats: Optional[ImportStats] = None,
+                      chunksize: int = CHUNK_ROWS) -> pd.DataFrame:
+    """Import a Lowfruits CSV/XLSX export chunk by chunk, skipping queries already in ``seen``.
+
+    ``seen`` is only extended once the whole file has been read, so a file
+    that fails part-way does not hide its queries from a retry.
+    """
+    seen = seen if seen is not None else set()
+    stats = stats if stats is not None else ImportStats()
+    added: Set = set()
+    frames = []
+    rows_read = 0
+    start = time.perf_counter()
+    for chunk in iter_file_chunks(source, chunksize):
+        rows_read += len(chunk)
+        chunk = normalize_keywords(chunk)
+        frames.append(drop_seen(chunk[~chunk['query'].isin(seen)], 'query', added))
+
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=KEYWORD_COLUMNS)
+    seen.update(added)
+    stats.rows_read += rows_read
+    stats.rows_imported += len(df)
+    stats.skipped += rows_read - len(df)
+    stats.seconds += time.perf_counter() - start
+    return df
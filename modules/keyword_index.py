@@ -0,0 +1,190 @@
+import math
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+import pandas as pd
+from config.config import CANNIBALIZATION_THRESHOLD
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Function words, plus SEO modifiers that do not change what a search is after
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it my of on or the to vs what when where which
+who why will with you your best top ultimate complete guide easy simple
+""".split())
+
+# Suffixes stripped by ``stem``, longest first, with their replacements
+SUFFIXES = (
+    ('ational', 'ate'), ('ization', 'ize'), ('fulness', 'ful'), ('iveness', 'ive'), ('ousness', 'ous'),
+    ('ements', ''), ('ement', ''), ('ments', ''), ('ment', ''), ('ities', ''), ('ity', ''),
+    ('ings', ''), ('ing', ''), ('ness', ''), ('sses', 'ss'), ('ies', 'y'), ('ied', 'y'), ('ers', ''),
+    ('er', ''), ('ed', ''), ('ly', ''), ('es', ''), ('s', '')
+)
+
+
+@lru_cache(maxsize=100_000)
+def stem(word: str) -> str:
+    """Reduce a word to a crude stem, so e.g. "relieving", "relieves" and "relieved" all become "reliev"."""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    for suffix, replacement in SUFFIXES:
+        if suffix == 's' and word.endswith(('ss', 'us', 'is')):
+            break
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:len(word) - len(suffix)] + replacement
+            break
+    # Drop a final e and collapse double consonants, so "relieve" matches "relieving"
+    if word.endswith('e') and len(word) >= 4:
+        word = word[:-1]
+    if len(word) > 4 and word[-1] == word[-2] and word[-1] not in 'aeiousl':
+        word = word[:-1]
+    return word
+
+
+@lru_cache(maxsize=200_000)
+def normalize_tokens(text: str) -> Tuple[str, ...]:
+    """Get the sorted, distinct stems of the meaningful words in a keyword or title."""
+    words = WORD_RE.findall(str(text).lower())
+    stems = {stem(word) for word in words if word not in STOPWORDS}
+    return tuple(sorted(stems))
+
+
+class CannibalizationIndex:
+    """Inverted index from word stems to the posts and articles that target them.
+
+    Documents are titles and keywords of generated posts and titles of live
+    articles. A keyword cannibalizes a document when at least ``threshold``
+    of its stems appear in it (at least two, unless the stems are the
+    same). Lookups only read the postings of a keyword's rarest stems, as a
+    document can only reach the threshold by containing one of them.
+
+    ``flag_keywords`` remembers the flag of every keyword it looks up, and
+    adding or removing a document only forgets the flags of the keywords
+    that document matches, so flagging a keyword column again after an
+    import, an edit or new posts only looks up what changed. The index
+    may be shared by threads.
+    """
+
+    def __init__(self, threshold: float = CANNIBALIZATION_THRESHOLD):
+        self.threshold = threshold
+        self._postings: Dict[str, Set[Hashable]] = {}
+        self._docs: Dict[Hashable, Tuple[frozenset, str]] = {}
+        # Normalized keyword -> (stems, flag) of looked up keywords, and stem -> those keywords
+        self._flags: Dict[str, Tuple[frozenset, str]] = {}
+        self._flagged: Dict[str, Set[str]] = {}
+        # Highest post ID indexed by ``add_posts``
+        self.posts_through = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, doc_id: Hashable, text: str, label: str) -> None:
+        """Index a title or keyword; ``label`` describes it in flags, e.g. 'post: <title>'."""
+        with self._lock:
+            self.remove(doc_id)
+            tokens = normalize_tokens(text)
+            if not tokens:
+                return
+            self._docs[doc_id] = (frozenset(tokens), label)
+            for token in tokens:
+                self._postings.setdefault(token, set()).add(doc_id)
+            self._forget_flags(self._docs[doc_id][0])
+
+    def remove(self, doc_id: Hashable) -> None:
+        with self._lock:
+            doc = self._docs.pop(doc_id, None)
+            if doc is not None:
+                for token in doc[0]:
+                    self._postings[token].discard(doc_id)
+                self._forget_flags(doc[0])
+
+    def _forget_flags(self, doc_tokens: frozenset) -> None:
+        """Drop the remembered flags of keywords that a document added or removed matches."""
+        keys = set()
+        for token in doc_tokens:
+            keys.update(self._flagged.get(token, ()))
+        for key in keys:
+            key_tokens = self._flags[key][0]
+            if self._matches(key_tokens, doc_tokens):
+                del self._flags[key]
+                for token in key_tokens:
+                    self._flagged[token].discard(key)
+
+    def add_posts(self, posts: pd.DataFrame) -> None:
+        """Index the titles and keywords of saved posts (a Keyword/Title frame indexed by post ID)."""
+        with self._lock:
+            for post_id, keyword, title in zip(posts.index, posts['Keyword'], posts['Title']):
+                self.add(('post', post_id, 'title'), title, f"post: {title}")
+                self.add(('post', post_id, 'keyword'), keyword, f"post: {title}")
+            if len(posts):
+                self.posts_through = max(self.posts_through, int(posts.index.max()))
+
+    def add_articles(self, articles: Iterable[Dict]) -> None:
+        """Index live blog articles ({'title', 'url'} dicts, as from the internal link cache)."""
+        with self._lock:
+            for article in articles:
+                self.add(('article', article['url']), article['title'], f"published: {article['title']}")
+
+    def _required_overlap(self, size: int) -> int:
+        return max(2, math.ceil(self.threshold * size))
+
+    def _matches(self, tokens: frozenset, doc_tokens: frozenset) -> bool:
+        """Whether a keyword with these stems cannibalizes a document, as decided by ``find``."""
+        if len(tokens) == 1:
+            return tokens == doc_tokens
+        return len(tokens & doc_tokens) >= self._required_overlap(len(tokens))
+
+    def find(self, keyword: str) -> List[Tuple[str, float]]:
+        """Get (label, share of the keyword's stems covered) of documents the keyword cannibalizes."""
+        with self._lock:
+            tokens = normalize_tokens(keyword)
+            if not tokens:
+                return []
+            if len(tokens) == 1:
+                # A single word only cannibalizes a document about exactly that word
+                return sorted({self._docs[doc_id][1]: 1.0 for doc_id in self._postings.get(tokens[0], ())
+                               if len(self._docs[doc_id][0]) == 1}.items())
+            required = self._required_overlap(len(tokens))
+            # Prefix filter: a match must contain one of the len - required + 1 rarest stems
+            by_rarity = sorted(tokens, key=lambda token: len(self._postings.get(token, ())))
+            candidates = set()
+            for token in by_rarity[:len(tokens) - required + 1]:
+                candidates.update(self._postings.get(token, ()))
+
+            token_set = frozenset(tokens)
+            best: Dict[str, float] = {}
+            for doc_id in candidates:
+                doc_tokens, label = self._docs[doc_id]
+                overlap = len(token_set & doc_tokens)
+                if overlap >= required:
+                    best[label] = max(best.get(label, 0.0), overlap / len(tokens))
+            return sorted(best.items(), key=lambda item: item[1], reverse=True)
+
+    def flag_keywords(self, keywords: pd.Series) -> pd.Series:
+        """Describe what each keyword cannibalizes ("" if nothing), for a whole keyword column.
+
+        Keywords are flagged against indexed posts and articles, and against
+        earlier keywords in the column that normalize to the same stems.
+        Each distinct keyword is looked up once, unless its flag is remembered.
+        """
+        keywords = keywords.astype(str)
+        canonical = keywords.map(lambda keyword: " ".join(normalize_tokens(keyword)))
+        repeated = canonical.duplicated() & (canonical != "")
+        first_keyword = dict(zip(canonical[~repeated], keywords[~repeated]))
+
+        post_flags = {}
+        with self._lock:
+            for key, keyword in first_keyword.items():
+                if key not in self._flags:
+                    matches = self.find(keyword)
+                    key_tokens = frozenset(key.split())
+                    self._flags[key] = (key_tokens, matches[0][0] if matches else "")
+                    for token in key_tokens:
+                        self._flagged.setdefault(token, set()).add(key)
+                post_flags[key] = self._flags[key][1]
+        flags = canonical.map(post_flags)
+        same_as = "keyword: " + canonical[repeated].map(first_keyword)
+        flags[repeated] = flags[repeated].where(flags[repeated] != "", same_as)
+        return flags
@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from config.config import INTERNAL_BLOG_URL, INTERNAL_LINKS_TTL
+from modules.http_client import get_http_session
+
+
+def parse_blog_listing(html: str, page_url: str) -> Tuple[List[Dict], Optional[str]]:
+    """Extract the post links from one blog listing page, and the URL of the next page if any."""
+    logger = logging.getLogger(__name__)
+    soup = BeautifulSoup(html, 'html.parser')
+    links = []
+    for article in soup.find_all('article'):
+        try:
+            link = article.find('a')
+            if link:
+                excerpt = article.find('p', class_='excerpt')
+                links.append({
+                    "title": link.get_text().strip(),
+                    "url": urljoin(page_url, link['href']),
+                    "description": excerpt.get_text().strip() if excerpt else ""
+                })
+        except Exception as e:
+            logger.warning(f"Error parsing article: {str(e)}")
+
+    next_link = soup.find(['link', 'a'], rel='next')
+    next_url = urljoin(page_url, next_link['href']) if next_link and next_link.get('href') else None
+    return links, next_url
+
+
+class InternalLinkCache:
+    """Cache of the posts on our blog, used for internal linking.
+
+    The listing is re-fetched at most once per ``ttl`` seconds, following
+    "next" links across all listing pages. Pages are revalidated with
+    ETag/If-Modified-Since, so unchanged pages are not downloaded again.
+    The cache is saved to disk and survives restarts. Concurrent callers
+    share a single refresh, and if it fails they get the last known links
+    until the refresh is retried ``retry_after`` seconds later.
+    """
+
+    def __init__(self, blog_url: str = INTERNAL_BLOG_URL, cache_file: str = "data/internal_links.json",
+                 ttl: float = INTERNAL_LINKS_TTL, max_pages: int = 50, timeout: float = 10,
+                 retry_after: float = 300):
+        self.blog_url = blog_url
+        self.cache_file = Path(cache_file)
+        self.ttl = ttl
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._cache: Optional[Dict] = None
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+            if cache.get('blog_url') == self.blog_url:
+                return cache
+        except (OSError, ValueError):
+            pass
+        return {'blog_url': self.blog_url, 'fetched_at': 0, 'pages': []}
+
+    def _save(self, cache: Dict) -> None:
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self.cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_file, 'w') as f:
+            json.dump(cache, f)
+        os.replace(temp_file, self.cache_file)
+
+    def _fetch_page(self, url: str, cached: Optional[Dict]) -> Dict:
+        """Fetch one listing page, revalidating the cached copy if there is one."""
+        headers = {}
+        if cached and cached.get('url') == url:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        response = get_http_session().get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return cached
+        response.raise_for_status()
+        links, next_url = parse_blog_listing(response.text, url)
+        return {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'links': links,
+            'next': next_url
+        }
+
+    def _refresh(self, cache: Dict) -> Dict:
+        pages, url = [], self.blog_url
+        while url and len(pages) < self.max_pages:
+            cached = cache['pages'][len(pages)] if len(pages) < len(cache['pages']) else None
+            page = self._fetch_page(url, cached)
+            if not page['links']:
+                break
+            pages.append(page)
+            url = page['next']
+        return {'blog_url': self.blog_url, 'fetched_at': time.time(), 'pages': pages}
+
+    def get_links(self) -> List[Dict]:
+        """Get all blog post links, refreshing the cache if it is older than the TTL."""
+        with self._lock:
+            if self._cache is None:
+                self._cache = self._load()
+            if time.time() - self._cache['fetched_at'] >= self.ttl:
+                try:
+                    self._cache = self._refresh(self._cache)
+                    self._save(self._cache)
+                    self.logger.info(f"Refreshed internal links from {len(self._cache['pages'])} blog pages")
+                except Exception as e:
+                    self.logger.error(f"Error fetching internal links, using cached copy: {str(e)}")
+                    self._cache['fetched_at'] = time.time() - self.ttl + min(self.retry_after, self.ttl)
+            links, seen = [], set()
+            for page in self._cache['pages']:
+                for link in page['links']:
+                    if link['url'] not in seen:
+                        seen.add(link['url'])
+                        links.append(link)
+            return links
+
+    def invalidate(self) -> None:
+        """Force a refresh on the next lookup."""
+        with self._lock:
+            if self._cache is not None:
+                self._cache['fetched_at'] = 0
+
+
+_default_cache: Optional[InternalLinkCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_internal_link_cache() -> InternalLinkCache:
+    """Get the process-wide internal link cache shared by all content generators."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = InternalLinkCache()
+        return _default_cache
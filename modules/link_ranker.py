@@ -0,0 +1,103 @@
+import math
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config.config import INTERNAL_LINKS_TOP_K
+from modules.keyword_index import STOPWORDS, WORD_RE, stem
+from modules.link_cache import InternalLinkCache, get_internal_link_cache
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into stemmed words, dropping stopwords; repeats are kept for term frequencies."""
+    return [stem(word) for word in WORD_RE.findall(str(text).lower()) if word not in STOPWORDS]
+
+
+class InternalLinkIndex:
+    """TF-IDF retrieval over our blog posts, for picking the internal links offered to the model.
+
+    Each post is weighted by sublinear term frequencies times inverse
+    document frequencies over its title (counted twice) and description,
+    normalized to unit length. Weights are kept per term as NumPy arrays
+    of (post, weight), so scoring a query only touches the posts that share
+    a word with it. The index is rebuilt whenever the link cache returns a
+    different set of posts.
+    """
+
+    def __init__(self, link_cache: Optional[InternalLinkCache] = None, title_weight: int = 2):
+        self.link_cache = link_cache or get_internal_link_cache()
+        self.title_weight = title_weight
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._links: List[Dict] = []
+        self._idf: Dict[str, float] = {}
+        # Term -> (post indices, normalized weights)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def _build(self, links: List[Dict]) -> None:
+        term_counts = [Counter(tokenize(link['title']) * self.title_weight + tokenize(link.get('description', '')))
+                       for link in links]
+        document_frequency = Counter(term for counts in term_counts for term in counts)
+        idf = {term: math.log((1 + len(links)) / (1 + df)) + 1 for term, df in document_frequency.items()}
+
+        postings: Dict[str, Tuple[List[int], List[float]]] = {}
+        for row, counts in enumerate(term_counts):
+            weights = {term: math.log1p(count) * idf[term] for term, count in counts.items()}
+            norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+            for term, weight in weights.items():
+                rows, values = postings.setdefault(term, ([], []))
+                rows.append(row)
+                values.append(weight / norm)
+
+        self._links, self._idf = links, idf
+        self._postings = {term: (np.array(rows, dtype=np.int32), np.array(values, dtype=np.float32))
+                          for term, (rows, values) in postings.items()}
+
+    def _current(self):
+        """Get the links and index for the current link cache contents, rebuilding if they changed."""
+        links = self.link_cache.get_links()
+        fingerprint = hash(tuple((link['url'], link['title'], link.get('description', '')) for link in links))
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                self._build(links)
+                self._fingerprint = fingerprint
+            return self._links, self._idf, self._postings
+
+    def top_links(self, query: str, k: int = INTERNAL_LINKS_TOP_K) -> List[Dict]:
+        """Get the ``k`` blog posts most relevant to ``query``, best first.
+
+        Falls back to the first posts of the listing (the newest) when too
+        few posts share any words with the query.
+        """
+        links, idf, postings = self._current()
+        query_weights = {term: math.log1p(count) * idf[term]
+                         for term, count in Counter(tokenize(query)).items() if term in idf}
+        ranked = []
+        if query_weights:
+            norm = math.sqrt(sum(weight * weight for weight in query_weights.values()))
+            scores = np.zeros(len(links), dtype=np.float32)
+            for term, weight in query_weights.items():
+                rows, values = postings[term]
+                scores[rows] += values * (weight / norm)
+            top = np.argpartition(-scores, k)[:k] if len(scores) > k else np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind='stable')]
+            ranked = [int(i) for i in top if scores[i] > 0]
+        for i in range(len(links)):
+            if len(ranked) >= k:
+                break
+            if i not in ranked:
+                ranked.append(i)
+        return [links[i] for i in ranked]
+
+
+_default_index: Optional[InternalLinkIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_internal_link_index() -> InternalLinkIndex:
+    """Get the process-wide internal link index, built over the shared internal link cache."""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = InternalLinkIndex()
+        return _default_index
@@ -0,0 +1,133 @@
+import difflib
+import html
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+from config.config import LINK_CHECK_CONCURRENCY, INTERNAL_BLOG_URL
+from modules.http_client import make_session
+from modules.url_cache import UrlValidationCache, get_url_validation_cache
+from modules.link_cache import InternalLinkCache, get_internal_link_cache
+
+# <a ... href="...">text</a>; group 2 is the href, group 3 the anchor text
+ANCHOR_RE = re.compile(r'<a\b[^>]*?\bhref\s*=\s*(["\'])(.*?)\1[^>]*>(.*?)</a\s*>', re.IGNORECASE | re.DOTALL)
+
+
+def extract_links(content: str) -> List[str]:
+    """Get the distinct http(s) link targets of a post body, in order of appearance."""
+    links = []
+    for match in ANCHOR_RE.finditer(content or ""):
+        url = html.unescape(match.group(2)).strip()
+        if url.lower().startswith(('http://', 'https://')) and url not in links:
+            links.append(url)
+    return links
+
+
+class LinkVerifier:
+    """Checks the citations in generated post bodies and repairs or strips dead ones.
+
+    All links of the posts passed to ``verify_posts`` are checked at once on
+    a thread pool, over a pooled HTTP session, through the shared URL
+    validation cache. A dead link is replaced by the first working repair
+    candidate (trailing punctuation removed, https, no query string, or the
+    closest post on our blog for internal links); otherwise the anchor is
+    unwrapped to plain text.
+    """
+
+    def __init__(self, cache: Optional[UrlValidationCache] = None, link_cache: Optional[InternalLinkCache] = None,
+                 max_workers: int = LINK_CHECK_CONCURRENCY, timeout: float = 5):
+        self.cache = cache or get_url_validation_cache()
+        self.link_cache = link_cache or get_internal_link_cache()
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+        # One quick retry: a dead link is expected, and every check holds up saving the post
+        self.session = make_session(pool_size=max_workers, retries=1, respect_retry_after=False)
+        self.blog_host = urlsplit(INTERNAL_BLOG_URL).hostname
+
+    def validate(self, urls: Iterable[str]) -> Dict[str, bool]:
+        """Check many URLs concurrently; returns {url: reachable}."""
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        workers = min(self.max_workers, len(urls))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="link-check") as pool:
+            results = pool.map(lambda url: self.cache.is_valid(url, self.session, self.timeout), urls)
+            return dict(zip(urls, results))
+
+    def repair_candidates(self, url: str) -> List[str]:
+        """Guess working replacements for a dead link, most likely first."""
+        candidates = []
+        cleaned = url.strip().rstrip('.,;:!?)\'"')
+        parts = urlsplit(cleaned)
+        if cleaned != url:
+            candidates.append(cleaned)
+        if parts.scheme == 'http':
+            candidates.append(urlunsplit(('https',) + tuple(parts[1:])))
+        if parts.query or parts.fragment:
+            candidates.append(urlunsplit((parts.scheme, parts.netloc, parts.path, '', '')))
+        if parts.hostname and parts.hostname.lower() == self.blog_host:
+            try:
+                internal = [link['url'] for link in self.link_cache.get_links()]
+            except Exception:
+                internal = []
+            candidates.extend(difflib.get_close_matches(cleaned, internal, n=1, cutoff=0.6))
+        return [candidate for candidate in dict.fromkeys(candidates) if candidate != url]
+
+    def verify_posts(self, posts: List[Dict]) -> None:
+        """Check and fix the links of several posts in place, recording link health in their metrics."""
+        started = time.monotonic()
+        post_links = [extract_links(post.get('content', '')) for post in posts]
+        results = self.validate(url for links in post_links for url in links)
+        dead = [url for url, ok in results.items() if not ok]
+
+        candidates = {url: self.repair_candidates(url) for url in dead}
+        candidate_results = self.validate(candidate for urls in candidates.values() for candidate in urls)
+        repairs = {url: next((c for c in candidates[url] if candidate_results.get(c)), None) for url in dead}
+        seconds = round(time.monotonic() - started, 3)
+
+        for post, links in zip(posts, post_links):
+            post_dead = [url for url in links if url in repairs]
+            if post_dead:
+                post['content'] = ANCHOR_RE.sub(lambda match: self._fix_anchor(match, repairs), post['content'])
+                self.logger.info(f"{post.get('keyword')}: repaired or removed dead links {post_dead}")
+            post.setdefault('metrics', {}).update(
+                links_checked=len(links),
+                links_repaired=sum(1 for url in post_dead if repairs[url]),
+                links_stripped=sum(1 for url in post_dead if not repairs[url]),
+                dead_links=post_dead,
+                link_check_seconds=seconds
+            )
+
+    def verify_post(self, post: Dict) -> None:
+        """Check and fix the links of a single post in place."""
+        self.verify_posts([post])
+
+    @staticmethod
+    def _fix_anchor(match: re.Match, repairs: Dict[str, Optional[str]]) -> str:
+        url = html.unescape(match.group(2)).strip()
+        if url not in repairs:
+            return match.group(0)
+        if repairs[url] is None:
+            # Keep the anchor text, without the dead link
+            return match.group(3)
+        start, end = match.span(2)
+        offset = match.start()
+        anchor = match.group(0)
+        return anchor[:start - offset] + html.escape(repairs[url], quote=True) + anchor[end - offset:]
+
+
+_default_verifier: Optional[LinkVerifier] = None
+_default_verifier_lock = threading.Lock()
+
+
+def get_link_verifier() -> LinkVerifier:
+    """Get the process-wide link verifier, sharing one connection pool across generators."""
+    global _default_verifier
+    with _default_verifier_lock:
+        if _default_verifier is None:
+            _default_verifier = LinkVerifier()
+        return _default_verifier
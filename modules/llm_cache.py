@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from config.config import LLM_CACHE_MODE, LLM_CACHE_MAX_MB
+
+# record: reuse cached responses and store new ones
+# replay: only answer from the cache, never call a provider (offline runs)
+# bypass: always call the provider and store nothing
+CACHE_MODES = ('record', 'replay', 'bypass')
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a request has no cached response."""
+
+
+def request_key(namespace: str, request: Dict, key_extra: Optional[Dict] = None) -> str:
+    """Hash a request (model, messages, tools, sampling parameters...) into a cache key."""
+    payload = json.dumps([namespace, request, key_extra or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CompletionCache:
+    """On-disk cache of LLM (and tool) responses keyed on a hash of the request.
+
+    Every response is one JSON file under ``cache_dir``. When the cache grows
+    past ``max_bytes``, the least recently used files are evicted until it
+    is back under 90% of the limit.
+    """
+
+    def __init__(self, cache_dir: str = "data/llm_cache", mode: str = LLM_CACHE_MODE,
+                 max_bytes: int = LLM_CACHE_MAX_MB * 1_000_000):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode: {mode}")
+        self.cache_dir = Path(cache_dir)
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        # Key -> [size in bytes, last used (epoch seconds)]
+        self._entries: Dict[str, list] = {}
+        self._size = 0
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob('*.json'):
+                stat = path.stat()
+                self._entries[path.stem] = [stat.st_size, stat.st_mtime]
+                self._size += stat.st_size
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Get a cached response, or None."""
+        try:
+            with open(self._path(key), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries[key][1] = time.time()
+        try:
+            # Keep the file's mtime as the last use, for LRU eviction across restarts
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return entry['response']
+
+    def put(self, key: str, namespace: str, response: Dict) -> None:
+        """Store a response, evicting old entries if the cache is over its size limit."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps({'namespace': namespace, 'created_at': time.time(), 'response': response})
+        temp_path = self.cache_dir / f"{key}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(payload)
+        os.replace(temp_path, self._path(key))
+        with self._lock:
+            previous = self._entries.get(key)
+            self._size += len(payload) - (previous[0] if previous else 0)
+            self._entries[key] = [len(payload), time.time()]
+            if self._size > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+
+    def _evict(self, target: int) -> None:
+        """Delete least recently used entries until the cache is at most ``target`` bytes."""
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._size <= target:
+                break
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+            del self._entries[key]
+            self._size -= size
+
+    def lookup(self, namespace: str, request: Dict, key_extra: Optional[Dict] = None,
+               reuse: bool = True) -> Optional[Dict]:
+        """Get the cached response for a request if the mode allows it, or None.
+
+        In replay mode a miss raises ``CacheMiss``. With ``reuse`` off,
+        responses are only read back in replay mode, e.g. for live data like
+        search results that should be recorded for offline runs but not
+        served stale.
+        """
+        if self.mode == 'bypass':
+            return None
+        response = None
+        if reuse or self.mode == 'replay':
+            response = self.get(request_key(namespace, request, key_extra))
+        with self._lock:
+            if response is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if response is None and self.mode == 'replay':
+            raise CacheMiss(f"No cached {namespace} response for request "
+                            f"{request_key(namespace, request, key_extra)[:12]}")
+        return response
+
+    def store(self, namespace: str, request: Dict, response: Dict, key_extra: Optional[Dict] = None) -> None:
+        """Cache the response to a request, unless the cache is bypassed."""
+        if self.mode == 'bypass':
+            return
+        try:
+            self.put(request_key(namespace, request, key_extra), namespace, response)
+        except OSError as e:
+            self.logger.warning(f"Could not cache {namespace} response: {str(e)}")
+
+    def complete(self, namespace: str, request: Dict, call: Callable[[], Dict],
+                 key_extra: Optional[Dict] = None, reuse: bool = True) -> Dict:
+        """Answer ``request`` from the cache or by running ``call``, depending on the mode.
+
+        ``call`` must return a JSON-serializable response. ``key_extra`` is
+        hashed with the request, to tell apart requests that are meant to
+        produce different answers. See ``lookup`` for ``reuse``.
+        """
+        response = self.lookup(namespace, request, key_extra, reuse)
+        if response is None:
+            response = call()
+            self.store(namespace, request, response, key_extra)
+        return response
+
+    def stats(self) -> Dict:
+        """Get the mode, size and hit counts of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'mode': self.mode,
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+_default_cache: Optional[CompletionCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> CompletionCache:
+    """Get the process-wide completion cache, configured from LLM_CACHE_MODE and LLM_CACHE_MAX_MB."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = CompletionCache()
+        return _default_cache
@@ -0,0 +1,201 @@
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+
+def canned_completion(body: Dict) -> Dict:
+    """Answer a chat completion request with a short post about the requested keyword."""
+    prompt = body['messages'][-1]['content']
+    match = re.search(r"blog post about (.+?)\.\s*\n", prompt)
+    topic = match.group(1) if match else "the topic"
+    content = (f"<title>A Practical Guide to {topic.title()}</title>\n"
+               f"<excerpt>Everything you need to know about {topic}.</excerpt>\n"
+               f"<content><h2>Why {topic} matters</h2><p>Offline test post about {topic}.</p></content>")
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get('model', 'gpt-4'),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content}
+        }],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                  "total_tokens": (len(prompt) + len(content)) // 4}
+    }
+
+
+class StubOpenAIServer:
+    """Local stand-in for the OpenAI files and batches endpoints, for offline batch runs.
+
+    Point the OpenAI client at ``base_url`` (e.g. ``OPENAI_BASE_URL``) and
+    submitted batches are answered by ``respond(request_body)``, which
+    defaults to ``canned_completion``. A batch reports "in_progress" for
+    its first ``polls_until_complete`` retrievals, so callers exercise their
+    polling loop.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 respond: Callable[[Dict], Dict] = canned_completion, polls_until_complete: int = 1):
+        self.respond = respond
+        self.polls_until_complete = polls_until_complete
+        self.files: Dict[str, Dict] = {}
+        self.batches: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.httpd = ThreadingHTTPServer((host, port), _StubHandler)
+        self.httpd.stub = self
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> 'StubOpenAIServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="openai-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> 'StubOpenAIServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def add_file(self, data: bytes, filename: str, purpose: str) -> Dict:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        with self._lock:
+            self.files[file_id] = {
+                "meta": {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                         "filename": filename, "purpose": purpose, "status": "processed"},
+                "data": data
+            }
+        return self.files[file_id]["meta"]
+
+    def create_batch(self, params: Dict) -> Dict:
+        lines = self.files[params['input_file_id']]["data"].decode('utf-8').splitlines()
+        outputs, errors = [], []
+        for line in filter(None, lines):
+            request = json.loads(line)
+            try:
+                response = {"status_code": 200, "request_id": uuid.uuid4().hex, "body": self.respond(request['body'])}
+                outputs.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request['custom_id'],
+                                "response": response, "error": None})
+            except Exception as e:
+                errors.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request['custom_id'],
+                               "response": None, "error": {"code": "stub_error", "message": str(e)}})
+
+        def result_file(results):
+            if not results:
+                return None
+            data = "".join(json.dumps(result) + "\n" for result in results).encode('utf-8')
+            return self.add_file(data, "batch_output.jsonl", "batch_output")["id"]
+
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": params['endpoint'],
+            "input_file_id": params['input_file_id'],
+            "completion_window": params.get('completion_window', '24h'),
+            "status": "validating",
+            "created_at": int(time.time()),
+            "metadata": params.get('metadata'),
+            "request_counts": {"total": len(outputs) + len(errors), "completed": 0, "failed": 0},
+            "output_file_id": None,
+            "error_file_id": None,
+            "_polls": 0,
+            "_results": (result_file(outputs), result_file(errors), len(outputs), len(errors))
+        }
+        with self._lock:
+            self.batches[batch_id] = batch
+        return self._public(batch)
+
+    def retrieve_batch(self, batch_id: str) -> Dict:
+        with self._lock:
+            batch = self.batches[batch_id]
+            batch["_polls"] += 1
+            if batch["_polls"] > self.polls_until_complete:
+                output_file_id, error_file_id, completed, failed = batch["_results"]
+                batch.update(status="completed", completed_at=int(time.time()), output_file_id=output_file_id,
+                             error_file_id=error_file_id)
+                batch["request_counts"].update(completed=completed, failed=failed)
+            else:
+                batch["status"] = "in_progress"
+            return self._public(batch)
+
+    @staticmethod
+    def _public(batch: Dict) -> Dict:
+        return {key: value for key, value in batch.items() if not key.startswith('_')}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload, content_type: str = "application/json") -> None:
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _not_found(self) -> None:
+        self._send(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def do_GET(self):
+        stub = self.server.stub
+        parts = self.path.split('?')[0].strip('/').split('/')
+        if parts[:2] == ['v1', 'files'] and len(parts) >= 3 and parts[2] in stub.files:
+            file = stub.files[parts[2]]
+            if parts[3:] == ['content']:
+                self._send(200, file["data"], "application/octet-stream")
+            else:
+                self._send(200, file["meta"])
+        elif parts[:2] == ['v1', 'batches'] and len(parts) == 3 and parts[2] in stub.batches:
+            self._send(200, stub.retrieve_batch(parts[2]))
+        else:
+            self._not_found()
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        path = self.path.split('?')[0].rstrip('/')
+        if path == '/v1/files':
+            message = BytesParser(policy=HTTP).parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('utf-8') + body
+            )
+            fields = {part.get_param('name', header='content-disposition'): part for part in message.iter_parts()}
+            upload = fields['file']
+            self._send(200, stub.add_file(upload.get_payload(decode=True), upload.get_filename() or "upload.jsonl",
+                                          fields['purpose'].get_content().strip()))
+        elif path == '/v1/batches':
+            params = json.loads(body)
+            if params.get('input_file_id') not in stub.files:
+                self._send(400, {"error": {"message": "Unknown input file", "type": "invalid_request_error"}})
+            else:
+                self._send(200, stub.create_batch(params))
+        else:
+            self._not_found()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the OpenAI Batch API")
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    server = StubOpenAIServer(port=args.port)
+    print(f"Serving on {server.base_url}; set OPENAI_BASE_URL to use it")
+    server.httpd.serve_forever()
@@ -0,0 +1,77 @@
+import time
+from typing import Dict, Optional
+from modules.image_handler import ImageHandler
+from modules.post_store import PostStore
+
+
+class PostFinisher:
+    """Deduplicates, illustrates and saves newly generated posts.
+
+    Shared by the Streamlit app and the batch command line, so posts from
+    either path get the same near-duplicate check, image and save. Nothing
+    here calls Streamlit, so ``finish`` can run on generation worker threads.
+    """
+
+    def __init__(self, post_store: PostStore, image_handler: ImageHandler):
+        self.post_store = post_store
+        self.image_handler = image_handler
+
+    def finish(self, post: Dict, keyword_data: Dict) -> None:
+        """Check a new post for near-duplicates, and generate its image if it is unique.
+
+        Near-duplicates are marked with 'duplicate_of' and not saved.
+        """
+        duplicates = self.post_store.claim_unique(post)
+        if duplicates:
+            post['duplicate_of'] = duplicates
+            return
+        self.attach_image(post, keyword_data)
+
+    def attach_image(self, post: Dict, keyword_data: Dict) -> None:
+        """Generate an image for a post, recording problems under 'image_warning'.
+
+        The time taken is recorded in the post's metrics.
+        """
+        post['image'] = None
+        started = time.monotonic()
+        try:
+            image_prompt = self.image_handler.generate_image_prompt(
+                query=post['keyword'],
+                intent=keyword_data.get('intent', ''),
+                excerpt=post.get('excerpt', '')
+            )
+            if not image_prompt:
+                post['image_warning'] = "Failed to generate image prompt, continuing without image"
+                return
+            image_url = self.image_handler.fetch_image(image_prompt)
+            if not image_url or image_url.startswith("Error:"):
+                post['image_warning'] = f"Image generation failed: {image_url}, continuing without image"
+            else:
+                post['image'] = image_url
+        except Exception as img_error:
+            post['image_warning'] = f"Image generation error: {str(img_error)}, continuing without image"
+        finally:
+            if 'metrics' in post:
+                post['metrics']['image_seconds'] = round(time.monotonic() - started, 3)
+
+    def save(self, post: Dict) -> Optional[int]:
+        """Save a finished post to the post store; returns its ID, or None for a near-duplicate.
+
+        If saving fails the post's near-duplicate claim is released and the
+        error is raised.
+        """
+        if post.get('duplicate_of'):
+            return None
+        try:
+            post['id'] = self.post_store.add_post(post)
+        except Exception:
+            self.post_store.release_claim(post)
+            raise
+        return post['id']
+
+    def describe_duplicate(self, post: Dict) -> str:
+        """Explain which post a near-duplicate was skipped for"""
+        post_id, score = post['duplicate_of'][0]
+        original = self.post_store.get_post(post_id) if post_id is not None else None
+        other = f"'{original['title']}'" if original else "another post from this run"
+        return f"Skipped '{post['title']}': {score:.0%} similar to {other}"
@@ -0,0 +1,88 @@
+import time
+from typing import Dict, Optional
+import pandas as pd
+from config.config import MODEL_PRICING
+
+
+class PostMetrics:
+    """Collects token usage and timings while a post is generated.
+
+    ``as_dict()`` is what gets stored with the post; later stages (image,
+    upload) add their own ``*_seconds`` keys to that dict.
+    """
+
+    def __init__(self, model: str, price_factor: float = 1.0):
+        self.model = model
+        # Discount on list prices, e.g. for the Batch API
+        self.price_factor = price_factor
+        self.started = time.monotonic()
+        self.rounds = []
+
+    def add_round(self, usage: Optional[Dict], seconds: float, cached: bool) -> Dict:
+        """Record one completion round and return its entry, for adding tool-call stats."""
+        usage = usage or {}
+        entry = {
+            'prompt_tokens': usage.get('prompt_tokens', 0),
+            'completion_tokens': usage.get('completion_tokens', 0),
+            'seconds': round(seconds, 3),
+            'cached': cached,
+            'tool_calls': 0,
+            'tool_seconds': 0.0
+        }
+        self.rounds.append(entry)
+        return entry
+
+    def cost(self) -> float:
+        """Estimated API cost in USD; cached rounds cost nothing."""
+        pricing = MODEL_PRICING.get(self.model, {'prompt': 0.0, 'completion': 0.0})
+        return self.price_factor * sum(
+            (r['prompt_tokens'] * pricing['prompt'] + r['completion_tokens'] * pricing['completion']) / 1000
+            for r in self.rounds if not r['cached']
+        )
+
+    def as_dict(self, shares: int = 1) -> Dict:
+        """Get the totals; with ``shares``, tokens and cost are split over that many posts from the same requests."""
+        prompt_tokens = round(sum(r['prompt_tokens'] for r in self.rounds) / shares)
+        completion_tokens = round(sum(r['completion_tokens'] for r in self.rounds) / shares)
+        return {
+            'model': self.model,
+            'rounds': self.rounds,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+            'tool_calls': sum(r['tool_calls'] for r in self.rounds),
+            'tool_seconds': round(sum(r['tool_seconds'] for r in self.rounds), 3),
+            'generation_seconds': round(time.monotonic() - self.started, 3),
+            'cost_usd': round(self.cost() / shares, 5)
+        }
+
+
+def summarize_metrics(metrics: pd.DataFrame) -> Dict:
+    """Aggregate per-post metrics (one row per post, as from ``PostStore.post_metrics``)."""
+    def quantile(column: str, q: float) -> Optional[float]:
+        if column not in metrics.columns or metrics[column].dropna().empty:
+            return None
+        return float(metrics[column].dropna().quantile(q))
+
+    def mean(column: str) -> Optional[float]:
+        if column not in metrics.columns or metrics[column].dropna().empty:
+            return None
+        return float(metrics[column].dropna().mean())
+
+    return {
+        'posts': len(metrics),
+        'wall_p50': quantile('wall_seconds', 0.5),
+        'wall_p95': quantile('wall_seconds', 0.95),
+        'generation_p50': quantile('generation_seconds', 0.5),
+        'image_p50': quantile('image_seconds', 0.5),
+        'upload_p50': quantile('upload_seconds', 0.5),
+        'upload_p95': quantile('upload_seconds', 0.95),
+        'tool_seconds_p95': quantile('tool_seconds', 0.95),
+        'cost_per_post': mean('cost_usd'),
+        'tokens_per_post': mean('total_tokens'),
+        'prompt_tokens_p95': quantile('prompt_tokens', 0.95),
+        'tool_calls_per_post': mean('tool_calls'),
+        'links_per_post': mean('links_checked'),
+        'repaired_links_per_post': mean('links_repaired'),
+        'stripped_links_per_post': mean('links_stripped')
+    }
@@ -0,0 +1,350 @@
+import json
+import sqlite3
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from modules.blob_store import BlobStore, is_digest
+from modules.dedup_index import NearDuplicateIndex
+
+# Display column name -> SQL column, in Saved Posts grid order
+POST_COLUMNS = {
+    "Selected": "selected",
+    "Keyword": "keyword",
+    "Title": "title",
+    "Excerpt": "excerpt",
+    "Content": "content",
+    "Image": "image",
+    "Intent": "intent",
+    "Volume": "volume",
+    "Frequent Word": "frequent_word",
+    "Tab": "tab",
+    "Status": "status",
+    "Generated Date": "generated_date"
+}
+
+# Large text columns kept in the blob store; the table holds their digests
+BLOB_COLUMNS = ("content", "excerpt")
+
+# PRAGMA user_version: 1 once bodies have been moved to the blob store, 2 once posts have metrics,
+# 3 once posts can have headline variants
+SCHEMA_VERSION = 3
+
+# Per-post metrics (tokens, cost, timings) stored with each post as JSON
+METRICS_COLUMNS = ("prompt_tokens", "completion_tokens", "total_tokens", "tool_calls", "tool_seconds",
+                   "generation_seconds", "image_seconds", "wall_seconds", "upload_seconds", "cost_usd",
+                   "links_checked", "links_repaired", "links_stripped")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    selected INTEGER NOT NULL DEFAULT 0,
+    keyword TEXT,
+    title TEXT,
+    excerpt TEXT,
+    content TEXT,
+    image TEXT,
+    intent TEXT,
+    volume INTEGER,
+    frequent_word TEXT,
+    tab TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    generated_date TEXT,
+    updated_at TEXT,
+    metrics TEXT,
+    title_variants TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_posts_status ON posts(status);
+CREATE INDEX IF NOT EXISTS idx_posts_keyword ON posts(keyword);
+CREATE TABLE IF NOT EXISTS post_signatures (
+    post_id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS generation_attempts (
+    keyword TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL
+);
+"""
+
+
+class PostStore:
+    """Row store for generated posts backed by SQLite in WAL mode.
+
+    Every post gets a stable integer ID, and saves and status changes touch
+    a single row, so their cost does not depend on how many posts exist.
+    Post bodies and excerpts live in a ``BlobStore`` and are only read back
+    when a post is opened (``get_post``) or explicitly hydrated.
+
+    The MinHash signature of every post body is stored alongside it and
+    kept in a ``NearDuplicateIndex``, updated as posts are saved.
+
+    One store can be shared by threads: its connection is used by one
+    thread at a time.
+    """
+
+    def __init__(self, db_path: str = "data/posts.db", blobs: Optional[BlobStore] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.blobs = blobs or BlobStore(self.db_path.parent / "blobs")
+        self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            self._move_bodies_to_blobs()
+        if version < 2:
+            self._add_column("metrics", "TEXT", 2)
+        if version < 3:
+            self._add_column("title_variants", "TEXT", 3)
+        self.near_duplicates = NearDuplicateIndex()
+        for row in self.conn.execute("SELECT post_id, signature FROM post_signatures"):
+            self.near_duplicates.add(row["post_id"], np.frombuffer(row["signature"], dtype='<u4'))
+        self._index_posts()
+
+    def _move_bodies_to_blobs(self) -> None:
+        """Replace inline content and excerpts from older databases with blob digests."""
+        with self.conn:
+            rows = self.conn.execute(f"SELECT id, {', '.join(BLOB_COLUMNS)} FROM posts").fetchall()
+            self.conn.executemany(
+                f"UPDATE posts SET {', '.join(f'{c} = ?' for c in BLOB_COLUMNS)} WHERE id = ?",
+                [tuple(self._store_text(row[c]) for c in BLOB_COLUMNS) + (row["id"],) for row in rows]
+            )
+            self.conn.execute("PRAGMA user_version = 1")
+
+    def _add_column(self, name: str, declaration: str, version: int) -> None:
+        """Add a column to databases created before it existed, and move to schema ``version``."""
+        with self.conn:
+            columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(posts)")}
+            if name not in columns:
+                self.conn.execute(f"ALTER TABLE posts ADD COLUMN {name} {declaration}")
+            self.conn.execute(f"PRAGMA user_version = {version}")
+
+    def _index_posts(self) -> None:
+        """Compute and index the signatures of posts that have none yet (older or imported posts)."""
+        with self._lock:
+            rows = self.conn.execute(
+                """SELECT id, content FROM posts
+                   WHERE id NOT IN (SELECT post_id FROM post_signatures) AND content IS NOT NULL"""
+            ).fetchall()
+        if not rows:
+            return
+        signatures = [(row["id"], self._signature(self.blobs.resolve(row["content"]))) for row in rows]
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT INTO post_signatures (post_id, signature) VALUES (?, ?)",
+                                  [(post_id, signature.astype('<u4').tobytes()) for post_id, signature in signatures])
+        for post_id, signature in signatures:
+            self.near_duplicates.add(post_id, signature)
+
+    def _signature(self, content: Optional[str]) -> np.ndarray:
+        return self.near_duplicates.hasher.signature(content or "")
+
+    def _store_text(self, value) -> Optional[str]:
+        """Put a text value in the blob store and return its digest."""
+        if value is None or (not isinstance(value, str) and pd.isna(value)) or is_digest(value):
+            return value
+        return self.blobs.put(value)
+
+    def add_post(self, post: Dict, status: str = "pending") -> int:
+        """Insert a generated post and return its ID."""
+        now = datetime.now().isoformat()
+        signature = self._signature(post["content"])
+        excerpt, content = self._store_text(post["excerpt"]), self._store_text(post["content"])
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                """INSERT INTO posts (selected, keyword, title, excerpt, content, image, intent,
+                                      volume, frequent_word, tab, status, generated_date, updated_at, metrics,
+                                      title_variants)
+                   VALUES (0, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    post["keyword"], post["title"],
+                    excerpt, content,
+                    post.get("image"), post.get("intent", ""), int(post.get("volume") or 0),
+                    post.get("frequent_word", ""), post.get("tab", ""), status,
+                    post.get("generated_date", now), now,
+                    json.dumps(post["metrics"]) if post.get("metrics") else None,
+                    json.dumps(post["title_variants"]) if post.get("title_variants") else None
+                )
+            )
+            self.conn.execute("INSERT INTO post_signatures (post_id, signature) VALUES (?, ?)",
+                              (cursor.lastrowid, signature.astype('<u4').tobytes()))
+        claim = post.pop("dedup_claim", None)
+        if claim is not None:
+            self.near_duplicates.rename(claim, cursor.lastrowid)
+        else:
+            self.near_duplicates.add(cursor.lastrowid, signature)
+        return cursor.lastrowid
+
+    def find_near_duplicates(self, content: str, exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Get (post ID, similarity) of saved posts whose body is nearly the same as ``content``."""
+        return [(key, score) for key, score in self.near_duplicates.query(self._signature(content), exclude)
+                if isinstance(key, int)]
+
+    def claim_unique(self, post: Dict) -> List[Tuple[Optional[int], float]]:
+        """Check a new post against saved posts and other new posts before spending more on it.
+
+        If the post has no near-duplicates, it holds its place in the index
+        until it is saved with ``add_post`` (or released with
+        ``release_claim``), so posts generated in parallel are checked
+        against each other too. Returns (post ID, similarity) of the
+        near-duplicates; the ID is None for a post that is not saved yet.
+        """
+        claim = f"pending:{uuid.uuid4().hex}"
+        matches = self.near_duplicates.add_if_unique(claim, self._signature(post["content"]))
+        if not matches:
+            post["dedup_claim"] = claim
+        return [(key if isinstance(key, int) else None, score) for key, score in matches]
+
+    def release_claim(self, post: Dict) -> None:
+        """Drop the index entry of a claimed post that will not be saved."""
+        claim = post.pop("dedup_claim", None)
+        if claim is not None:
+            self.near_duplicates.remove(claim)
+
+    def start_attempts(self, keywords: List[str]) -> Dict[str, int]:
+        """Reserve generation attempt numbers for keywords; returns the first new attempt of each.
+
+        A keyword listed N times reserves N attempts. Attempt numbers go into
+        the completion cache key, so generating a keyword again writes a new
+        post instead of replaying the cached one, while a replay run that
+        starts from the same database sees the same keys as its recording.
+        """
+        counts = Counter(keywords)
+        with self._lock, self.conn:
+            self.conn.executemany(
+                """INSERT INTO generation_attempts (keyword, attempts) VALUES (?, ?)
+                   ON CONFLICT(keyword) DO UPDATE SET attempts = attempts + excluded.attempts""",
+                list(counts.items())
+            )
+            return {keyword: self.conn.execute("SELECT attempts FROM generation_attempts WHERE keyword = ?",
+                                               (keyword,)).fetchone()[0] - count
+                    for keyword, count in counts.items()}
+
+    def update_status(self, post_id: int, status: str) -> None:
+        """Set the upload status of a single post."""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE posts SET status = ?, updated_at = ? WHERE id = ?",
+                (status, datetime.now().isoformat(), int(post_id))
+            )
+
+    def record_metrics(self, post_id: int, **metrics) -> None:
+        """Merge metrics (e.g. ``upload_seconds``) into a post's stored metrics."""
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT metrics FROM posts WHERE id = ?", (int(post_id),)).fetchone()
+            if row is None:
+                return
+            merged = {**json.loads(row["metrics"] or "{}"), **metrics}
+            self.conn.execute("UPDATE posts SET metrics = ? WHERE id = ?", (json.dumps(merged), int(post_id)))
+
+    def set_selected(self, selected: Dict[int, bool]) -> None:
+        """Update the selection flag of the given posts ({post_id: selected})."""
+        now = datetime.now().isoformat()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE posts SET selected = ?, updated_at = ? WHERE id = ?",
+                [(int(bool(value)), now, int(post_id)) for post_id, value in selected.items()]
+            )
+
+    def get_post(self, post_id: int) -> Optional[Dict]:
+        """Get a single post as a dict, with its content and excerpt loaded from the blob store."""
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM posts WHERE id = ?", (int(post_id),)).fetchone()
+        if row is None:
+            return None
+        post = dict(row)
+        for column in BLOB_COLUMNS:
+            post[column] = self.blobs.resolve(post[column])
+        post["metrics"] = json.loads(post["metrics"]) if post["metrics"] else None
+        post["title_variants"] = json.loads(post["title_variants"]) if post["title_variants"] else None
+        return post
+
+    def count(self) -> int:
+        """Get the number of stored posts."""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def posts_dataframe(self, columns: Optional[List[str]] = None, status: Optional[str] = None,
+                        keyword: Optional[str] = None, hydrate: bool = False,
+                        after_id: Optional[int] = None) -> pd.DataFrame:
+        """Build a DataFrame view of the posts, indexed by post ID.
+
+        ``columns`` uses the display names from ``POST_COLUMNS``. "Content" and
+        "Excerpt" hold blob digests unless ``hydrate`` is set. ``after_id``
+        keeps only posts saved after that post.
+        """
+        columns = [c for c in (columns or POST_COLUMNS) if c in POST_COLUMNS]
+        select = ", ".join(f'{POST_COLUMNS[c]} AS "{c}"' for c in columns)
+        query = f"SELECT id AS \"Post ID\", {select} FROM posts"
+
+        conditions, params = [], []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if keyword is not None:
+            conditions.append("keyword = ?")
+            params.append(keyword)
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(int(after_id))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id"
+
+        with self._lock:
+            df = pd.read_sql_query(query, self.conn, params=params, index_col="Post ID")
+        if "Selected" in df.columns:
+            df["Selected"] = df["Selected"].astype(bool)
+        if "Generated Date" in df.columns:
+            df["Generated Date"] = pd.to_datetime(df["Generated Date"], errors="coerce")
+        if hydrate:
+            for display, column in POST_COLUMNS.items():
+                if column in BLOB_COLUMNS and display in df.columns:
+                    df[display] = df[display].map(self.blobs.resolve)
+        return df
+
+    def post_metrics(self) -> pd.DataFrame:
+        """Get the metric totals of all posts that have metrics, one row per post, indexed by post ID."""
+        with self._lock:
+            rows = self.conn.execute("SELECT id, metrics FROM posts WHERE metrics IS NOT NULL ORDER BY id").fetchall()
+        records = []
+        for row in rows:
+            metrics = json.loads(row["metrics"])
+            records.append({"Post ID": row["id"], **{c: metrics.get(c) for c in METRICS_COLUMNS}})
+        return pd.DataFrame(records, columns=["Post ID", *METRICS_COLUMNS]).set_index("Post ID")
+
+    def import_dataframe(self, df: pd.DataFrame) -> int:
+        """Import posts from a legacy generated-posts DataFrame; returns rows imported."""
+        rows = []
+        now = datetime.now().isoformat()
+        for record in df.to_dict('records'):
+            row = {sql: record.get(display) for display, sql in POST_COLUMNS.items()}
+            row["selected"] = int(bool(row["selected"]))
+            for column in BLOB_COLUMNS:
+                row[column] = self._store_text(row[column])
+            row["volume"] = int(row["volume"]) if pd.notna(row["volume"]) else 0
+            row["status"] = row["status"] or "pending"
+            if pd.notna(row["generated_date"]) and not isinstance(row["generated_date"], str):
+                row["generated_date"] = pd.Timestamp(row["generated_date"]).isoformat()
+            row["updated_at"] = now
+            rows.append(row)
+
+        if rows:
+            names = list(rows[0])
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    f"INSERT INTO posts ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                    [tuple(row[name] for name in names) for row in rows]
+                )
+            self._index_posts()
+        return len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
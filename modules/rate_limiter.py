@@ -0,0 +1,87 @@
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from config.config import PROVIDER_RATE_LIMITS
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing ``rate`` calls per ``per`` seconds.
+
+    Up to ``burst`` calls can go through back to back; after that callers of
+    ``acquire`` block until a token has refilled. When the provider answers
+    429, ``pause`` holds every caller back until it says to retry.
+    """
+
+    def __init__(self, rate: float, per: float = 60.0, burst: Optional[int] = None):
+        self.rate = rate
+        self.per = per
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        # ``updated`` is in the future while paused; nothing refills until then
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate / self.per)
+            self.updated = now
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Block until ``tokens`` are available and take them; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                paused = self.paused_until - time.monotonic()
+                if paused > 0:
+                    wait = paused
+                elif self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                else:
+                    wait = (tokens - self.tokens) * self.per / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for ``seconds``, e.g. after a 429; the bucket restarts empty."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.updated = self.paused_until
+
+
+def retry_after_seconds(value: Optional[str], default: float = 1.0) -> float:
+    """Parse a Retry-After header, given in seconds or as an HTTP date; ``default`` if missing or invalid."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """Get the process-wide limiter for an API provider, configured from ``PROVIDER_RATE_LIMITS``.
+
+    Limiters are shared by every caller in the process, so the limit holds
+    across Streamlit reruns and generator instances. Providers without a
+    configured limit get an effectively unlimited bucket.
+    """
+    with _limiters_lock:
+        if provider not in _limiters:
+            limit = PROVIDER_RATE_LIMITS.get(provider)
+            _limiters[provider] = RateLimiter(**limit) if limit else RateLimiter(rate=1e9, per=1.0)
+        return _limiters[provider]
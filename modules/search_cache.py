@@ -0,0 +1,149 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+from config.config import SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_SIMILARITY
+from modules.keyword_index import normalize_tokens
+
+
+def query_key(query: str, lang: str) -> str:
+    """Normalize a search query for use as a cache key: sorted word stems, without stopwords."""
+    return f"{lang}|{' '.join(normalize_tokens(query))}"
+
+
+class SearchResultCache:
+    """Disk-backed cache of Google search results, after filtering to trusted sites.
+
+    Entries are keyed on the normalized query, so word order, case, plurals
+    and SEO filler words do not matter, and are kept for ``ttl`` seconds.
+    A query with no exact entry is answered from the most similar cached
+    query whose stems overlap at least ``similarity`` (Jaccard). The least
+    recently used entries are evicted beyond ``max_entries``. An entry
+    serves requests for at most as many results as it was searched for.
+    """
+
+    def __init__(self, cache_file: Optional[str] = "data/search_cache.json", ttl: float = SEARCH_CACHE_TTL,
+                 max_entries: int = SEARCH_CACHE_MAX_ENTRIES, similarity: float = SEARCH_CACHE_SIMILARITY,
+                 save_interval: float = 30):
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.save_interval = save_interval
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # Key -> {'query', 'num_results', 'urls', 'stored_at'}, least recently used first
+        self._entries: OrderedDict = OrderedDict()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self.hits = self.fuzzy_hits = self.misses = 0
+        self._load()
+
+    def _load(self) -> None:
+        if self.cache_file is None:
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                self._entries = OrderedDict(json.load(f))
+        except (OSError, ValueError):
+            self._entries = OrderedDict()
+
+    def _fresh(self, entry: Dict) -> bool:
+        return time.time() - entry['stored_at'] < self.ttl
+
+    def _closest(self, key: str, num_results: int) -> Optional[str]:
+        lang, _, words = key.partition('|')
+        tokens = set(words.split())
+        best, best_score = None, self.similarity
+        for other, entry in self._entries.items():
+            other_lang, _, other_words = other.partition('|')
+            if other_lang != lang or entry['num_results'] < num_results or not self._fresh(entry):
+                continue
+            other_tokens = set(other_words.split())
+            score = len(tokens & other_tokens) / len(tokens | other_tokens)
+            if score >= best_score:
+                best, best_score = other, score
+        return best
+
+    def get(self, query: str, num_results: int, lang: str = 'en') -> Optional[List[str]]:
+        """Get cached result URLs for a query, or None if there is no fresh entry for it or a similar query."""
+        key = query_key(query, lang)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._fresh(entry) and entry['num_results'] >= num_results:
+                self.hits += 1
+            else:
+                key = self._closest(key, num_results) if key.partition('|')[2] else None
+                if key is None:
+                    self.misses += 1
+                    return None
+                entry = self._entries[key]
+                self.fuzzy_hits += 1
+                self.logger.info(f"Reusing search results of '{entry['query']}' for '{query}'")
+            self._entries.move_to_end(key)
+            return entry['urls'][:num_results]
+
+    def put(self, query: str, num_results: int, urls: List[str], lang: str = 'en') -> None:
+        """Cache the result URLs of a search, evicting the least recently used entries if full."""
+        key = query_key(query, lang)
+        with self._lock:
+            self._entries[key] = {'query': query, 'num_results': num_results, 'urls': list(urls),
+                                  'stored_at': time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            save = time.monotonic() - self._saved_at >= self.save_interval
+        if save:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write unsaved results to disk, dropping expired ones."""
+        if self.cache_file is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            self._entries = OrderedDict((key, entry) for key, entry in self._entries.items() if self._fresh(entry))
+            entries = list(self._entries.items())
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.cache_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(temp_file, 'w') as f:
+                json.dump(entries, f)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            self.logger.warning(f"Could not save search cache: {str(e)}")
+
+    def stats(self) -> Dict:
+        """Get lookup counts and the hit rate (fuzzy matches count as hits)."""
+        with self._lock:
+            lookups = self.hits + self.fuzzy_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'fuzzy_hits': self.fuzzy_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.fuzzy_hits) / lookups if lookups else 0.0
+            }
+
+
+_default_cache: Optional[SearchResultCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchResultCache:
+    """Get the process-wide search result cache, saved to disk at exit."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = SearchResultCache()
+            atexit.register(_default_cache.flush)
+        return _default_cache
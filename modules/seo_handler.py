@@ -1,13 +1,19 @@
 import os
 import logging
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional, Tuple
 import requests
 from pydantic import BaseModel, Field
 import json
-import time
 from bs4 import BeautifulSoup
 from googlesearch import search as google_search
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config.config import SEO_BASE_TOPICS, KEYWORD_ANALYSIS_CONCURRENCY, RATE_LIMIT_RETRIES
+from modules.rate_limiter import get_rate_limiter, retry_after_seconds
+from modules.http_client import get_http_session
+from modules.url_cache import get_url_validation_cache
+from modules.search_cache import get_search_cache
+from modules.llm_cache import get_completion_cache
 
 class KeywordData(BaseModel):
     query: str = Field(description="The search query or keyword")
@@ -28,6 +34,9 @@ class SEOKeywordTool:
             datefmt='%H:%M:%S'
         )
         self.logger = logging.getLogger(__name__)
+        self.url_cache = get_url_validation_cache()
+        self.search_cache = get_search_cache()
+        self.llm_cache = get_completion_cache()
 
     def generate_text(self, prompt: str) -> str:
         """Generate text using Hugging Face API"""
@@ -42,14 +51,24 @@ class SEOKeywordTool:
                     "top_p": 0.1  # More focused output
                 }
             }
-            response = requests.post(self.api_url, headers=self.headers, json=payload, timeout=30)  # Add timeout
-            
-            if response.status_code != 200:
-                self.logger.error(f"API Error: {response.status_code}")
-                return ""
-                
+
+            def call():
+                limiter = get_rate_limiter('huggingface')
+                for attempt in range(RATE_LIMIT_RETRIES + 1):
+                    limiter.acquire()
+                    response = get_http_session().post(self.api_url, headers=self.headers, json=payload, timeout=30)  # Add timeout
+                    if response.status_code not in (429, 503) or attempt == RATE_LIMIT_RETRIES:
+                        break
+                    # Rate limited or model loading: hold back every caller, not just this one
+                    wait = retry_after_seconds(response.headers.get('Retry-After'), default=2.0 ** attempt)
+                    self.logger.warning(f"API returned {response.status_code}, retrying in {wait:.1f}s")
+                    limiter.pause(wait)
+                # Failed responses raise, so they are never cached
+                response.raise_for_status()
+                return response.json()
+
+            result = self.llm_cache.complete('huggingface', {"url": self.api_url, "payload": payload}, call)
             self.logger.info("Received response from API")
-            result = response.json()
             if isinstance(result, list) and len(result) > 0:
                 generated_text = result[0].get('generated_text', '')
                 self.logger.info(f"Generated text: {generated_text[:100]}...")
@@ -61,6 +80,9 @@ class SEOKeywordTool:
         except requests.Timeout:
             self.logger.warning("Request timed out")
             return ""
+        except requests.HTTPError as e:
+            self.logger.error(f"API Error: {e.response.status_code}")
+            return ""
         except Exception as e:
             self.logger.error(f"Generation error: {str(e)}")
             return ""
@@ -106,35 +128,7 @@ class SEOKeywordTool:
             self.logger.error(f"JSON parsing error: {str(e)}")
             return {}
 
-    def analyze_keywords(self, website_url: str, competitor_urls: str) -> List[Dict]:
-        """Analyze keywords and generate variations"""
-        try:
-            # Process base topics
-            base_topics = [
-                "stress relief activities",
-                "therapy putty exercises",
-                "sensory toys benefits",
-                "stress relief tools",
-                "anxiety relief products",
-                "educational sensory toys",
-                "occupational therapy tools",
-                "fidget toys for anxiety",
-                "stress balls benefits",
-                "hand therapy exercises",
-                "sensory integration activities",
-                "focus improvement tools",
-                "desk toys for productivity",
-                "mindfulness tools",
-                "therapeutic putty exercises",
-                "hand strengthening activities",
-                "stress management products",
-                "concentration improvement toys",
-                "calming sensory tools",
-                "fine motor skill toys"
-            ]
-            
-            keywords = []
-            prompt_template = """Analyze this topic: {topic}
+    KEYWORD_PROMPT = """Analyze this topic: {topic}
             Context: {context}
             
             Return a JSON object with:
@@ -167,56 +161,14 @@ class SEOKeywordTool:
             2. Make sure it's valid JSON
             3. No explanations or additional text
             4. Use the exact format shown above"""
-            
-            context = f"""Website: {website_url}
-            Industry: Stress relief and sensory products
-            Competitors: {competitor_urls}"""
-            
-            self.logger.info(f"Processing {len(base_topics)} base topics")
-            
-            for topic in base_topics:
-                self.logger.info(f"\n{'='*50}")
-                self.logger.info(f"Processing topic: {topic}")
-                
-                prompt = prompt_template.format(
-                    topic=topic,
-                    context=context
-                )
-                
-                response = self.generate_text(prompt)
-                if response:
-                    try:
-                        self.logger.info("\n=== Processing Response ===")
-                        self.logger.info("Raw response from model:")
-                        self.logger.info("-" * 50)
-                        self.logger.info(response)
-                        self.logger.info("-" * 50)
-                        
-                        data_package = self.clean_and_parse_json(response)
-                        
-                        if not data_package:
-                            self.logger.error("Failed to get valid data package")
-                            continue
-                        
-                        # Add main keyword
-                        if 'main' in data_package:
-                            keywords.append(data_package['main'])
-                            self.logger.info(f"Added main keyword: {data_package['main']}")
-                        
-                        # Add variations
-                        if 'variations' in data_package:
-                            for var in data_package['variations']:
-                                keywords.append(var)
-                                self.logger.info(f"Added variation: {var}")
-                    
-                    except Exception as e:
-                        self.logger.error(f"Error parsing response: {e}")
-                        self.logger.error(f"Problematic response: {response}")
-                else:
-                    self.logger.warning(f"No response generated for topic: {topic}")
-                
-                self.logger.info("Waiting for rate limit...")
-                time.sleep(2)
+
+    def analyze_keywords(self, website_url: str, competitor_urls: str, topics: Optional[List[str]] = None,
+                         max_workers: int = KEYWORD_ANALYSIS_CONCURRENCY) -> List[Dict]:
+        """Analyze keywords and generate variations"""
+        try:
+            keywords = []
+            for _, topic_keywords in self.iter_keyword_analysis(website_url, competitor_urls, topics, max_workers):
+                keywords.extend(topic_keywords)
             
             self.logger.info(f"Analysis complete. Found {len(keywords)} keywords")
             self.logger.info("Final keywords list:")
@@ -228,10 +180,69 @@ class SEOKeywordTool:
             self.logger.error(f"Error in keyword analysis: {str(e)}")
             return []
 
+    def iter_keyword_analysis(self, website_url: str, competitor_urls: str, topics: Optional[List[str]] = None,
+                              max_workers: int = KEYWORD_ANALYSIS_CONCURRENCY) -> Iterator[Tuple[str, List[Dict]]]:
+        """Analyze topics in parallel, yielding (topic, keywords) as each topic finishes.
+
+        ``topics`` defaults to ``SEO_BASE_TOPICS``. Requests are paced by the
+        shared Hugging Face rate limiter, so ``max_workers`` only bounds how
+        many are in flight at once.
+        """
+        topics = list(topics if topics is not None else SEO_BASE_TOPICS)
+        if not topics:
+            return
+        context = f"""Website: {website_url}
+            Industry: Stress relief and sensory products
+            Competitors: {competitor_urls}"""
+        
+        self.logger.info(f"Processing {len(topics)} base topics")
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(topics))),
+                                thread_name_prefix="keyword-analysis") as pool:
+            futures = {pool.submit(self.analyze_topic, topic, context): topic for topic in topics}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def analyze_topic(self, topic: str, context: str) -> List[Dict]:
+        """Get the main keyword and variations for one topic; empty if the model gave no usable answer"""
+        self.logger.info(f"Processing topic: {topic}")
+        response = self.generate_text(self.KEYWORD_PROMPT.format(topic=topic, context=context))
+        if not response:
+            self.logger.warning(f"No response generated for topic: {topic}")
+            return []
+        try:
+            self.logger.info(f"=== Processing Response for {topic} ===")
+            self.logger.info(response)
+            
+            data_package = self.clean_and_parse_json(response)
+            if not data_package:
+                self.logger.error("Failed to get valid data package")
+                return []
+            
+            keywords = []
+            # Add main keyword
+            if 'main' in data_package:
+                keywords.append(data_package['main'])
+                self.logger.info(f"Added main keyword: {data_package['main']}")
+            
+            # Add variations
+            for var in data_package.get('variations', []):
+                keywords.append(var)
+                self.logger.info(f"Added variation: {var}")
+            return keywords
+        
+        except Exception as e:
+            self.logger.error(f"Error parsing response: {e}")
+            self.logger.error(f"Problematic response: {response}")
+            return []
+
     def search_urls(self, query: str, num_results: int = 3) -> List[str]:
         """Search for relevant URLs using Google Search"""
         try:
             self.logger.info(f"Searching URLs for query: {query}")
+            cached_urls = self.search_cache.get(query, num_results)
+            if cached_urls is not None:
+                self.logger.info(f"Using {len(cached_urls)} cached URLs")
+                return cached_urls
             
             # List of trusted domains
             trusted_domains = [
@@ -249,6 +260,8 @@ class SEOKeywordTool:
             ]
             
             found_urls = []
+            # Searches run from parallel generation workers share one limit
+            get_rate_limiter('google_search').acquire()
             # Use googlesearch-python to find URLs
             search_results = google_search(
                 query, 
@@ -256,37 +269,60 @@ class SEOKeywordTool:
                 lang="en"
             )
             
-            for url in search_results:
-                # Parse the domain
-                domain = urlparse(url).netloc.lower()
-                if any(trusted in domain for trusted in trusted_domains):
-                    try:
-                        # Verify the URL is accessible
-                        response = requests.head(url, timeout=5, allow_redirects=True)
-                        if response.status_code == 200:
-                            found_urls.append(url)
-                            self.logger.info(f"Found valid URL: {url}")
-                            if len(found_urls) >= num_results:
-                                break
-                    except:
-                        continue
-                        
-                time.sleep(0.5)  # Be nice to search engines
+            candidates = [
+                url for url in search_results
+                if any(trusted in urlparse(url).netloc.lower() for trusted in trusted_domains)
+            ]
+
+            # Verify the trusted URLs are accessible, all at once; they are on
+            # different sites, so there is no need to space the requests out
+            if candidates:
+                with ThreadPoolExecutor(max_workers=min(8, len(candidates))) as pool:
+                    accessible = list(pool.map(self.is_url_accessible, candidates))
+                for url, ok in zip(candidates, accessible):
+                    if ok:
+                        found_urls.append(url)
+                        self.logger.info(f"Found valid URL: {url}")
+                        if len(found_urls) >= num_results:
+                            break
             
             self.logger.info(f"Found {len(found_urls)} valid URLs")
+            # Empty results are usually throttled searches, so they are not cached
+            if found_urls:
+                self.search_cache.put(query, num_results, found_urls)
             return found_urls
             
         except Exception as e:
             self.logger.error(f"Error searching URLs: {str(e)}")
             return []
 
+    def is_url_accessible(self, url: str) -> bool:
+        """Check that a URL is reachable, via the shared validation cache"""
+        return self.url_cache.is_valid(url)
+
+    def get_page_metadata(self, url: str) -> Dict:
+        """Get the title and meta description of a webpage with a single request"""
+        try:
+            headers = {
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            }
+            response = get_http_session().get(url, headers=headers, timeout=5)
+            soup = BeautifulSoup(response.text, 'html.parser')
+            meta = soup.find('meta', attrs={'name': 'description'}) or soup.find('meta', attrs={'property': 'og:description'})
+            return {
+                "title": soup.title.string.strip() if soup.title and soup.title.string else "",
+                "description": meta['content'].strip() if meta and 'content' in meta.attrs else ""
+            }
+        except:
+            return {"title": "", "description": ""}
+
     def get_page_title(self, url: str) -> str:
         """Get the title of a webpage with better error handling"""
         try:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
-            response = requests.get(url, headers=headers, timeout=5)
+            response = get_http_session().get(url, headers=headers, timeout=5)
             soup = BeautifulSoup(response.text, 'html.parser')
             return soup.title.string.strip() if soup.title else ""
         except:
@@ -298,7 +334,7 @@ class SEOKeywordTool:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
-            response = requests.get(url, headers=headers, timeout=5)
+            response = get_http_session().get(url, headers=headers, timeout=5)
             soup = BeautifulSoup(response.text, 'html.parser')
             meta = soup.find('meta', attrs={'name': 'description'}) or soup.find('meta', attrs={'property': 'og:description'})
             return meta['content'].strip() if meta and 'content' in meta.attrs else ""
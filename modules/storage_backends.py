@@ -0,0 +1,174 @@
+import json
+import uuid
+from io import StringIO
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+import pandas as pd
+from modules.blob_store import BlobStore
+
+# Version entry keys holding a payload, or a reference to one stored elsewhere
+PAYLOAD_KEYS = ('data', 'file', 'blob', 'delta', 'delta_file', 'delta_blob', 'size')
+
+# Keys referencing payloads outside the snapshot, which versions may share
+REFERENCE_KEYS = ('file', 'delta_file', 'blob', 'delta_blob')
+
+
+class JsonBackend:
+    """Keeps version payloads inline in db.json and the journal.
+
+    Version entries are either keyframes (a full frame) or deltas. This
+    backend stores keyframes as ``df.to_json()`` under ``data`` and deltas
+    under ``delta``; subclasses can move payloads out to files, and every
+    backend can read the inline form so existing databases keep working.
+    """
+
+    name = "json"
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+        self._blobs = None
+
+    @property
+    def blobs(self) -> BlobStore:
+        """Blob store for payloads referenced by digest, created on first use."""
+        if self._blobs is None:
+            self._blobs = BlobStore(self.data_dir / "blobs")
+        return self._blobs
+
+    def write_keyframe(self, df_id: str, version_index: int, df: pd.DataFrame) -> Dict:
+        """Store a full frame and return the version entry fields for it."""
+        data = df.to_json()
+        return {'data': data, 'size': len(data)}
+
+    def write_delta(self, df_id: str, version_index: int, delta: Dict) -> Dict:
+        """Store a delta and return the version entry fields for it."""
+        return {'delta': delta, 'size': len(json.dumps(delta))}
+
+    def is_keyframe(self, version: Dict) -> bool:
+        """Check whether a version entry holds a full frame."""
+        return not any(key in version for key in ('delta', 'delta_file', 'delta_blob'))
+
+    def payload_size(self, version: Dict) -> int:
+        """Get the stored size of a version payload in bytes."""
+        if 'size' in version:
+            return version['size']
+        if 'data' in version:
+            return len(version['data'])
+        return len(json.dumps(self.read_delta(version)))
+
+    def read_keyframe(self, version: Dict, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Load a keyframe, optionally projected to a subset of columns."""
+        if 'file' in version:
+            return self._read_parquet(self.data_dir / version['file'], columns)
+        data = self.blobs.get_text(version['blob']) if 'blob' in version else version['data']
+        df = pd.read_json(StringIO(data))
+        if columns is not None:
+            df = df[[c for c in df.columns if c in columns]]
+        return df
+
+    def read_delta(self, version: Dict) -> Dict:
+        """Load a delta payload."""
+        if 'delta' in version:
+            return version['delta']
+        if 'delta_blob' in version:
+            return json.loads(self.blobs.get(version['delta_blob']))
+        with open(self.data_dir / version['delta_file'], 'r') as f:
+            return json.load(f)
+
+    def delete_payload(self, version: Dict, referenced: Set[str]) -> None:
+        """Delete the files behind a dropped version unless still referenced."""
+        for key in ('blob', 'delta_blob'):
+            digest = version.get(key)
+            if digest and digest not in referenced:
+                self.blobs.delete(digest)
+        for key in ('file', 'delta_file'):
+            name = version.get(key)
+            if name and name not in referenced:
+                path = self.data_dir / name
+                if path.exists():
+                    path.unlink()
+
+    def _read_parquet(self, path: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Read a Parquet keyframe through a memory map, reading only the requested columns."""
+        import pyarrow.parquet as pq
+
+        if columns is not None:
+            schema = pq.read_schema(path, memory_map=True)
+            columns = [c for c in schema.names if c in columns]
+            # Keep the stored index columns so row labels survive projection
+            index_columns = (schema.pandas_metadata or {}).get('index_columns', [])
+            columns += [c for c in index_columns if isinstance(c, str) and c not in columns]
+        table = pq.read_table(path, columns=columns, memory_map=True)
+        return table.to_pandas()
+
+
+class ParquetBackend(JsonBackend):
+    """Writes every keyframe as its own Parquet file and every delta as its own file.
+
+    Files live under ``frames/<df_id>/``; db.json and the journal only hold
+    metadata and file references, so startup cost does not grow with the
+    amount of stored data.
+    """
+
+    name = "parquet"
+
+    def __init__(self, data_dir: Path):
+        super().__init__(data_dir)
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("The parquet storage backend requires pyarrow: pip install pyarrow")
+        self.frames_dir = self.data_dir / "frames"
+
+    def _version_path(self, df_id: str, version_index: int, suffix: str) -> Path:
+        frame_dir = self.frames_dir / df_id
+        frame_dir.mkdir(parents=True, exist_ok=True)
+        # Unique names so rewritten versions never overwrite files still in use
+        return frame_dir / f"{version_index:06d}-{uuid.uuid4().hex[:8]}{suffix}"
+
+    def write_keyframe(self, df_id: str, version_index: int, df: pd.DataFrame) -> Dict:
+        path = self._version_path(df_id, version_index, ".parquet")
+        df = df.copy()
+        # Parquet requires string column names
+        df.columns = [str(c) for c in df.columns]
+        df.to_parquet(path, engine='pyarrow', compression='zstd')
+        return {'file': str(path.relative_to(self.data_dir)), 'size': path.stat().st_size}
+
+    def write_delta(self, df_id: str, version_index: int, delta: Dict) -> Dict:
+        path = self._version_path(df_id, version_index, ".delta.json")
+        payload = json.dumps(delta)
+        with open(path, 'w') as f:
+            f.write(payload)
+        return {'delta_file': str(path.relative_to(self.data_dir)), 'size': len(payload)}
+
+
+class BlobBackend(JsonBackend):
+    """Stores keyframes and deltas in the content-addressed blob store.
+
+    db.json and the journal only hold digests, and a payload identical to
+    one already stored (in any frame) takes no extra space.
+    """
+
+    name = "blob"
+
+    def write_keyframe(self, df_id: str, version_index: int, df: pd.DataFrame) -> Dict:
+        data = df.to_json()
+        return {'blob': self.blobs.put(data), 'size': len(data)}
+
+    def write_delta(self, df_id: str, version_index: int, delta: Dict) -> Dict:
+        payload = json.dumps(delta)
+        return {'delta_blob': self.blobs.put(payload), 'size': len(payload)}
+
+
+BACKENDS = {
+    JsonBackend.name: JsonBackend,
+    ParquetBackend.name: ParquetBackend,
+    BlobBackend.name: BlobBackend
+}
+
+
+def make_backend(name: str, data_dir: Path) -> JsonBackend:
+    """Create a storage backend by name."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name}")
+    return BACKENDS[name](data_dir)
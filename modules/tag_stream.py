@@ -0,0 +1,66 @@
+from typing import Dict, Iterable
+
+# Sections of a generated post, as delimited in the model's response
+POST_SECTIONS = ('title', 'excerpt', 'content')
+
+
+class TagStreamParser:
+    """Incrementally splits streamed text into ``<title>``/``<excerpt>``/``<content>`` sections.
+
+    Text can be fed in arbitrary chunks; tags split across chunks are held
+    back until they are complete. Anything between the sections is ignored,
+    as are HTML tags inside a section other than its own closing tag.
+    """
+
+    def __init__(self, tags: Iterable[str] = POST_SECTIONS):
+        self.tags = tuple(tags)
+        self.sections: Dict[str, str] = {tag: "" for tag in self.tags}
+        self.closed = set()
+        self.current = None
+        self._buffer = ""
+
+    def feed(self, text: str) -> bool:
+        """Consume a chunk of text; returns whether any section changed."""
+        self._buffer += text
+        changed = False
+        while self._buffer:
+            if self.current is None:
+                start = self._buffer.find("<")
+                if start == -1:
+                    self._buffer = ""
+                    break
+                self._buffer = self._buffer[start:]
+                tag = next((t for t in self.tags if self._buffer.startswith(f"<{t}>")), None)
+                if tag is not None:
+                    self.current = tag
+                    self._buffer = self._buffer[len(tag) + 2:]
+                    changed = True
+                elif any(f"<{t}>".startswith(self._buffer) for t in self.tags):
+                    # Possibly the start of an opening tag; wait for more text
+                    break
+                else:
+                    self._buffer = self._buffer[1:]
+            else:
+                close_tag = f"</{self.current}>"
+                end = self._buffer.find(close_tag)
+                if end != -1:
+                    self.sections[self.current] += self._buffer[:end]
+                    self.closed.add(self.current)
+                    self._buffer = self._buffer[end + len(close_tag):]
+                    self.current = None
+                    changed = True
+                    continue
+                # Emit everything except a trailing partial closing tag
+                keep = next((n for n in range(min(len(close_tag) - 1, len(self._buffer)), 0, -1)
+                             if close_tag.startswith(self._buffer[-n:])), 0)
+                emit = self._buffer[:len(self._buffer) - keep]
+                if emit:
+                    self.sections[self.current] += emit
+                    changed = True
+                self._buffer = self._buffer[len(emit):]
+                break
+        return changed
+
+    def result(self) -> Dict[str, str]:
+        """Get the sections parsed so far, stripped of surrounding whitespace."""
+        return {tag: text.strip() for tag, text in self.sections.items()}
@@ -0,0 +1,173 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+from config.config import URL_CACHE_POSITIVE_TTL, URL_CACHE_NEGATIVE_TTL
+from modules.http_client import get_http_session
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL for use as a cache key.
+
+    Lowercases the scheme and host, drops default ports, fragments,
+    tracking parameters and a trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                       if not k.lower().startswith('utm_')])
+    return urlunsplit((scheme, host, parts.path.rstrip('/') or '/', query, ''))
+
+
+def url_ok(url: str, session: Optional[requests.Session] = None, timeout: float = 5) -> bool:
+    """Check that a URL is reachable: any status below 400, falling back to GET for servers that reject HEAD.
+
+    This is the only rule the shared validation cache stores results under,
+    whichever caller asked first.
+    """
+    session = session or get_http_session()
+    try:
+        response = session.head(url, timeout=timeout, allow_redirects=True)
+        if response.status_code in (403, 405, 501):
+            response = session.get(url, timeout=timeout, allow_redirects=True, stream=True)
+            response.close()
+        return response.status_code < 400
+    except Exception:
+        return False
+
+
+class UrlValidationCache:
+    """Process-wide cache of URL accessibility checks.
+
+    Results are keyed on the normalized URL and kept for ``positive_ttl``
+    seconds if the URL was reachable and ``negative_ttl`` seconds if not.
+    Concurrent checks of the same URL share one request. With a
+    ``cache_file`` the results are saved to disk at most every
+    ``save_interval`` seconds and at exit, and reloaded on start.
+    """
+
+    def __init__(self, cache_file: Optional[str] = "data/url_cache.json",
+                 positive_ttl: float = URL_CACHE_POSITIVE_TTL, negative_ttl: float = URL_CACHE_NEGATIVE_TTL,
+                 save_interval: float = 30):
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.save_interval = save_interval
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # Normalized URL -> [reachable, checked at (epoch seconds)]
+        self._entries: Dict[str, list] = {}
+        self._in_flight: Dict[str, Future] = {}
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self.hits = self.misses = self.coalesced = 0
+        self._load()
+
+    def _load(self) -> None:
+        if self.cache_file is None:
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _fresh(self, entry: list) -> bool:
+        ttl = self.positive_ttl if entry[0] else self.negative_ttl
+        return time.time() - entry[1] < ttl
+
+    def is_valid(self, url: str, session: Optional[requests.Session] = None, timeout: float = 5) -> bool:
+        """Check whether a URL is reachable with ``url_ok``, using the cache when possible.
+
+        ``session`` and ``timeout`` only change how the request is sent (e.g.
+        its pool and retry policy), never what counts as reachable.
+        """
+        key = normalize_url(url)
+        owner = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._fresh(entry):
+                self.hits += 1
+                return entry[0]
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                future = self._in_flight[key] = Future()
+                owner = True
+        if not owner:
+            # Another thread is already checking this URL
+            return future.result()
+
+        try:
+            ok = url_ok(url, session, timeout)
+        except Exception:
+            ok = False
+        with self._lock:
+            self._entries[key] = [ok, time.time()]
+            del self._in_flight[key]
+            self._dirty = True
+            save = time.monotonic() - self._saved_at >= self.save_interval
+        future.set_result(ok)
+        if save:
+            self.flush()
+        return ok
+
+    def flush(self) -> None:
+        """Write unsaved results to disk, dropping expired ones."""
+        if self.cache_file is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            self._entries = {key: entry for key, entry in self._entries.items() if self._fresh(entry)}
+            entries = dict(self._entries)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.cache_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(temp_file, 'w') as f:
+                json.dump(entries, f)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            self.logger.warning(f"Could not save URL cache: {str(e)}")
+
+    def stats(self) -> Dict:
+        """Get lookup counts and the hit rate (hits and coalesced waits count as hits)."""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0
+            }
+
+
+_default_cache: Optional[UrlValidationCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_url_validation_cache() -> UrlValidationCache:
+    """Get the process-wide URL validation cache, saved to disk at exit."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = UrlValidationCache()
+            atexit.register(_default_cache.flush)
+        return _default_cache